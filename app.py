@@ -21,7 +21,22 @@ from libs.logging import setup_logging
 from libs.graph.communication_graph import set_logger as set_graph_logger
 from libs.parsing.kubernetes import set_logger as set_kubernetes_logger
 from libs.parsing.logs import set_logger as set_logs_logger
+from libs.parsing.kube_api import set_logger as set_kube_api_logger
+from libs.parsing.log_cursors import set_logger as set_log_cursors_logger
+from libs.parsing.log_followers import set_logger as set_log_followers_logger
+from libs.parsing.pod_inventory import set_logger as set_pod_inventory_logger
+from libs.parsing.async_collector import set_logger as set_async_collector_logger
+from libs.parsing.concurrency import set_logger as set_concurrency_logger
+from libs.parsing.tail_sizing import set_logger as set_tail_sizing_logger
+from libs.parsing.replay import set_logger as set_replay_logger, set_replay_dir
+from libs.parsing.ip_index import set_logger as set_ip_index_logger
+from libs.parsing.source_rules import set_logger as set_source_rules_logger
+from libs.parsing.json_decoding import set_logger as set_json_decoding_logger
+from libs.parsing.parse_pool import set_logger as set_parse_pool_logger
+from libs.parsing.tracing import set_logger as set_tracing_logger
+from libs.parsing.log_dedup import set_logger as set_log_dedup_logger
 from libs.graph.graph_builder import set_logger as set_graph_builder_logger
+from libs.graph.scheduler import set_logger as set_scheduler_logger
 from libs.visualization.tooltip_manager import set_logger as set_tooltip_logger, set_database_manager
 from libs.webapp.app_controller import create_app, init_app, run_app
 from libs.database.db_manager import DatabaseManager, set_logger as set_db_logger
@@ -31,6 +46,8 @@ if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Kubernetes Communications Graph Visualizer')
     parser.add_argument('-d', '--debug', type=int, choices=[0, 1, 2], 
                         help='Set the logging level: 0 for debug, 1 for info, 2 for warning')
+    parser.add_argument('--replay', metavar='DIR',
+                        help='Build the graph from the recorded logs of DIR instead of the clusters')
     args = parser.parse_args()  # Analyser les arguments
 
     # Set up logging
@@ -44,10 +61,29 @@ if __name__ == '__main__':
     set_graph_logger(logger)
     set_kubernetes_logger(logger)
     set_logs_logger(logger)
+    set_kube_api_logger(logger)
+    set_log_cursors_logger(logger)
+    set_log_followers_logger(logger)
+    set_pod_inventory_logger(logger)
+    set_async_collector_logger(logger)
+    set_concurrency_logger(logger)
+    set_tail_sizing_logger(logger)
+    set_replay_logger(logger)
+    set_ip_index_logger(logger)
+    set_source_rules_logger(logger)
+    set_json_decoding_logger(logger)
+    set_parse_pool_logger(logger)
+    set_tracing_logger(logger)
+    set_log_dedup_logger(logger)
     set_graph_builder_logger(logger)
+    set_scheduler_logger(logger)
     set_tooltip_logger(logger)
     set_db_logger(logger)  # Set logger for database manager
     
+    # Replay recorded logs instead of collecting them from the clusters
+    if args.replay:
+        set_replay_dir(args.replay)
+    
     # Initialize database manager
     db_manager = DatabaseManager()
     
@@ -13,5 +13,106 @@ KUBE_CONTEXTS_FILE = "config/kube-contexts.txt"
 KUBE_CONFIG_DIR = "config/kube-configs"
 CUSTOM_RULES_FILE = "config/custom-rules.yaml"
 
+# The graph is kept from one cycle to the next: an edge that no namespace reported for
+# GRAPH_EDGE_TTL seconds is removed, along with the nodes it leaves without edges
+GRAPH_EDGE_TTL = 3600
+
+# Collection backend: "kubectl" forks a kubectl process per call, "api" talks to the
+# API server directly over keep-alive connections built from the files in KUBE_CONFIG_DIR
+COLLECTION_BACKEND = "kubectl"
+API_POOL_SIZE = 8  # Maximum number of idle keep-alive connections kept per context
+API_REQUEST_TIMEOUT = 30  # Socket timeout in seconds for API requests
+
+# Pod inventory: every context is listed once with a single all-namespaces call, then kept
+# up to date by a watch; without the watch the pods are listed again on every cycle
+POD_INVENTORY_WATCH = True
+POD_WATCH_TIMEOUT = 300  # Seconds after which the API server ends a watch, which is then resumed
+
+# Log collection mode: "tail" fetches the last LOG_LINES_LIMIT lines on every cycle,
+# "incremental" keeps a cursor per pod and only fetches the lines written since the last cycle,
+# "stream" keeps a long-lived follower per deployment that fills an in-memory ring buffer
+LOG_COLLECTION_MODE = "tail"
+LOG_CURSOR_TTL = 3600  # Seconds after which the cursor of a pod that is no longer collected is dropped
+LOG_BUFFER_LINES = 20000  # Capacity of the per-namespace ring buffer in "stream" mode
+FOLLOWER_BACKOFF_MIN = 1  # Initial delay in seconds before a failed follower reconnects
+FOLLOWER_BACKOFF_MAX = 60  # Maximum delay in seconds between follower reconnections
+FOLLOWER_READ_TIMEOUT = 120  # Seconds without any line after which an API follower reconnects
+
+# Adaptive tail sizing ("tail" mode): fetch the logs written since the previous cycle, with a line cap
+# derived from byte budgets sized by the traffic learned for each namespace
+ADAPTIVE_TAIL = True
+TAIL_MIN_BYTES = 16 * 1024  # Smallest budget of a namespace fetch
+TAIL_MAX_BYTES = 4 * 1024 * 1024  # Largest budget of a namespace fetch
+TAIL_CYCLE_BYTES = 64 * 1024 * 1024  # Total budget of the namespace fetches of one cycle
+TAIL_RATE_SMOOTHING = 0.3  # Weight of the latest cycle in the learned line rate and line size
+TAIL_HEADROOM = 1.5  # Margin applied to the expected volume of a window
+
+# Deduplication of the "tail" fetches: lines already fetched for the namespace by a recent cycle are
+# skipped before parsing, using rotating Bloom filters per namespace (see libs/parsing/log_dedup.py)
+LOG_DEDUP = True
+LOG_DEDUP_WINDOW = 900  # Seconds after which a new filter is started; must exceed the update interval
+LOG_DEDUP_GENERATIONS = 2  # Number of filters kept per namespace
+LOG_DEDUP_CAPACITY = 50000  # Number of lines of a filter, about 90 KB at the default error rate
+LOG_DEDUP_ERROR_RATE = 0.001  # Share of new lines wrongly skipped as already counted
+LOG_DEDUP_BATCH_LINES = 1000  # Number of lines looked up in the filters at a time
+
+# Replica collection: read the logs of every ready replica of the deployment of a namespace in
+# parallel instead of the single pod kubectl picks for deployment/<namespace>
+REPLICA_COLLECTION = True
+REPLICA_FAN_OUT = 10  # Maximum number of replicas read per deployment and cycle
+LOG_LINE_QUEUE_SIZE = 10000  # Log lines buffered between the replica readers of a namespace and its parser
+
+# Offline replay: build the graph from recorded logs instead of the clusters (see libs/parsing/replay.py)
+REPLAY_DIR = None  # Replay directory, also settable with the --replay command line option
+REPLAY_CHUNK_BYTES = 8 * 1024 * 1024  # Size of the chunks recorded log files are parsed in
+
+# JSON decoding of the log lines: "auto" uses orjson or pysimdjson when installed and the json module otherwise
+JSON_DECODER = "auto"  # "auto", "orjson", "simdjson" or "json"
+JSON_DECODE_BATCH_LINES = 500  # Number of log lines decoded per batch
+# Log parser: "projection" scans only the fields parse_logs uses out of each line and decodes the
+# lines it cannot scan in full, "full" decodes every line, "auto" scans unless orjson or pysimdjson
+# is installed (they decode whole lines faster than the scan)
+LOG_PARSER = "auto"
+
+# Parsing processes: the collection threads send the log lines to worker processes in chunks,
+# so that parsing uses every core instead of one (None: one process per core, 0: parse in the threads)
+PARSE_PROCESSES = None
+PARSE_CHUNK_LINES = 5000  # Number of log lines sent to a parsing process at a time
+AGGREGATION_BATCH_LINES = 10000  # Number of log lines counted per http_host with numpy at a time
+ERROR_SAMPLE_SIZE = 20  # Number of 5xx log entries kept per (namespace, http_host, source), sampled uniformly
+# Response time quantiles per (http_host, source) and per edge (see libs/parsing/latency_sketch.py)
+LATENCY_SKETCH_ACCURACY = 0.02  # Relative error of the quantiles
+LATENCY_SKETCH_MAX_BINS = 512  # Maximum number of bins of a sketch, the lowest ones being collapsed beyond it
+LATENCY_WINDOW_CYCLES = 10  # Number of cycles reporting an edge whose response times its quantiles span
+# Request counts per route template (see libs/parsing/route_normalization.py)
+ROUTE_BREAKDOWN = True  # Count the requests of each (http_host, source) and edge per route
+ROUTE_CACHE_SIZE = 20000  # Number of distinct requests whose route is kept in the LRU cache
+ROUTE_MAX_PER_KEY = 20  # Number of routes counted per (namespace, http_host, source), the others as "other"
+ROUTE_MAX_PER_EDGE = 50  # Number of routes counted per edge across cycles, the others as "other"
+
+# Tracing of the parse and merge hot paths (see libs/parsing/tracing.py): at DEBUG level, 1 log line
+# in every TRACE_SAMPLE_LINES of each namespace is traced (0: only the namespaces enabled from the web UI)
+TRACE_SAMPLE_LINES = 1000
+
+# Healthcheck and monitoring requests (metrics_paths of CUSTOM_RULES_FILE): "count" filters them out
+# before the source attribution and counts them per namespace and path (see the /probes route),
+# "drop" filters them out without counting them, "keep" records them like any other request
+PROBE_FILTER = "count"
+
+# Collection runtime: "threads" processes one namespace per worker thread, "asyncio" fetches
+# the logs of all namespaces concurrently on an event loop and hands them to parser threads
+COLLECTION_RUNTIME = "threads"
+ASYNC_MAX_CONCURRENCY_PER_CONTEXT = 64  # Maximum number of in-flight log fetches per context in "asyncio" runtime
+
 # Multithreading configuration
-MAX_WORKER_THREADS = 12  # Maximum number of worker threads for parallel processing 
+MAX_WORKER_THREADS = 12  # Maximum number of worker threads for parallel processing, shared by all contexts
+MAX_WORKERS_PER_CONTEXT = 6  # Maximum number of namespaces of one context processed at the same time (initial limit when adaptive)
+
+# Adaptive concurrency: adjust the in-flight collection tasks of each context from the observed fetch latency
+ADAPTIVE_CONCURRENCY = True
+ADAPTIVE_MIN_WORKERS_PER_CONTEXT = 1  # Lowest per-context limit
+ADAPTIVE_MAX_WORKERS_PER_CONTEXT = 32  # Highest per-context limit
+ADAPTIVE_MAX_WORKER_THREADS = MAX_WORKER_THREADS  # Size of the shared thread pool when the limits are adaptive (raise it to let the limits grow past it)
+ADAPTIVE_LATENCY_TARGET = 5.0  # Fetch latency in seconds above which a context's limit is reduced
+ADAPTIVE_DECREASE_FACTOR = 0.5  # Factor applied to the limit on throttling (429), 5xx errors, timeouts or slow fetches
+ADAPTIVE_HISTORY_SIZE = 200  # Number of limit changes kept per context 
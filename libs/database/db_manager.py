@@ -213,6 +213,14 @@ class DatabaseManager:
             logger.error(f"Error getting all node errors: {e}")
             raise
 
+    def ensure_connection(self):
+        """Reconnect if the server closed the connection, for a manager kept across cycles."""
+        try:
+            self.connection.ping(reconnect=True, attempts=3, delay=1)
+        except Error as e:
+            logger.error(f"Error reconnecting to the database: {e}")
+            raise
+
     def close(self):
         """Close the database connection."""
         if self.connection and self.connection.is_connected():
@@ -6,16 +6,31 @@ Main class for the Kubernetes Communications Graph Visualizer
 """
 
 import networkx as nx
-from collections import defaultdict
-import concurrent.futures
+import os
+from collections import OrderedDict, defaultdict
 import threading
 import time
-from config.constants import MAX_WORKER_THREADS, KUBE_CONTEXTS_FILE
+from config.constants import (KUBE_CONTEXTS_FILE, EXCLUDED_NS_FILE, GRAPH_EDGE_TTL, LOG_COLLECTION_MODE, COLLECTION_RUNTIME,
+                              ADAPTIVE_CONCURRENCY, ADAPTIVE_MAX_WORKER_THREADS, REPLICA_COLLECTION, ADAPTIVE_TAIL,
+                              ROUTE_MAX_PER_EDGE)
 from libs.database.db_manager import DatabaseManager
 
-from libs.parsing.kubernetes import load_kube_contexts, load_excluded_namespaces, get_namespaces, count_pods_in_namespace, find_web_pod_in_namespace, load_kube_config, get_all_pods_with_ips_in_namespaces
-from libs.parsing.logs import parse_logs, extract_logs, extract_and_parse_logs_threaded
-from libs.graph.graph_builder import create_simplified_graph
+from libs.parsing.kubernetes import load_kube_contexts, load_excluded_namespaces, count_pods_in_namespace, find_web_pod_in_namespace, find_replica_pods_in_namespace, load_kube_config, get_all_pods_with_ips_in_namespaces, get_inventory_namespaces
+from libs.parsing.logs import (parse_logs, extract_logs, extract_and_parse_logs_threaded, parse_namespace_logs,
+                               drop_counted_lines)
+from libs.parsing.async_collector import AsyncLogCollector
+from libs.parsing.concurrency import concurrency_controller
+from libs.parsing.tail_sizing import tail_sizer
+from libs.parsing.log_followers import log_followers
+from libs.parsing.pod_inventory import pod_inventory
+from libs.parsing.replay import get_replay_source
+from libs.parsing.source_rules import reload_source_rules
+from libs.parsing.parse_pool import start_parse_pool
+from libs.parsing.tracing import tracer
+from libs.parsing.route_normalization import merge_route_counts
+from libs.parsing.latency_sketch import LatencyWindow
+from libs.graph.graph_builder import SimplifiedGraph
+from libs.graph.scheduler import FairScheduler
 
 # Global logger (will be set by the main script)
 logger = None
@@ -24,30 +39,37 @@ class K8sCommunicationGraph:
     def __init__(self, skip_logs=False):
         """Initialize the graph.
         
+        The graph is meant to be kept from one cycle to the next: each call to build_graph()
+        applies the communications and counts of the cycle in place, and removes the edges
+        that were not reported for GRAPH_EDGE_TTL seconds.
+        
         Args:
             skip_logs: If True, skip log extraction and use a simplified communication pattern
         """
         self.graph = nx.DiGraph()
-        self.simplified_graph = nx.DiGraph()
         self.namespace_colors = {}
         self.namespace_shapes = {}
         self.edge_counts = defaultdict(int)
-        self.contexts = load_kube_contexts(KUBE_CONTEXTS_FILE)
-        self.excluded_namespaces = load_excluded_namespaces()
         self.namespace_pod_counts = {}
         self.node_to_namespace = {}  # Mapping of node names to their namespaces
         self.node_to_context = {}    # Mapping of node names to their contexts
+        self.simplified = SimplifiedGraph(self.node_to_namespace, self.node_to_context)
+        self.simplified_graph = self.simplified.graph  # One node per namespace, updated with the graph
         self.skip_logs = skip_logs
         self.node_counts = {}  # Attribute to store node counts
-        self.http_host_counts = defaultdict(lambda: defaultdict(int))  # Attribute to store http_host counts
+        self.http_host_counts = defaultdict(lambda: defaultdict(int))  # Counts of the last cycle that reported each namespace
+        self.edge_latency = {}  # Response time sketches of each (source, target), over the last cycles that reported it
+        self.edge_routes = {}  # Requests per route of each (source, target), of the last cycle that reported it
+        self.edge_last_seen = OrderedDict()  # Time each edge was last reported, least recent first
+        self.cycle = 0
+        self._edge_stats_cycle = {}  # Cycle of the latency and routes of each edge
         
-        # Initialize database manager
+        # Initialize database manager, kept with its connection for the life of the graph
         self.db_manager = DatabaseManager()
         
-        # Load kubeconfig paths for each context
-        self.context_to_kubeconfig = {}
-        for context in self.contexts:
-            self.context_to_kubeconfig[context] = load_kube_config(context)
+        # Load the contexts, their kubeconfig paths and the excluded namespaces
+        self._config_mtimes = None
+        self.reload_config()
         
         # Add locks for thread safety
         self.edge_counts_lock = threading.Lock()
@@ -55,6 +77,30 @@ class K8sCommunicationGraph:
         self.graph_lock = threading.Lock()
         self.db_lock = threading.Lock()
     
+    def reload_config(self):
+        """Load the contexts and excluded namespaces files if they changed since they were loaded.
+        
+        Returns:
+            bool: True if the files were loaded
+        """
+        mtimes = []
+        for path in (KUBE_CONTEXTS_FILE, EXCLUDED_NS_FILE):
+            try:
+                mtimes.append(os.path.getmtime(path))
+            except OSError:
+                mtimes.append(None)
+        if mtimes == self._config_mtimes:
+            return False
+        self.contexts = load_kube_contexts(KUBE_CONTEXTS_FILE)
+        self.excluded_namespaces = load_excluded_namespaces()
+        
+        # Load kubeconfig paths for each context
+        self.context_to_kubeconfig = {}
+        for context in self.contexts:
+            self.context_to_kubeconfig[context] = load_kube_config(context)
+        self._config_mtimes = mtimes
+        return True
+    
     def analyze_namespace(self, context, namespace, kubeconfig):
         """Analyze communications for a namespace."""
         logger.info(f"Analyzing namespace: {namespace} for context: {context} with kubeconfig: {kubeconfig}")
@@ -118,11 +164,25 @@ class K8sCommunicationGraph:
         
         # Extract and parse logs in a thread-safe way
         communications, local_http_host_counts = extract_and_parse_logs_threaded(context, namespace, self.http_host_counts_lock, kubeconfig, namespaces, pods_with_ips)
+        return self.namespace_result(context, namespace, communications, local_http_host_counts, pods_with_ips)
+    
+    def namespace_result(self, context, namespace, communications, local_http_host_counts, pods_with_ips):
+        """
+        Build the result dictionary of a processed namespace, as expected by merge_thread_results.
         
+        Args:
+            context: The context of the namespace
+            namespace: The processed namespace
+            communications: The communications detected in its logs
+            local_http_host_counts: The http_host counts of the namespace
+            pods_with_ips: Dictionary of pods with their IPs
+            
+        Returns:
+            A dictionary containing the namespace and its processing results
+        """
         # Count pods in this namespace
         #pod_count = count_pods_in_namespace(context, namespace, kubeconfig)
         pod_count = len(pods_with_ips.get(namespace, {}))
-
         
         return {
             'context': context,
@@ -131,6 +191,95 @@ class K8sCommunicationGraph:
             'pod_count': pod_count,
             'http_host_counts': local_http_host_counts
         }
+    
+    def process_namespace_replay(self, context, namespace, kubeconfig, namespaces, pods_with_ips, replay):
+        """
+        Process the recorded logs of a namespace in a separate thread.
+        
+        Args:
+            context: The recorded context of the namespace
+            namespace: The namespace to process
+            kubeconfig: Unused, for the signature of process_namespace_threaded
+            namespaces: List of known namespaces
+            pods_with_ips: Dictionary of the recorded pods with their IPs
+            replay: The ReplaySource
+            
+        Returns:
+            A dictionary containing the namespace and its processing results
+        """
+        communications, local_http_host_counts = replay.parse_namespace(context, namespace, namespaces, pods_with_ips)
+        return self.namespace_result(context, namespace, communications, local_http_host_counts, pods_with_ips)
+    
+    def collect_namespaces_threaded(self, namespaces_by_context, namespaces, pods_with_ips, replay=None):
+        """
+        Process namespaces on worker threads, all contexts sharing one fairly scheduled pool.
+        
+        Args:
+            namespaces_by_context: Dictionary of the namespaces to process per context
+            namespaces: List of known namespaces
+            pods_with_ips: Dictionary of pods with their IPs
+            replay: The ReplaySource to read the logs from instead of the clusters, if any
+            
+        Yields:
+            (context, namespace, result, error) tuples as the namespaces complete
+        """
+        if ADAPTIVE_CONCURRENCY:
+            # Threads are only started when the contexts' limits allow it
+            scheduler = FairScheduler(max_workers=ADAPTIVE_MAX_WORKER_THREADS, context_limit=concurrency_controller.limit)
+        else:
+            scheduler = FairScheduler()
+        for context, context_namespaces in namespaces_by_context.items():
+            kubeconfig = self.context_to_kubeconfig.get(context)
+            for namespace in context_namespaces:
+                if replay:
+                    scheduler.submit(context, namespace, self.process_namespace_replay, context, namespace, kubeconfig, namespaces, pods_with_ips, replay)
+                else:
+                    scheduler.submit(context, namespace, self.process_namespace_threaded, context, namespace, kubeconfig, namespaces, pods_with_ips)
+        
+        for context, namespace, future in scheduler.run():
+            try:
+                yield context, namespace, future.result(), None
+            except Exception as exc:
+                yield context, namespace, None, exc
+    
+    def collect_namespaces_async(self, namespaces_by_context, namespaces, pods_with_ips):
+        """
+        Fetch the logs of all namespaces concurrently on an event loop and parse them in threads.
+        
+        Args:
+            namespaces_by_context: Dictionary of the namespaces to process per context
+            namespaces: List of known namespaces
+            pods_with_ips: Dictionary of pods with their IPs
+            
+        Returns:
+            List of (context, namespace, result, error) tuples
+        """
+        targets = []
+        for context, context_namespaces in namespaces_by_context.items():
+            kubeconfig = self.context_to_kubeconfig.get(context)
+            for namespace in context_namespaces:
+                try:
+                    web_pod = find_web_pod_in_namespace(context, namespace, kubeconfig, pods_with_ips)
+                except Exception as exc:
+                    logger.error(f"Namespace {namespace} in context {context} generated an exception: {exc}")
+                    continue
+                if web_pod:
+                    pod_names = find_replica_pods_in_namespace(context, namespace, web_pod, pods_with_ips) if REPLICA_COLLECTION else [web_pod]
+                    targets.append((context, namespace, pod_names, kubeconfig))
+                else:
+                    logger.warning(f"In context {context}, no pods found in namespace {namespace}")
+        
+        def parse(context, namespace, logs):
+            if logs:
+                communications, local_http_host_counts = parse_namespace_logs(
+                    namespace, drop_counted_lines(context, namespace, logs), namespaces, pods_with_ips)
+            else:
+                logger.warning(f"For context {context}, no logs extracted in namespace {namespace}")
+                communications, local_http_host_counts = [], {}
+            return self.namespace_result(context, namespace, communications, local_http_host_counts, pods_with_ips)
+        
+        collector = AsyncLogCollector(concurrency_controller.limit) if ADAPTIVE_CONCURRENCY else AsyncLogCollector()
+        return collector.collect(targets, parse)
         
     def merge_thread_results(self, results):
         """
@@ -152,14 +301,43 @@ class K8sCommunicationGraph:
             # Count services per namespace
             self.node_counts[namespace] = self.node_counts.get(namespace, 0) + 1
             
-            # Update http_host_counts with thread-local data
+            # None unless the namespace is traced, the messages are only built for sampled entries
+            trace = tracer.start(namespace)
+            
+            # The node of the namespace and its tooltips have changed
+            with self.graph_lock:
+                self.simplified.touch(self.node_to_namespace.get(namespace, namespace))
+            
+            # Update http_host_counts with thread-local data, replacing those of the previous cycles
             with self.http_host_counts_lock:
                 for ns, host_counts in local_http_host_counts.items():
+                    self.http_host_counts.pop(ns, None)
                     for host_key, counts in host_counts.items():
                         self.http_host_counts[ns][host_key] = counts
                         
+                        # The routes of an edge are those of the last cycle that reported it
+                        edge = (host_key[1], ns)
+                        if self._edge_stats_cycle.get(edge) != self.cycle:
+                            self._edge_stats_cycle[edge] = self.cycle
+                            self.edge_routes.pop(edge, None)
+                        
+                        # Merge the response times into the sketch of the edge for this cycle
+                        sketch = getattr(counts, 'sketch', None)
+                        if sketch is not None:
+                            window = self.edge_latency.get(edge)
+                            if window is None:
+                                window = self.edge_latency[edge] = LatencyWindow()
+                            window.add(self.cycle, sketch)
+                        
+                        # Merge the requests per route into those of the edge
+                        routes = getattr(counts, 'routes', None)
+                        if routes:
+                            self.edge_routes[edge] = merge_route_counts(self.edge_routes.get(edge), routes, ROUTE_MAX_PER_EDGE)
+                        traced = trace is not None and trace.sample()
+                        
                         # Log the counts for debugging
-                        logger.debug(f"Processing counts for node {ns}: {counts}")
+                        if traced:
+                            trace.log(f"Processing counts for node {ns}: {counts}")
                         
                         # Update error counts in database (only 5xx errors)
                         if counts.get('5xx', 0) > 0:
@@ -168,14 +346,15 @@ class K8sCommunicationGraph:
                                     current_errors, current_requests = self.db_manager.get_node_errors(ns)
                                     new_errors = current_errors + counts.get('5xx', 0)
                                     
-                                    logger.debug(f"Current errors for {ns}: {current_errors}")
-                                    logger.debug(f"New errors to add: {counts.get('5xx', 0)}")
-                                    logger.debug(f"Total errors after update: {new_errors}")
+                                    if traced:
+                                        trace.log(f"Current errors for {ns}: {current_errors}, adding {counts.get('5xx', 0)}, "
+                                                  f"total errors after update: {new_errors}")
                                     
                                     # Collect 5xx error requests
                                     error_requests = []
                                     if '5xx_entries' in counts:
-                                        logger.debug(f"Found {len(counts['5xx_entries'])} 5xx entries for node {ns}")
+                                        if traced:
+                                            trace.log(f"Found {len(counts['5xx_entries'])} 5xx entries for node {ns}")
                                         error_requests = [
                                             {
                                                 'status': entry.get('status', 'unknown'),
@@ -186,14 +365,16 @@ class K8sCommunicationGraph:
                                             }
                                             for entry in counts['5xx_entries']
                                         ]
-                                        logger.debug(f"Stored error requests with timestamps: {error_requests}")
+                                        if traced:
+                                            trace.log(f"Stored error requests with timestamps: {error_requests}")
                                     
                                     # Update database with new errors and requests
                                     self.db_manager.update_node_errors(ns, new_errors, error_requests)
                                     
-                                    # Verify the update
-                                    verify_errors, verify_requests = self.db_manager.get_node_errors(ns)
-                                    logger.debug(f"Verified database update for {ns}: errors={verify_errors}, requests={len(verify_requests)}")
+                                    # Verify the update of traced entries, which costs a query
+                                    if traced:
+                                        verify_errors, verify_requests = self.db_manager.get_node_errors(ns)
+                                        trace.log(f"Verified database update for {ns}: errors={verify_errors}, requests={len(verify_requests)}")
                                 except Exception as e:
                                     logger.error(f"Error updating database for node {ns}: {e}")
                                     logger.error(f"Counts that caused the error: {counts}")
@@ -201,6 +382,7 @@ class K8sCommunicationGraph:
             # Process communications and store them in the database
             if communications:
                 for comm in communications:
+                    traced = trace is not None and trace.sample()
                     # Handle different formats of communication data
                     if isinstance(comm, tuple) and len(comm) == 2:
                         source, target = comm
@@ -230,41 +412,106 @@ class K8sCommunicationGraph:
                         
                         # Get recent errors for edge coloring
                         has_5xx, has_4xx = self.db_manager.get_recent_errors(target)
-                        logger.debug(f"Edge {source} -> {target}: has_5xx={has_5xx}, has_4xx={has_4xx}")
+                        if traced:
+                            trace.log(f"Edge {source} -> {target}: has_5xx={has_5xx}, has_4xx={has_4xx}")
                         
                         # Determine edge color based on recent errors
                         edge_color = 'green'  # Default color
                         if has_5xx:
                             edge_color = 'red'
-                            logger.debug(f"Setting edge {source} -> {target} color to red (5xx error)")
                         elif has_4xx:
                             edge_color = 'orange'
-                            logger.debug(f"Setting edge {source} -> {target} color to orange (4xx error)")
-                        else:
-                            logger.debug(f"Setting edge {source} -> {target} color to green (no errors)")
                         
                         # Get edge weight from database
                         edge_weight = self.db_manager.get_edge_weight(source, target)
                         
                         # Add edge to graph with weight and color
                         with self.graph_lock:
-                            logger.debug(f"Added edge: {source} -> {target} with weight {edge_weight} and color {edge_color}")
+                            if traced:
+                                trace.log(f"Added edge: {source} -> {target} with weight {edge_weight} and color {edge_color}")
                             self.graph.add_edge(
                                 source, target, 
                                 weight=edge_weight,
                                 label=f"{edge_weight}",
                                 color=edge_color
                             )
+                            self.simplified.set_edge(source, target, edge_weight)
+                            self.edge_last_seen[(source, target)] = time.time()
+                            self.edge_last_seen.move_to_end((source, target))
+    
+    def edge_latency_quantiles(self, edges=None):
+        """Return the response time quantiles of each edge of the simplified graph.
+        
+        The quantiles span the last LATENCY_WINDOW_CYCLES cycles that reported each edge.
+        
+        Args:
+            edges (set, optional): The (source namespace, target namespace) edges to return, all by default
+        
+        Returns:
+            dict: {(source namespace, target namespace): {'count', 'p50', 'p95', 'p99'}}, in seconds
+        """
+        merged = {}
+        with self.http_host_counts_lock:
+            for (source, target), window in self.edge_latency.items():
+                edge = (self.node_to_namespace.get(source, source), self.node_to_namespace.get(target, target))
+                if edges is not None and edge not in edges:
+                    continue
+                if edge in merged:
+                    merged[edge].merge(window.merged())
+                else:
+                    merged[edge] = window.merged()
+        return {edge: sketch.summary() for edge, sketch in merged.items()}
+    
+    def edge_route_counts(self, edges=None):
+        """Return the requests per route of each edge of the simplified graph.
+        
+        Args:
+            edges (set, optional): The (source namespace, target namespace) edges to return, all by default
+        
+        Returns:
+            dict: {(source namespace, target namespace): {route: count}}, most frequent routes first
+        """
+        merged = {}
+        with self.http_host_counts_lock:
+            for (source, target), routes in self.edge_routes.items():
+                edge = (self.node_to_namespace.get(source, source), self.node_to_namespace.get(target, target))
+                if edges is not None and edge not in edges:
+                    continue
+                merged[edge] = merge_route_counts(merged.get(edge), routes, ROUTE_MAX_PER_EDGE)
+        return {edge: dict(sorted(routes.items(), key=lambda item: -item[1])) for edge, routes in merged.items()}
     
     def build_graph(self):
-        """Build the communication graph based on log analysis using multithreading."""
+        """Update the communication graph with the logs of a cycle, using multithreading."""
         logger.info("Building communication graph with multithreading...")
+        started = time.time()
+        self.cycle += 1
         all_namespaces = []
+        
+        # Pick up the changes of the contexts and excluded namespaces files
+        self.reload_config()
+        
+        # The connection is kept across cycles and may have been closed by the server
+        try:
+            self.db_manager.ensure_connection()
+        except Exception as e:
+            logger.error(f"Database connection unavailable: {e}")
         #for context in self.contexts:
         #    namespaces = get_namespaces(context, self.excluded_namespaces, self.context_to_kubeconfig.get(context))
         #    all_namespaces.extend(namespaces)
         
-        pods_with_ips = get_all_pods_with_ips_in_namespaces(self.excluded_namespaces, self.contexts)
+        # Recorded contexts, pods and logs replace the clusters when replaying
+        replay = get_replay_source()
+        if replay:
+            logger.info(f"Replaying recorded logs from {replay.path}")
+            self.contexts = replay.contexts()
+            pods_with_ips = replay.pods_with_ips(self.excluded_namespaces)
+            inventory_version = None
+        else:
+            # Contexts removed from the contexts file stop their pod watch
+            pod_inventory.retain(self.contexts)
+            # Read before the pods, so that a change made meanwhile shows in the next cycle
+            inventory_version = (pod_inventory.versions(self.contexts), frozenset(self.excluded_namespaces))
+            pods_with_ips = get_all_pods_with_ips_in_namespaces(self.excluded_namespaces, self.contexts)
 
         # Display the contents of the pods_with_ips dictionary
         logger.debug("Pods with IP addresses by namespace:")
@@ -274,47 +521,94 @@ class K8sCommunicationGraph:
                  logger.debug(f"  Pod Name: {pod_name}, IP Address: {pod_ip} in namespace {ns}")
 
         #logger.debug(f"Pods with IPs: {pods_with_ips}")
+        namespaces_by_context = {}
+        followed_namespaces = set()
         for context in self.contexts:
-            # Get the kubeconfig for this context
-            kubeconfig = self.context_to_kubeconfig.get(context)
-            
-            namespaces = get_namespaces(context, self.excluded_namespaces, self.context_to_kubeconfig.get(context))
+            if replay:
+                namespaces = replay.namespaces(context, self.excluded_namespaces)
+            else:
+                namespaces = get_inventory_namespaces(context, self.excluded_namespaces)
+            namespaces_by_context[context] = namespaces
+            followed_namespaces.update((context, namespace) for namespace in namespaces)
         
-            # Initialize node_counts dictionary for tracking service counts per namespace
-            self.node_counts = {}
+        # Initialize node_counts dictionary for tracking service counts per namespace
+        self.node_counts = {}
         
-            # Process namespaces in parallel using a thread pool
-            max_workers = min(MAX_WORKER_THREADS, len(namespaces))
-            logger.info(f"Using {max_workers} worker threads for parallel processing for context {context}")
-            
-            results = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-                # Submit tasks to the thread pool
-                future_to_namespace = {
-                    executor.submit(self.process_namespace_threaded, context, namespace, kubeconfig, all_namespaces, pods_with_ips): namespace 
-                    #for namespace in non_excluded_namespaces
-                    for namespace in namespaces
-                }
+        # Pick up the changes of the source rules file before parsing
+        reload_source_rules()
+        
+        # Parse in worker processes, which receive the pods and the rules when they change
+        if not self.skip_logs:
+            start_parse_pool(pods_with_ips, all_namespaces, inventory_version)
+        
+        # Size the fetches of this cycle from the traffic learned in the previous ones
+        if ADAPTIVE_TAIL and LOG_COLLECTION_MODE == "tail" and not self.skip_logs and not replay:
+            tail_sizer.plan(followed_namespaces)
+        
+        # All contexts are collected together; the streaming mode has nothing to fetch
+        if replay:
+            completed_namespaces = self.collect_namespaces_threaded(namespaces_by_context, all_namespaces, pods_with_ips, replay)
+        elif COLLECTION_RUNTIME == "asyncio" and not self.skip_logs and LOG_COLLECTION_MODE != "stream":
+            completed_namespaces = self.collect_namespaces_async(namespaces_by_context, all_namespaces, pods_with_ips)
+        else:
+            completed_namespaces = self.collect_namespaces_threaded(namespaces_by_context, all_namespaces, pods_with_ips)
+        
+        # Merge each result as soon as it completes, while the other contexts are still collecting
+        completed = 0
+        for context, namespace, result, error in completed_namespaces:
+            if error is not None:
+                logger.error(f"Namespace {namespace} in context {context} generated an exception: {error}")
+                continue
+            logger.info(f"Completed processing namespace: {namespace} for context {context}")
+            self.merge_thread_results([result])
+            completed += 1
+        logger.info(f"Merged results from {completed} namespaces over {len(self.contexts)} contexts")
+        
+        # Remove the edges that were not reported for GRAPH_EDGE_TTL seconds
+        self.expire_edges(time.time() - GRAPH_EDGE_TTL)
+        
+        logger.info(f"Graph building complete in {time.time() - started:.2f}s: {len(self.graph.nodes())} nodes, {len(self.graph.edges())} edges")
+        logger.info(f"Simplified graph created: {len(self.simplified_graph.nodes())} nodes, {len(self.simplified_graph.edges())} edges")
+
+        # Stop the followers of namespaces that were deleted or excluded
+        if LOG_COLLECTION_MODE == "stream" and not replay:
+            log_followers.retain(followed_namespaces)
+    
+    def expire_edges(self, cutoff):
+        """Remove the edges last reported before cutoff, and the nodes left without edges.
+        
+        Args:
+            cutoff (float): Time before which an edge is expired
             
-                # Collect results as they complete
-                for future in concurrent.futures.as_completed(future_to_namespace):
-                    namespace = future_to_namespace[future]
-                    try:
-                        result = future.result()
-                        results.append(result)
-                        logger.info(f"Completed processing namespace: {namespace} for context {context}")
-                    except Exception as exc:
-                        logger.error(f"Namespace {namespace} in context {context} generated an exception: {exc}")
-        
-            # Merge results from threaded processing
-            logger.info(f"Merging results from {len(results)} threads...")
-            self.merge_thread_results(results)
-        
-            logger.info("Creating simplified graph...")
-            self.simplified_graph = create_simplified_graph(self.graph, self.node_to_namespace, self.node_to_context)
-        
-            logger.info(f"Graph building complete: {len(self.graph.nodes())} nodes, {len(self.graph.edges())} edges for context {context}")
-            logger.info(f"Simplified graph created: {len(self.simplified_graph.nodes())} nodes, {len(self.simplified_graph.edges())} edges for context {context}")
+        Returns:
+            int: Number of edges removed
+        """
+        expired = 0
+        with self.graph_lock, self.http_host_counts_lock:
+            while self.edge_last_seen:
+                edge, seen = next(iter(self.edge_last_seen.items()))
+                if seen >= cutoff:
+                    break
+                del self.edge_last_seen[edge]
+                source, target = edge
+                if self.graph.has_edge(source, target):
+                    self.graph.remove_edge(source, target)
+                self.simplified.remove_edge(source, target)
+                self.edge_latency.pop(edge, None)
+                self.edge_routes.pop(edge, None)
+                self._edge_stats_cycle.pop(edge, None)
+                for node in (source, target):
+                    if node in self.graph and not self.graph.degree(node):
+                        self.graph.remove_node(node)
+                        self.node_to_context.pop(node, None)
+                        namespace = self.node_to_namespace.get(node, node)
+                        if namespace not in self.simplified_graph:
+                            self.http_host_counts.pop(namespace, None)
+                            self.namespace_pod_counts.pop(namespace, None)
+                expired += 1
+        if expired:
+            logger.info(f"Removed {expired} edges not reported for {GRAPH_EDGE_TTL}s")
+        return expired
     
     def get_auth_value_for_node(self, node):
         """Retrieve the auth value for a given node."""
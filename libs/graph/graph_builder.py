@@ -57,6 +57,119 @@ def create_simplified_graph(graph, node_to_namespace, node_to_context=None):
     
     return simplified_graph
 
+class SimplifiedGraph:
+    """The simplified graph of a long-lived graph, updated edge by edge.
+    
+    Produces the same graph as create_simplified_graph, but each change of an edge of the
+    full graph costs a constant number of updates, so that a cycle costs in proportion to
+    the edges it touched. The namespace of a node is read when its first edge is added.
+    """
+    
+    def __init__(self, node_to_namespace, node_to_context=None):
+        self.graph = nx.DiGraph()
+        self.node_to_namespace = node_to_namespace
+        self.node_to_context = node_to_context
+        self._weights = {}  # Weight of each edge of the full graph
+        self._degrees = {}  # Number of edges of each node of the full graph
+        self._members = defaultdict(dict)  # Nodes of each namespace, in order of appearance
+        self._namespace_edges = {}  # (source_ns, target_ns): [weight, number of edges]
+        self.changed = set()  # Namespaces whose node changed since take_changes()
+        self.changed_edges = set()  # Namespace edges added, updated or removed since take_changes()
+    
+    def _add_node(self, node):
+        self._degrees[node] = self._degrees.get(node, 0) + 1
+        if self._degrees[node] > 1:
+            return
+        namespace = self.node_to_namespace.get(node, node)
+        members = self._members[namespace]
+        members[node] = None
+        self._update_namespace(namespace, members)
+    
+    def _remove_node(self, node):
+        self._degrees[node] -= 1
+        if self._degrees[node]:
+            return
+        del self._degrees[node]
+        namespace = self.node_to_namespace.get(node, node)
+        members = self._members[namespace]
+        members.pop(node, None)
+        if members:
+            self._update_namespace(namespace, members)
+        else:
+            del self._members[namespace]
+            if namespace in self.graph:
+                self.graph.remove_node(namespace)
+            self.changed.add(namespace)
+    
+    def _update_namespace(self, namespace, members):
+        nodes = list(members)
+        context = None
+        if self.node_to_context and nodes:
+            context = self.node_to_context.get(nodes[0])
+        self.graph.add_node(namespace, size=len(nodes), original_nodes=nodes, context=context)
+        self.changed.add(namespace)
+    
+    def _namespace_edge(self, source, target):
+        """Return the namespace edge of an edge, None for the self-loops that are skipped."""
+        source_ns = self.node_to_namespace.get(source, source)
+        target_ns = self.node_to_namespace.get(target, target)
+        if source_ns == target_ns and source_ns != "external":
+            return None
+        return source_ns, target_ns
+    
+    def _add_weight(self, edge, weight, edges):
+        totals = self._namespace_edges.setdefault(edge, [0, 0])
+        totals[0] += weight
+        totals[1] += edges
+        if totals[1]:
+            self.graph.add_edge(*edge, weight=totals[0])
+        else:
+            del self._namespace_edges[edge]
+            if self.graph.has_edge(*edge):
+                self.graph.remove_edge(*edge)
+        # The degree of both namespaces changes with the edge
+        self.changed.update(edge)
+        self.changed_edges.add(edge)
+    
+    def set_edge(self, source, target, weight):
+        """Add an edge of the full graph, or update its weight."""
+        previous = self._weights.get((source, target))
+        self._weights[(source, target)] = weight
+        if previous is None:
+            self._add_node(source)
+            if target != source:
+                self._add_node(target)
+        edge = self._namespace_edge(source, target)
+        if edge is not None and previous != weight:
+            self._add_weight(edge, weight - (previous or 0), 1 if previous is None else 0)
+    
+    def remove_edge(self, source, target):
+        """Remove an edge of the full graph."""
+        previous = self._weights.pop((source, target), None)
+        if previous is None:
+            return
+        edge = self._namespace_edge(source, target)
+        if edge is not None:
+            self._add_weight(edge, -previous, -1)
+        self._remove_node(source)
+        if target != source:
+            self._remove_node(target)
+    
+    def touch(self, namespace):
+        """Mark the node of a namespace as changed, such as when its counts were updated."""
+        self.changed.add(namespace)
+    
+    def take_changes(self):
+        """Return and reset the changes since the previous call.
+        
+        Returns:
+            tuple: (namespaces whose node changed, namespace edges that changed), the nodes and
+            edges that are no longer in the graph being removed ones
+        """
+        changed, self.changed = self.changed, set()
+        changed_edges, self.changed_edges = self.changed_edges, set()
+        return changed, changed_edges
+
 def set_logger(log_instance):
     """Set the global logger."""
     global logger
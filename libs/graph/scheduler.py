@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Fair multi-context task scheduler for Kubernetes Communications Graph Visualizer
+
+Runs the namespace tasks of every context on one shared thread pool. Each context has
+its own queue and concurrency limit, and free workers are handed to the contexts in
+round-robin order, so a refresh takes about as long as the slowest single context
+instead of the sum of all of them.
+"""
+
+import concurrent.futures
+import functools
+import queue
+import threading
+from collections import deque
+
+from config.constants import MAX_WORKER_THREADS, MAX_WORKERS_PER_CONTEXT
+from libs.parsing.concurrency import collection_slots
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+class FairScheduler:
+    """Global work queue with per-context concurrency limits and round-robin dispatch."""
+
+    def __init__(self, max_workers=MAX_WORKER_THREADS, context_limit=MAX_WORKERS_PER_CONTEXT, slots=collection_slots):
+        """Initialize the scheduler.
+
+        Args:
+            max_workers (int): Size of the shared thread pool
+            context_limit (int or callable): Maximum number of in-flight tasks per context,
+                or a function of the context returning it (re-evaluated at every dispatch)
+            slots (CollectionSlots): The in-flight counts of the contexts, shared with the
+                replica readers the tasks start
+        """
+        self.max_workers = max_workers
+        self.context_limit = context_limit
+        self.slots = slots
+        self._queues = {}  # context -> deque of (label, fn, args), in submission order of the contexts
+        # Re-entrant: a task that is already done runs its completion callback in the dispatching thread
+        self._lock = threading.RLock()
+
+    def submit(self, context, label, fn, *args):
+        """Queue a task for a context.
+
+        Args:
+            context (str): The context the task belongs to
+            label: A label returned with the result (e.g. the namespace)
+            fn (callable): The task
+            *args: Arguments for the task
+        """
+        self._queues.setdefault(context, deque()).append((label, fn, args))
+
+    def _limit(self, context):
+        """Return the current concurrency limit of a context."""
+        limit = self.context_limit(context) if callable(self.context_limit) else self.context_limit
+        return max(1, limit)
+
+    def run(self):
+        """Run every queued task and yield the results as they complete.
+
+        Free workers are refilled from the completion callbacks of the tasks, in the
+        worker threads, so the pool keeps fetching while the caller merges a result.
+
+        Yields:
+            tuple: (context, label, future) for each completed task
+        """
+        total = sum(len(pending) for pending in self._queues.values())
+        if not total:
+            return
+        self._contexts = list(self._queues)
+        self._running = 0
+        self._next_context = 0
+        self._completed = queue.Queue()
+        logger.info(f"Scheduling {total} tasks over {len(self._contexts)} contexts on {self.max_workers} workers")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            self._executor = executor
+            try:
+                with self._lock:
+                    self._dispatch()
+                for _ in range(total):
+                    yield self._completed.get()
+            finally:
+                # Tasks not started yet are dropped if the caller stops early
+                with self._lock:
+                    for pending in self._queues.values():
+                        pending.clear()
+        self._queues.clear()
+        self._executor = None
+
+    def _dispatch(self):
+        """Hand free workers to the contexts in turn, one task at a time (called with the lock held)."""
+        contexts = self._contexts
+        while self._running < self.max_workers:
+            for offset in range(len(contexts)):
+                context = contexts[(self._next_context + offset) % len(contexts)]
+                pending = self._queues[context]
+                if pending and self.slots.try_acquire(context, self._limit(context)):
+                    label, fn, args = pending.popleft()
+                    self._running += 1
+                    self._next_context = (self._next_context + offset + 1) % len(contexts)
+                    future = self._executor.submit(fn, *args)
+                    future.add_done_callback(functools.partial(self._on_done, context, label))
+                    break
+            else:
+                return
+
+    def _on_done(self, context, label, future):
+        """Release the slot of a finished task, refill the free workers and hand the result to run()."""
+        with self._lock:
+            self.slots.release(context)
+            self._running -= 1
+            try:
+                self._dispatch()
+            except Exception as e:
+                # Never leave run() waiting: the remaining tasks are dispatched by the next completion
+                logger.error(f"Failed to dispatch tasks after {label} in context {context}: {e}")
+        self._completed.put((context, label, future))
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Asyncio log collector for Kubernetes Communications Graph Visualizer
+
+Fetches the logs of many namespaces concurrently on a single event loop, with async
+kubectl subprocesses or async HTTP requests to the API server, instead of spending a
+whole OS thread per in-flight namespace. Each context has its own concurrency limit, and every
+finished buffer is handed to a small pool of parser threads.
+"""
+
+import asyncio
+import concurrent.futures
+import subprocess
+from urllib.parse import urlencode
+
+from config.constants import (COLLECTION_BACKEND, REPLICA_COLLECTION, API_REQUEST_TIMEOUT,
+                              ASYNC_MAX_CONCURRENCY_PER_CONTEXT, MAX_WORKER_THREADS)
+from libs.parsing.kube_api import KubeApiError, get_api_client, pod_log_request
+from libs.parsing.logs import get_logs_cursor, get_logs_window, observe_logs_window, apply_logs_cursor, build_logs_command
+from libs.parsing.concurrency import timed_fetch
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+class AsyncApiConnectionPool:
+    """Keep-alive HTTP/1.1 connections to one API server, for use on one event loop."""
+
+    def __init__(self, client):
+        """Initialize the pool.
+
+        Args:
+            client (KubeApiClient): The synchronous client providing the address, TLS context and credentials
+        """
+        self.client = client
+        self._idle = []
+
+    async def _connect(self):
+        """Open a new connection to the API server."""
+        return await asyncio.wait_for(
+            asyncio.open_connection(self.client.host, self.client.port, ssl=self.client.ssl_context),
+            API_REQUEST_TIMEOUT)
+
+    async def get(self, path, params=None, fresh=False):
+        """Perform a GET request and return the response body.
+
+        A pooled connection that turns out to be closed is replaced once by a new one.
+
+        Args:
+            path (str): API path
+            params (dict, optional): Query parameters
+            fresh (bool): Always open a new connection instead of reusing an idle one
+        """
+        reused = bool(self._idle) and not fresh
+        try:
+            reader, writer = self._idle.pop() if reused else await self._connect()
+        except (OSError, asyncio.TimeoutError) as e:
+            raise KubeApiError(None, f"cannot connect to the API server of context {self.client.context}: {e}")
+        try:
+            status, body, keep_alive = await asyncio.wait_for(
+                self._request(reader, writer, path, params), API_REQUEST_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            writer.close()
+            if reused:
+                return await self.get(path, params, fresh=True)
+            raise KubeApiError(None, f"request to {path} failed in context {self.client.context}: {e}")
+        except asyncio.TimeoutError:
+            writer.close()
+            raise KubeApiError(None, f"request to {path} timed out in context {self.client.context}")
+
+        if keep_alive:
+            self._idle.append((reader, writer))
+        else:
+            writer.close()
+        if status >= 400:
+            raise KubeApiError(status, body.decode(errors='replace')[:500])
+        return body
+
+    async def _request(self, reader, writer, path, params):
+        """Send a request and read the whole response.
+
+        Returns:
+            tuple: (status, body, keep_alive)
+        """
+        url = self.client.base_path + path
+        if params:
+            url += "?" + urlencode(params)
+        headers = dict(self.client.headers, Host=self.client.host, Connection="keep-alive")
+        request = f"GET {url} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in headers.items()) + "\r\n"
+        writer.write(request.encode())
+        await writer.drain()
+
+        status_line = await reader.readline()
+        if not status_line:
+            raise ValueError("connection closed by the server")
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        keep_alive = response_headers.get("connection", "").lower() != "close"
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await reader.readline()).split(b';')[0], 16)
+                if size == 0:
+                    # Skip the optional trailers up to the final empty line
+                    while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                        pass
+                    break
+                chunks.append(await reader.readexactly(size))
+                await reader.readexactly(2)
+            body = b"".join(chunks)
+        elif "content-length" in response_headers:
+            body = await reader.readexactly(int(response_headers["content-length"]))
+        else:
+            body = await reader.read()
+            keep_alive = False
+        return status, body, keep_alive
+
+    def close(self):
+        """Close every idle connection."""
+        for reader, writer in self._idle:
+            writer.close()
+        self._idle.clear()
+
+
+class ContextSlots:
+    """Async counterpart of a semaphore whose size may change between acquisitions."""
+
+    def __init__(self, context, limit):
+        """Initialize the slots.
+
+        Args:
+            context (str): The context the slots belong to
+            limit (int or callable): Number of slots, or a function of the context returning it
+        """
+        self.context = context
+        self.limit = limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    def _size(self):
+        """Return the current number of slots."""
+        return max(1, self.limit(self.context) if callable(self.limit) else self.limit)
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self._size())
+            self.in_flight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+
+class AsyncLogCollector:
+    """Collects the logs of many namespaces concurrently and hands each buffer to a parser."""
+
+    def __init__(self, concurrency_per_context=ASYNC_MAX_CONCURRENCY_PER_CONTEXT, parser_threads=MAX_WORKER_THREADS):
+        """Initialize the collector.
+
+        Args:
+            concurrency_per_context (int or callable): Maximum number of in-flight log fetches per context,
+                or a function of the context returning it (re-evaluated whenever a fetch starts)
+            parser_threads (int): Number of threads running the parser on finished buffers
+        """
+        self.concurrency_per_context = concurrency_per_context
+        self.parser_threads = parser_threads
+
+    def collect(self, targets, parser):
+        """Fetch the logs of every target and parse them as they arrive.
+
+        Args:
+            targets (list): (context, namespace, pod_names, kubeconfig) tuples; the logs of the pods
+                of a target are fetched concurrently and merged into one buffer
+            parser (callable): parser(context, namespace, logs) run in a parser thread for each buffer
+
+        Returns:
+            list: (context, namespace, result, error) tuples, with error None on success
+        """
+        if not targets:
+            return []
+        return asyncio.run(self._collect(targets, parser))
+
+    async def _collect(self, targets, parser):
+        """Run every fetch on the event loop, then wait for the parsers."""
+        slots = {}
+        pools = {}
+        loop = asyncio.get_running_loop()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.parser_threads) as parser_executor:
+            async def fetch(slot, context, namespace, pod_name, kubeconfig, replicas):
+                async with slot:
+                    return await self._fetch(pools, context, namespace, pod_name, kubeconfig, replicas)
+
+            async def process(context, namespace, pod_names, kubeconfig):
+                slot = slots.get(context)
+                if slot is None:
+                    slot = slots[context] = ContextSlots(context, self.concurrency_per_context)
+                try:
+                    outputs = await asyncio.gather(*(fetch(slot, context, namespace, pod_name, kubeconfig, len(pod_names))
+                                                     for pod_name in pod_names), return_exceptions=True)
+                    errors = [output for output in outputs if isinstance(output, Exception)]
+                    if len(errors) == len(outputs):
+                        raise errors[0]
+                    for error in errors:
+                        logger.error(f"In context {context}, error fetching the logs of a replica in namespace {namespace}: {error}")
+                    logs = "\n".join(output.rstrip("\n") for output in outputs if isinstance(output, str) and output)
+                    observe_logs_window(context, namespace, logs.count("\n") + 1 if logs else 0, len(logs))
+                    result = await loop.run_in_executor(parser_executor, parser, context, namespace, logs)
+                    return context, namespace, result, None
+                except Exception as e:
+                    return context, namespace, None, e
+
+            try:
+                results = await asyncio.gather(*(process(*target) for target in targets))
+            finally:
+                for pool in pools.values():
+                    pool.close()
+        logger.info(f"Asynchronously collected logs of {len(targets)} namespaces over {len(slots)} contexts")
+        return results
+
+    async def _fetch(self, pools, context, namespace, pod_name, kubeconfig, replicas=1):
+        """Fetch the logs of one pod with the configured backend."""
+        if COLLECTION_BACKEND == "api":
+            cursor_key, since_time = get_logs_cursor(context, namespace, pod_name)
+            tail_lines, since_seconds = get_logs_window(context, namespace, replicas) if not since_time else (None, None)
+            pool = pools.get(context)
+            if pool is None:
+                pool = pools[context] = AsyncApiConnectionPool(get_api_client(context, kubeconfig))
+            path, params = pod_log_request(namespace, pod_name, tail_lines, since_time,
+                                           timestamps=cursor_key is not None, since_seconds=since_seconds)
+            with timed_fetch(context):
+                body = await pool.get(path, params)
+            output = body.decode('utf-8', errors='replace')
+            return apply_logs_cursor(cursor_key, output)
+
+        target = pod_name if REPLICA_COLLECTION else "deployment/" + namespace
+        cursor_key, since_time = get_logs_cursor(context, namespace, target)
+        tail_lines, since_seconds = get_logs_window(context, namespace, replicas) if not since_time else (None, None)
+        cmd = build_logs_command(context, namespace, kubeconfig, since_time, timestamps=cursor_key is not None, target=target,
+                                 tail_lines=tail_lines, since_seconds=since_seconds)
+        with timed_fetch(context):
+            process = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            stdout, stderr = await process.communicate()
+            if process.returncode:
+                raise subprocess.CalledProcessError(process.returncode, cmd, stdout, stderr)
+        output = stdout.decode('utf-8', errors='replace')
+        logger.debug(f"In context {context}, fetched {len(output)} bytes of logs from {target} in namespace {namespace}")
+        return apply_logs_cursor(cursor_key, output)
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
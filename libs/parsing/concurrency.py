@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Adaptive collection concurrency for Kubernetes Communications Graph Visualizer
+
+Adjusts the number of in-flight log collection tasks of each context from the observed
+latency of the kubectl calls and API requests (AIMD: the limit grows by about one per
+round of successful fetches, and is halved when a fetch is throttled, fails with a 5xx
+or a timeout, or is slower than the latency target; other errors are only counted).
+The limits and their history are kept for tuning.
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+
+from config.constants import (ADAPTIVE_CONCURRENCY, ADAPTIVE_MIN_WORKERS_PER_CONTEXT, ADAPTIVE_MAX_WORKERS_PER_CONTEXT,
+                              ADAPTIVE_LATENCY_TARGET, ADAPTIVE_DECREASE_FACTOR, ADAPTIVE_HISTORY_SIZE,
+                              MAX_WORKERS_PER_CONTEXT)
+from libs.parsing.kube_api import KubeApiError
+
+# Global logger (will be set by the main script)
+logger = None
+
+# Fragments of kubectl error output that mean the API server is throttling us
+THROTTLING_MARKERS = ("TooManyRequests", "Too Many Requests", "429", "rate limit", "throttl")
+
+# Fragments of kubectl error output that mean the API server is overloaded or too slow to answer
+OVERLOAD_MARKERS = ("InternalError", "ServiceUnavailable", "Service Unavailable", "currently unable to handle",
+                    "(Timeout)", "timed out", "i/o timeout", "handshake timeout", "deadline exceeded")
+
+
+def _error_output(error):
+    """Return the stderr of a failed kubectl call as text."""
+    output = error.stderr or ""
+    if isinstance(output, bytes):
+        output = output.decode(errors='replace')
+    return output
+
+
+def is_throttling_error(error):
+    """Return True if a failed kubectl call or API request was rejected for rate limiting."""
+    if isinstance(error, KubeApiError):
+        return error.status == 429
+    if isinstance(error, subprocess.CalledProcessError):
+        return any(marker in _error_output(error) for marker in THROTTLING_MARKERS)
+    return False
+
+
+def is_overload_error(error):
+    """Return True if a failed kubectl call or API request means the API server is overloaded.
+
+    That is a 5xx answer or a timeout. Client errors such as a pod that is gone or a container
+    that is not started yet say nothing about the load of the server.
+    """
+    if isinstance(error, KubeApiError):
+        if error.status is None:
+            return "timed out" in error.message
+        return error.status >= 500
+    if isinstance(error, subprocess.CalledProcessError):
+        return any(marker in _error_output(error) for marker in OVERLOAD_MARKERS)
+    return isinstance(error, (subprocess.TimeoutExpired, TimeoutError))
+
+
+class ContextConcurrency:
+    """AIMD state of one context."""
+
+    def __init__(self, context, initial_limit):
+        self.context = context
+        self.limit = float(initial_limit)
+        self.latency = None  # Exponentially weighted moving average, in seconds
+        self.samples = 0
+        self.errors = 0
+        self.throttled = 0
+        self.since_decrease = 0
+        self.history = deque(maxlen=ADAPTIVE_HISTORY_SIZE)
+        self.history.append((time.time(), int(self.limit), "initial"))
+
+
+class AdaptiveConcurrencyController:
+    """Per-context concurrency limits driven by the outcome of every fetch."""
+
+    def __init__(self, initial_limit=MAX_WORKERS_PER_CONTEXT, min_limit=ADAPTIVE_MIN_WORKERS_PER_CONTEXT,
+                 max_limit=ADAPTIVE_MAX_WORKERS_PER_CONTEXT, latency_target=ADAPTIVE_LATENCY_TARGET,
+                 decrease_factor=ADAPTIVE_DECREASE_FACTOR):
+        """Initialize the controller.
+
+        Args:
+            initial_limit (int): Limit of a context before any observation
+            min_limit (int): Lowest limit a context can be reduced to
+            max_limit (int): Highest limit a context can grow to
+            latency_target (float): Fetch latency in seconds above which the limit is reduced
+            decrease_factor (float): Factor applied to the limit on throttling, 5xx errors, timeouts or slow fetches
+        """
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target = latency_target
+        self.decrease_factor = decrease_factor
+        self._contexts = {}
+        self._lock = threading.Lock()
+
+    def _state(self, context):
+        """Return the state of a context, creating it on first use (called with the lock held)."""
+        state = self._contexts.get(context)
+        if state is None:
+            initial = min(max(self.initial_limit, self.min_limit), self.max_limit)
+            state = self._contexts[context] = ContextConcurrency(context, initial)
+        return state
+
+    def limit(self, context):
+        """Return the current number of in-flight collection tasks allowed for a context."""
+        with self._lock:
+            return int(self._state(context).limit)
+
+    def record(self, context, latency, error=None):
+        """Record the outcome of one fetch and adjust the limit of its context.
+
+        Args:
+            context (str): The context of the fetch
+            latency (float): Duration of the fetch in seconds
+            error (Exception, optional): The error of a failed fetch
+        """
+        throttled = error is not None and is_throttling_error(error)
+        with self._lock:
+            state = self._state(context)
+            state.samples += 1
+            state.since_decrease += 1
+            state.latency = latency if state.latency is None else 0.8 * state.latency + 0.2 * latency
+            if throttled:
+                state.throttled += 1
+                reason = "throttled"
+            elif error is not None:
+                state.errors += 1
+                if not is_overload_error(error):
+                    # A client error (NotFound, container not started...) leaves the limit unchanged
+                    return
+                reason = "overload"
+            elif latency > self.latency_target:
+                reason = f"latency {latency:.2f}s"
+            else:
+                reason = None
+
+            previous = int(state.limit)
+            if reason is None:
+                # Additive increase: about +1 once every task of the current limit succeeded
+                state.limit = min(self.max_limit, state.limit + 1 / state.limit)
+                reason = "increase"
+            elif state.since_decrease >= state.limit:
+                # Multiplicative decrease, at most once per round so that the tasks that were
+                # already in flight under the old limit do not reduce it again
+                state.limit = max(self.min_limit, state.limit * self.decrease_factor)
+                state.since_decrease = 0
+            else:
+                return
+
+            if int(state.limit) != previous:
+                state.history.append((time.time(), int(state.limit), reason))
+                log = logger.info if int(state.limit) < previous else logger.debug
+                log(f"Collection concurrency of context {context} changed from {previous} to {int(state.limit)} ({reason})")
+
+    def snapshot(self):
+        """Return the current limits, statistics and limit history of every context.
+
+        Returns:
+            dict: {context: {"limit", "latency", "samples", "errors", "throttled", "history"}}
+        """
+        with self._lock:
+            return {
+                context: {
+                    "limit": int(state.limit),
+                    "latency": round(state.latency, 3) if state.latency is not None else None,
+                    "samples": state.samples,
+                    "errors": state.errors,
+                    "throttled": state.throttled,
+                    "history": [{"time": t, "limit": limit, "reason": reason} for t, limit, reason in state.history],
+                }
+                for context, state in self._contexts.items()
+            }
+
+
+class CollectionSlots:
+    """In-flight log fetches of each context, shared by the FairScheduler and the replica readers.
+
+    A namespace task holds one slot while it runs; the readers of its other replicas take
+    extra slots of the same context, so they count against the same limit.
+    """
+
+    def __init__(self):
+        self._in_use = {}
+        self._lock = threading.Lock()
+
+    def try_acquire(self, context, limit):
+        """Take a slot of a context if fewer than limit are in use.
+
+        Returns:
+            bool: True if the slot was taken and must be released
+        """
+        with self._lock:
+            in_use = self._in_use.get(context, 0)
+            if in_use >= limit:
+                return False
+            self._in_use[context] = in_use + 1
+            return True
+
+    def release(self, context):
+        """Give back a slot taken by try_acquire."""
+        with self._lock:
+            self._in_use[context] -= 1
+
+    def in_use(self, context):
+        """Return the number of slots of a context currently taken."""
+        with self._lock:
+            return self._in_use.get(context, 0)
+
+
+def context_limit(context):
+    """Return the number of in-flight fetches allowed for a context: its adaptive limit, or MAX_WORKERS_PER_CONTEXT."""
+    if ADAPTIVE_CONCURRENCY:
+        return concurrency_controller.limit(context)
+    return MAX_WORKERS_PER_CONTEXT
+
+
+class timed_fetch:
+    """Context manager recording the latency and outcome of a fetch in the controller.
+
+    Errors are recorded and re-raised. Nothing is recorded when ADAPTIVE_CONCURRENCY is off.
+    """
+
+    def __init__(self, context):
+        self.context = context
+
+    def __enter__(self):
+        self.started = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if ADAPTIVE_CONCURRENCY and (exc is None or isinstance(exc, Exception)):
+            concurrency_controller.record(self.context, time.monotonic() - self.started, exc)
+        return False
+
+
+def timed_stream(context, lines):
+    """Yield the lines of a streamed fetch, recording its latency and outcome in the controller.
+
+    The latency of a stream is the time to its first line (or to its end if it is empty),
+    so that the time the consumer spends parsing the lines is not counted.
+    """
+    started = time.monotonic()
+    recorded = not ADAPTIVE_CONCURRENCY
+    try:
+        for line in lines:
+            if not recorded:
+                concurrency_controller.record(context, time.monotonic() - started)
+                recorded = True
+            yield line
+    except Exception as e:
+        if ADAPTIVE_CONCURRENCY:
+            concurrency_controller.record(context, time.monotonic() - started, e)
+        raise
+    if not recorded:
+        concurrency_controller.record(context, time.monotonic() - started)
+
+
+# Adaptive concurrency limits of the log collection, one per context
+concurrency_controller = AdaptiveConcurrencyController()
+
+# In-flight fetches of each context, counted against context_limit
+collection_slots = CollectionSlots()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
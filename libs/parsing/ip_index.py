@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+IP address indexes for Kubernetes Communications Graph Visualizer
+
+parse_logs attributes each request to a source from its remote address. Instead of
+scanning every pod of every namespace for each log line, the pods are indexed by IP
+once per inventory snapshot, and the special address ranges of the source rules are
+looked up in a hashed prefix table, so the attribution of a line costs a few
+dictionary lookups.
+"""
+
+import ipaddress
+import threading
+import time
+
+# Global logger (will be set by the main script)
+logger = None
+
+class IpIndex:
+    """Reverse index of the pods by IP address."""
+
+    def __init__(self, pods_with_ips):
+        """Build the index.
+
+        When several pods share an address (e.g. host network pods), the first one in
+        the iteration order of pods_with_ips wins, like the former linear scan.
+
+        Args:
+            pods_with_ips (dict): {namespace: {pod name: pod info}} as returned by get_all_pods_with_ips_in_namespaces
+        """
+        self.pods_with_ips = pods_with_ips
+        self._by_ip = {}
+        for namespace, pods in (pods_with_ips or {}).items():
+            for pod_name, pod_info in pods.items():
+                pod_ip = pod_info.get("ip")
+                if pod_ip:
+                    self._by_ip.setdefault(pod_ip, (namespace, pod_name, pod_info.get("context")))
+
+    def lookup(self, ip):
+        """Return the (namespace, pod name, context) of an address, or None if no pod has it."""
+        return self._by_ip.get(ip)
+
+    def __len__(self):
+        return len(self._by_ip)
+
+
+class PrefixTable:
+    """Labels of address ranges, looked up with one hash lookup per prefix length.
+
+    A range is either a CIDR block ("10.121.232.0/24", "10.120.1.54/32") or a textual
+    prefix of the dotted address ("172.17.2.5" covers 172.17.2.5 and 172.17.2.50 to
+    172.17.2.59). CIDR blocks are stored as the textual prefixes of the whole octets
+    they cover, so every lookup is a dictionary lookup.
+    """
+
+    def __init__(self, ranges=None):
+        """Initialize the table.
+
+        Args:
+            ranges (dict, optional): {range: label}
+        """
+        self._prefixes = {}
+        self._exact = {}
+        self._lengths = []
+        for address_range, label in (ranges or {}).items():
+            self.add(address_range, label)
+
+    def add(self, address_range, label):
+        """Add a range, raising ValueError if a CIDR block is invalid."""
+        if "/" not in address_range:
+            self._prefixes[address_range] = label
+        else:
+            network = ipaddress.IPv4Network(address_range, strict=False)
+            if network.prefixlen == 32:
+                self._exact[str(network.network_address)] = label
+            else:
+                # Split the block into blocks ending on an octet boundary: "10.1.0.0/23"
+                # becomes the prefixes "10.1.0." and "10.1.1."
+                octets = network.prefixlen // 8 + (network.prefixlen % 8 > 0)
+                for subnet in network.subnets(new_prefix=octets * 8):
+                    prefix = ".".join(str(subnet.network_address).split(".")[:octets])
+                    self._prefixes[prefix + "." if octets else ""] = label
+        # Longest prefixes first, so that the most specific one wins
+        self._lengths = sorted({len(prefix) for prefix in self._prefixes}, reverse=True)
+
+    def lookup(self, ip):
+        """Return the label of an address, or None if it is in no range."""
+        label = self._exact.get(ip)
+        if label is not None:
+            return label
+        for length in self._lengths:
+            label = self._prefixes.get(ip[:length])
+            if label is not None:
+                return label
+        return None
+
+
+_cached_index = None
+_index_lock = threading.Lock()
+
+
+def get_ip_index(pods_with_ips):
+    """Return the IpIndex of a pods_with_ips dictionary.
+
+    The index of the last dictionary is kept, so it is built once per inventory
+    snapshot and shared by every namespace parsed from it.
+    """
+    global _cached_index
+    with _index_lock:
+        if _cached_index is None or _cached_index.pods_with_ips is not pods_with_ips:
+            started = time.time()
+            _cached_index = IpIndex(pods_with_ips)
+            if logger:
+                logger.debug(f"Indexed {len(_cached_index)} pod IPs in {time.time() - started:.3f}s")
+        return _cached_index
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+JSON log line decoding for Kubernetes Communications Graph Visualizer
+
+parse_logs decodes every nginx log line. The decoder uses orjson or pysimdjson when
+one of them is installed, and the standard json module otherwise, and decodes lines
+in batches so that the per-line overhead of the parsing loop is paid once per batch.
+
+Benchmark of the available backends on a recorded log file:
+
+    python -m libs.parsing.json_decoding <file.log>
+"""
+
+import json
+import sys
+import threading
+import time
+
+from config.constants import JSON_DECODER, JSON_DECODE_BATCH_LINES
+
+# Global logger (will be set by the main script)
+logger = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+
+class JsonLineDecoder:
+    """Decodes JSON log lines with one backend."""
+
+    name = "json"
+    errors = (json.JSONDecodeError,)
+
+    def loads(self, line):
+        """Decode one line, raising one of self.errors if it is not valid JSON."""
+        return json.loads(line)
+
+    def decode(self, line):
+        """Decode one line, returning None if it is not valid JSON."""
+        try:
+            return self.loads(line)
+        except self.errors:
+            return None
+
+    def decode_batch(self, lines):
+        """Decode a batch of lines.
+
+        Returns:
+            list: The decoded value of each line, None for the lines that are not valid JSON
+        """
+        loads = self.loads
+        try:
+            return [loads(line) for line in lines]
+        except self.errors:
+            # Decode the lines one by one to find the invalid ones
+            return [self.decode(line) for line in lines]
+
+    def iter_decode(self, lines, batch_lines=JSON_DECODE_BATCH_LINES):
+        """Decode the non-empty lines of an iterable as they arrive, a batch at a time.
+
+        Yields:
+            tuple: (line, decoded value or None if the line is not valid JSON)
+        """
+        batch = []
+        for line in lines:
+            if not line.strip():
+                continue
+            batch.append(line)
+            if len(batch) >= batch_lines:
+                yield from zip(batch, self.decode_batch(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, self.decode_batch(batch))
+
+
+class OrjsonLineDecoder(JsonLineDecoder):
+    """Decoder using orjson."""
+
+    name = "orjson"
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    errors = (json.JSONDecodeError,)
+
+    def __init__(self):
+        self.loads = orjson.loads
+
+
+class SimdjsonLineDecoder(JsonLineDecoder):
+    """Decoder using pysimdjson, with one parser per thread since parsers cannot be shared."""
+
+    name = "simdjson"
+    errors = (ValueError,)
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def loads(self, line):
+        parser = getattr(self._local, "parser", None)
+        if parser is None:
+            parser = self._local.parser = simdjson.Parser()
+        # Convert to Python objects so that the values outlive the parser buffer
+        return parser.parse(line.encode("utf-8") if isinstance(line, str) else line, True)
+
+
+BACKENDS = {
+    "orjson": (OrjsonLineDecoder, lambda: orjson is not None),
+    "simdjson": (SimdjsonLineDecoder, lambda: simdjson is not None),
+    "json": (JsonLineDecoder, lambda: True),
+}
+
+
+def available_backends():
+    """Return the names of the installed backends, fastest first."""
+    return [name for name, (decoder_class, available) in BACKENDS.items() if available()]
+
+
+def create_json_decoder(backend=JSON_DECODER):
+    """Create the decoder of a backend.
+
+    Args:
+        backend (str): "orjson", "simdjson", "json", or "auto" for the fastest installed one
+
+    Returns:
+        JsonLineDecoder: The decoder, the standard json one if the backend is not installed
+    """
+    if backend == "auto":
+        backend = available_backends()[0]
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown JSON decoder backend: {backend}")
+    decoder_class, available = BACKENDS[backend]
+    if not available():
+        if logger:
+            logger.warning(f"JSON decoder backend {backend} is not installed, using the standard json module")
+        decoder_class = JsonLineDecoder
+    return decoder_class()
+
+
+_decoder = None
+
+
+def get_json_decoder():
+    """Return the shared decoder of the JSON_DECODER backend."""
+    global _decoder
+    if _decoder is None:
+        _decoder = create_json_decoder()
+        if logger:
+            logger.info(f"Decoding JSON log lines with {_decoder.name}")
+    return _decoder
+
+
+def benchmark(lines, backends=None, batch_lines=JSON_DECODE_BATCH_LINES, repeat=3):
+    """Measure the decoding throughput of the backends on a list of lines.
+
+    Returns:
+        dict: {backend: best number of lines decoded per second over the runs}
+    """
+    results = {}
+    for name in backends or available_backends():
+        decoder = create_json_decoder(name)
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in decoder.iter_decode(lines, batch_lines):
+                pass
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(lines) / best if best else float("inf")
+    return results
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m libs.parsing.json_decoding <file.log>")
+    with open(sys.argv[1], encoding="utf-8", errors="replace") as f:
+        log_lines = f.read().splitlines()
+    for backend_name, rate in benchmark(log_lines).items():
+        print(f"{backend_name:10} {rate:12,.0f} lines/s")
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Native Kubernetes API client for Kubernetes Communications Graph Visualizer
+
+Talks to the API server directly instead of forking a kubectl process per call.
+One client is kept per context, built from the kubeconfig file of that context in
+KUBE_CONFIG_DIR, and each client keeps a pool of keep-alive connections so the
+kubeconfig parsing and the TLS handshake are paid once rather than on every call.
+"""
+
+import base64
+import http.client
+import json
+import os
+import queue
+import ssl
+import tempfile
+import threading
+from urllib.parse import urlparse, urlencode
+
+import yaml
+
+from config.constants import API_POOL_SIZE, API_REQUEST_TIMEOUT
+
+# Global logger (will be set by the main script)
+logger = None
+
+# One client per context, shared by every caller
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class KubeApiError(Exception):
+    """Raised when the API server answers with an error status or cannot be reached."""
+
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class KubeApiClient:
+    """Minimal Kubernetes API client with a per-context keep-alive connection pool."""
+
+    def __init__(self, context, kubeconfig, pool_size=API_POOL_SIZE, timeout=API_REQUEST_TIMEOUT):
+        """Build the client from a kubeconfig file.
+
+        Args:
+            context (str): The Kubernetes context name
+            kubeconfig (str): Path to the kubeconfig file for this context
+            pool_size (int): Maximum number of idle connections kept open
+            timeout (float): Socket timeout in seconds for regular requests
+        """
+        self.context = context
+        self.kubeconfig = kubeconfig
+        self.timeout = timeout
+        self.headers = {"Accept": "application/json", "User-Agent": "k8s-graph"}
+        self.ssl_context = None
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        try:
+            self._load_kubeconfig(kubeconfig)
+        except KubeApiError:
+            raise
+        except (yaml.YAMLError, KeyError, TypeError, AttributeError, ValueError, OSError) as e:
+            # Malformed YAML, missing CA/token/cert files and bad certificates (ssl.SSLError is an
+            # OSError) are reported like any other API failure so callers skip only this context
+            raise KubeApiError(None, f"Invalid kubeconfig {kubeconfig} for context {context}: {e}")
+
+    def _load_kubeconfig(self, kubeconfig):
+        """Read the server address, TLS settings and credentials from the kubeconfig."""
+        with open(kubeconfig, 'r') as f:
+            config = yaml.safe_load(f)
+
+        base_dir = os.path.dirname(os.path.abspath(kubeconfig))
+        contexts = {c["name"]: c["context"] for c in config.get("contexts", [])}
+        context_entry = contexts.get(self.context) or contexts.get(config.get("current-context"))
+        if not context_entry:
+            raise KubeApiError(None, f"No usable context in kubeconfig {kubeconfig}")
+
+        clusters = {c["name"]: c["cluster"] for c in config.get("clusters", [])}
+        users = {u["name"]: u.get("user", {}) for u in config.get("users", [])}
+        cluster = clusters.get(context_entry.get("cluster"), {})
+        user = users.get(context_entry.get("user"), {}) or {}
+
+        server = urlparse(cluster.get("server", ""))
+        if server.scheme not in ("http", "https") or not server.hostname:
+            raise KubeApiError(None, f"Invalid server address in kubeconfig {kubeconfig}: {cluster.get('server')}")
+        self.scheme = server.scheme
+        self.host = server.hostname
+        self.port = server.port or (443 if server.scheme == "https" else 80)
+        self.base_path = server.path.rstrip('/')
+
+        if self.scheme == "https":
+            self.ssl_context = self._build_ssl_context(cluster, user, base_dir)
+
+        # Bearer token, in order of precedence: static token, token file, OIDC id-token
+        token = user.get("token")
+        if not token and user.get("tokenFile"):
+            with open(os.path.join(base_dir, user["tokenFile"]), 'r') as f:
+                token = f.read().strip()
+        if not token and user.get("auth-provider"):
+            token = user["auth-provider"].get("config", {}).get("id-token")
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+        elif user.get("username") and user.get("password"):
+            credentials = base64.b64encode(f"{user['username']}:{user['password']}".encode()).decode()
+            self.headers["Authorization"] = f"Basic {credentials}"
+        elif user.get("exec"):
+            raise KubeApiError(None, f"exec credential plugins are not supported (kubeconfig {kubeconfig})")
+
+    @staticmethod
+    def _build_ssl_context(cluster, user, base_dir):
+        """Create the SSL context from the cluster CA and the user client certificate."""
+        ssl_context = ssl.create_default_context()
+        if cluster.get("insecure-skip-tls-verify"):
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+        elif cluster.get("certificate-authority-data"):
+            ssl_context.load_verify_locations(
+                cadata=base64.b64decode(cluster["certificate-authority-data"]).decode())
+        elif cluster.get("certificate-authority"):
+            ssl_context.load_verify_locations(
+                cafile=os.path.join(base_dir, cluster["certificate-authority"]))
+
+        # load_cert_chain only accepts files, so inline data goes through temporary files
+        cert_data = user.get("client-certificate-data")
+        key_data = user.get("client-key-data")
+        if cert_data and key_data:
+            temp_paths = []
+            try:
+                for data in (cert_data, key_data):
+                    with tempfile.NamedTemporaryFile(delete=False) as f:
+                        f.write(base64.b64decode(data))
+                        temp_paths.append(f.name)
+                ssl_context.load_cert_chain(temp_paths[0], temp_paths[1])
+            finally:
+                for path in temp_paths:
+                    os.unlink(path)
+        elif user.get("client-certificate") and user.get("client-key"):
+            ssl_context.load_cert_chain(os.path.join(base_dir, user["client-certificate"]),
+                                        os.path.join(base_dir, user["client-key"]))
+        return ssl_context
+
+    def _new_connection(self, timeout=None):
+        """Open a new connection to the API server."""
+        timeout = self.timeout if timeout is None else timeout
+        if self.scheme == "https":
+            return http.client.HTTPSConnection(self.host, self.port, timeout=timeout, context=self.ssl_context)
+        return http.client.HTTPConnection(self.host, self.port, timeout=timeout)
+
+    def _acquire(self):
+        """Take an idle connection from the pool, or open a new one."""
+        try:
+            return self._pool.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def _release(self, conn, response):
+        """Give a connection back to the pool if the server kept it alive."""
+        if response.will_close:
+            conn.close()
+            return
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def _send(self, conn, reused, path, params):
+        """Send a GET request, retrying once on a fresh connection if a pooled one went stale."""
+        url = self.base_path + path
+        if params:
+            url += "?" + urlencode(params)
+        try:
+            conn.request("GET", url, headers=self.headers)
+            return conn, conn.getresponse()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            if not reused:
+                raise
+            conn = self._new_connection(conn.timeout)
+            conn.request("GET", url, headers=self.headers)
+            return conn, conn.getresponse()
+
+    def get(self, path, params=None):
+        """Perform a GET request and return the raw response body.
+
+        Args:
+            path (str): API path, e.g. /api/v1/namespaces
+            params (dict, optional): Query parameters
+
+        Returns:
+            bytes: The response body
+        """
+        conn, reused = self._acquire()
+        try:
+            conn, response = self._send(conn, reused, path, params)
+            body = response.read()
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            raise KubeApiError(None, f"request to {path} failed in context {self.context}: {e}")
+
+        self._release(conn, response)
+        if response.status >= 400:
+            raise KubeApiError(response.status, body.decode(errors='replace')[:500])
+        return body
+
+    def get_json(self, path, params=None):
+        """Perform a GET request and decode the JSON response."""
+        return json.loads(self.get(path, params))
+
+    def iter_lines(self, path, params=None, timeout=None):
+        """Perform a GET request and yield the response body line by line.
+
+        Used for log and watch endpoints whose body can be long or never-ending. The
+        connection stays checked out while the generator is alive; it goes back to the
+        pool once the body has been fully consumed and is closed otherwise.
+
+        Args:
+            path (str): API path
+            params (dict, optional): Query parameters
+            timeout (float, optional): Socket read timeout, defaults to the client timeout
+
+        Yields:
+            str: Each line of the body without its trailing newline
+        """
+        conn = self._new_connection(timeout) if timeout is not None else None
+        reused = False
+        if conn is None:
+            conn, reused = self._acquire()
+        try:
+            conn, response = self._send(conn, reused, path, params)
+        except (http.client.HTTPException, OSError) as e:
+            conn.close()
+            raise KubeApiError(None, f"request to {path} failed in context {self.context}: {e}")
+
+        if response.status >= 400:
+            body = response.read()
+            self._release(conn, response)
+            raise KubeApiError(response.status, body.decode(errors='replace')[:500])
+
+        completed = False
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    completed = True
+                    break
+                yield line.decode('utf-8', errors='replace').rstrip('\r\n')
+        except (http.client.HTTPException, OSError) as e:
+            raise KubeApiError(None, f"stream from {path} interrupted in context {self.context}: {e}")
+        finally:
+            if completed and timeout is None:
+                self._release(conn, response)
+            else:
+                conn.close()
+
+    def close(self):
+        """Close every idle connection in the pool."""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+def get_api_client(context, kubeconfig):
+    """Return the shared API client for a context, creating it on first use.
+
+    Args:
+        context (str): The Kubernetes context
+        kubeconfig (str): Path to the kubeconfig file for this context
+
+    Returns:
+        KubeApiClient: The client for this context
+    """
+    if not kubeconfig:
+        raise KubeApiError(None, f"No kubeconfig available for context {context}")
+    with _clients_lock:
+        client = _clients.get(context)
+        if client is None or client.kubeconfig != kubeconfig:
+            client = KubeApiClient(context, kubeconfig)
+            _clients[context] = client
+            logger.info(f"Created Kubernetes API client for context {context} ({client.scheme}://{client.host}:{client.port})")
+        return client
+
+
+def close_api_clients():
+    """Close the connection pools of every API client."""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
+
+
+def list_namespaces(client):
+    """Return the namespace objects of the cluster."""
+    return client.get_json("/api/v1/namespaces")["items"]
+
+
+def list_pods(client, namespace=None):
+    """Return the pod objects of a namespace, or of the whole cluster if namespace is None."""
+    path = f"/api/v1/namespaces/{namespace}/pods" if namespace else "/api/v1/pods"
+    return client.get_json(path)["items"]
+
+
+def pod_log_request(namespace, pod_name, tail_lines=None, since_time=None, timestamps=False, follow=False, since_seconds=None):
+    """Build the path and query parameters of a pod log request.
+
+    Args:
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        tail_lines (int, optional): Number of lines to fetch from the end of the log
+        since_time (str, optional): RFC3339 timestamp, only lines written after it are returned
+        timestamps (bool): Prefix every line with its RFC3339Nano timestamp
+        follow (bool): Keep the stream open and return new lines as they are written
+        since_seconds (int, optional): Only lines written in the last since_seconds seconds are returned
+
+    Returns:
+        tuple: (path, params)
+    """
+    params = {}
+    if tail_lines is not None:
+        params["tailLines"] = tail_lines
+    if since_time:
+        params["sinceTime"] = since_time
+    elif since_seconds:
+        params["sinceSeconds"] = since_seconds
+    if timestamps:
+        params["timestamps"] = "true"
+    if follow:
+        params["follow"] = "true"
+    return f"/api/v1/namespaces/{namespace}/pods/{pod_name}/log", params
+
+
+def read_pod_log(client, namespace, pod_name, tail_lines=None, since_time=None, timestamps=False, since_seconds=None):
+    """Return the logs of a pod as a string.
+
+    Args:
+        client (KubeApiClient): The API client for the pod's context
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        tail_lines (int, optional): Number of lines to fetch from the end of the log
+        since_time (str, optional): RFC3339 timestamp, only lines written after it are returned
+        timestamps (bool): Prefix every line with its RFC3339Nano timestamp
+        since_seconds (int, optional): Only lines written in the last since_seconds seconds are returned
+    """
+    path, params = pod_log_request(namespace, pod_name, tail_lines, since_time, timestamps, since_seconds=since_seconds)
+    return client.get(path, params).decode('utf-8', errors='replace')
+
+
+def iter_pod_log(client, namespace, pod_name, tail_lines=None, since_time=None, timestamps=False, follow=False, timeout=None,
+                 since_seconds=None):
+    """Yield the logs of a pod line by line, optionally following new lines as they are written.
+
+    Args:
+        client (KubeApiClient): The API client for the pod's context
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        tail_lines (int, optional): Number of lines to fetch from the end of the log
+        since_time (str, optional): RFC3339 timestamp, only lines written after it are returned
+        timestamps (bool): Prefix every line with its RFC3339Nano timestamp
+        follow (bool): Keep the stream open and yield new lines as they are written
+        timeout (float, optional): Socket read timeout, after which the stream is considered stalled
+        since_seconds (int, optional): Only lines written in the last since_seconds seconds are returned
+    """
+    path, params = pod_log_request(namespace, pod_name, tail_lines, since_time, timestamps, follow, since_seconds)
+    return client.iter_lines(path, params, timeout)
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -7,7 +7,8 @@ Kubernetes-related functions for Kubernetes Communications Graph Visualizer
 
 import json
 import subprocess
-from config.constants import EXCLUDED_NS_FILE, KUBE_CONTEXT, KUBE_CONTEXTS_FILE, KUBE_CONFIG_DIR
+from config.constants import EXCLUDED_NS_FILE, KUBE_CONTEXT, KUBE_CONTEXTS_FILE, KUBE_CONFIG_DIR, COLLECTION_BACKEND, REPLICA_FAN_OUT
+from libs.parsing.kube_api import KubeApiError, get_api_client, list_namespaces
 
 # Global logger (will be set by the main script)
 logger = None
@@ -91,8 +92,11 @@ def get_namespaces(context, excluded_namespaces, kubeconfig=None):
         cmd.insert(2, kubeconfig)
 
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        namespaces_data = json.loads(result.stdout)
+        if COLLECTION_BACKEND == "api":
+            namespaces_data = {"items": list_namespaces(get_api_client(context, kubeconfig))}
+        else:
+            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+            namespaces_data = json.loads(result.stdout)
             
         for ns in namespaces_data["items"]:
             namespace = ns["metadata"]["name"]
@@ -106,6 +110,8 @@ def get_namespaces(context, excluded_namespaces, kubeconfig=None):
         logger.debug(f"Command output: {e.stdout}\n{e.stderr}")
     except json.JSONDecodeError as e:
         logger.error(f"Error parsing kubectl output in context {context}: {e}")
+    except KubeApiError as e:
+        logger.error(f"Error querying the API server in context {context}: {e}")
 
     return all_namespaces
 
@@ -202,60 +208,145 @@ def find_web_pod_in_namespace(context, namespace, kubeconfig=None, pods_with_ips
         logger.error(f"In context {context}, error parsing pod data for namespace {namespace}: {e}")
         return None
 
-def get_all_pods_with_ips_in_namespaces(excluded_namespaces, contexts=None):
-    """Get all pods and their IP addresses in a namespace.
+def get_pod_info(pod, context=None):
+    """Extract the IP address, the first container port, the readiness and the owning workload of a pod object.
+    
+    Args:
+        pod (dict): A pod object as returned by kubectl or the API server
+        context (str, optional): The context of the pod
+        
+    Returns:
+        dict: A dictionary with the "ip", "port", "ready", "workload" and "context" of the pod
+    """
+    pod_ip = pod["status"].get("podIP")
+    
+    # Check if the pod has containers and if the first container has ports
+    if "containers" in pod["spec"] and pod["spec"]["containers"]:
+        container = pod["spec"]["containers"][0]
+        if "ports" in container and container["ports"]:
+            pod_port = container["ports"][0].get("containerPort")
+        else:
+            pod_port = None  # Set to None if no ports are defined
+    else:
+        pod_port = None  # Set to None if no containers are defined
+    
+    ready = pod["status"].get("phase") == "Running" and any(
+        condition.get("type") == "Ready" and condition.get("status") == "True"
+        for condition in pod["status"].get("conditions", []))
+    
+    return {"ip": pod_ip, "port": pod_port, "ready": ready, "workload": get_pod_workload(pod), "context": context}
+
+def get_pod_workload(pod):
+    """Return the name of the workload owning a pod.
+    
+    Pods of a Deployment are owned by a ReplicaSet named <deployment>-<pod-template-hash>,
+    so the hash is removed to get the Deployment name.
+    
+    Args:
+        pod (dict): A pod object as returned by kubectl or the API server
+        
+    Returns:
+        str: The workload name, or None for a pod without owner
+    """
+    owners = pod["metadata"].get("ownerReferences") or []
+    if not owners:
+        return None
+    owner = owners[0]
+    name = owner.get("name")
+    template_hash = pod["metadata"].get("labels", {}).get("pod-template-hash")
+    if owner.get("kind") == "ReplicaSet" and template_hash and name.endswith("-" + template_hash):
+        return name[:-len(template_hash) - 1]
+    return name
+
+def find_replica_pods_in_namespace(context, namespace, web_pod, pods_with_ips, fan_out=REPLICA_FAN_OUT):
+    """Find the ready replicas whose logs are collected for a namespace.
+    
+    The replicas are the pods of the deployment named after the namespace, which is
+    what "kubectl logs deployment/<namespace>" reads, or else those of the workload of
+    the web pod.
     
     Args:
         context (str): The Kubernetes context
-        namespace (str): The namespace to retrieve pods from
-        kubeconfig (str, optional): Path to the kubeconfig file
+        namespace (str): The namespace to search in
+        web_pod (str): The pod returned by find_web_pod_in_namespace
+        pods_with_ips (dict): Dictionary of pods with their IPs
+        fan_out (int): Maximum number of replicas returned
         
     Returns:
-        dict: A dictionary with pod names as keys and their IP addresses as values
+        list: Sorted names of at most fan_out ready replicas, or [web_pod] if none is found
     """
+    pods = pods_with_ips.get(namespace, {})
+    workload = namespace if any(info.get("workload") == namespace for info in pods.values()) \
+        else pods.get(web_pod, {}).get("workload")
+    replicas = sorted(name for name, info in pods.items()
+                      if workload and info.get("workload") == workload and info.get("ready"))
+    if not replicas:
+        return [web_pod]
+    if len(replicas) > fan_out:
+        logger.info(f"In context {context}, collecting logs from {fan_out} of the {len(replicas)} ready replicas of {workload} in namespace {namespace}")
+        replicas = replicas[:fan_out]
+    return replicas
+
+def get_all_pods_with_ips_in_namespaces(excluded_namespaces, contexts=None):
+    """Get all pods and their IP addresses in the non-excluded namespaces of every context.
+    
+    The pods come from the pod inventory (pod_inventory.py): each context is listed
+    with a single all-namespaces call the first time, then kept up to date by a watch,
+    so in steady state this function does not call the cluster at all.
+    
+    Args:
+        excluded_namespaces (set): Namespaces to leave out
+        contexts (list): The Kubernetes contexts
+        
+    Returns:
+        dict: A dictionary with namespaces as keys and {pod name: pod info} dictionaries as values (see get_pod_info)
+    """
+    from libs.parsing.pod_inventory import pod_inventory
+
     pods_with_ips = {}
     for context in contexts:
         kubeconfig = load_kube_config(context)
-        ns_in_context = get_namespaces(context, excluded_namespaces, kubeconfig)
+        try:
+            inventory = pod_inventory.get(context, kubeconfig)
+        except subprocess.CalledProcessError as e:
+            logger.error(f"Error listing pods in context {context}: {e}")
+            continue
+        except json.JSONDecodeError as e:
+            logger.error(f"Error parsing pod data in context {context}: {e}")
+            continue
+        except KubeApiError as e:
+            logger.error(f"Error listing pods in context {context} from the API server: {e}")
+            continue
 
-        for namespace in ns_in_context:
-            logger.debug(f"Retrieving pods and their IPs from namespace {namespace} in context {context} with kubeconfig {kubeconfig}")
-            pods_with_ips[namespace] = {}
-            cmd = ["kubectl", "get", "pods", "-n", namespace, "-o", "json"]
-            
-            if kubeconfig:
-                cmd.insert(1, "--kubeconfig")
-                cmd.insert(2, kubeconfig)
-        
-            try:
-                result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-                pods_data = json.loads(result.stdout)
-        
-                for pod in pods_data["items"]:
-                    namespace = pod["metadata"]["namespace"]
-                    pod_name = pod["metadata"]["name"]
-                    pod_ip = pod["status"].get("podIP")
-                    
-                    # Check if the pod has containers and if the first container has ports
-                    if "containers" in pod["spec"] and pod["spec"]["containers"]:
-                        container = pod["spec"]["containers"][0]
-                        if "ports" in container and container["ports"]:
-                            pod_port = container["ports"][0].get("containerPort")
-                        else:
-                            pod_port = None  # Set to None if no ports are defined
-                    else:
-                        pod_port = None  # Set to None if no containers are defined
-                    
-                    pods_with_ips[namespace][pod_name] = {"ip": pod_ip, "port": pod_port}
-            
-                logger.debug(f"Found {len(pods_with_ips[namespace])} pods with IPs in namespace {namespace}")
-            except subprocess.CalledProcessError as e:
-                logger.error(f"Error retrieving pods in namespace {namespace} in context {context}: {e}")
-            except json.JSONDecodeError as e:
-                logger.error(f"Error parsing pod data for namespace {namespace} in context {context}: {e}")
+        for namespace, pods in inventory.pods_with_ips().items():
+            if namespace not in excluded_namespaces:
+                pods_with_ips.setdefault(namespace, {}).update(pods)
+        logger.debug(f"Pod inventory of context {context} is at resourceVersion {inventory.resource_version}")
 
     return pods_with_ips
 
+def get_inventory_namespaces(context, excluded_namespaces):
+    """Get the non-excluded namespaces that have pods in a context, from the pod inventory.
+    
+    Unlike get_namespaces, this does not call the cluster once the inventory of the
+    context has been listed by get_all_pods_with_ips_in_namespaces.
+    
+    Args:
+        context (str): The Kubernetes context
+        excluded_namespaces (set): Namespaces to leave out
+        
+    Returns:
+        list: List of namespace names
+    """
+    from libs.parsing.pod_inventory import pod_inventory
+
+    try:
+        inventory = pod_inventory.get(context, load_kube_config(context))
+    except (subprocess.CalledProcessError, json.JSONDecodeError, KubeApiError) as e:
+        logger.error(f"Error listing pods in context {context}: {e}")
+        return []
+    return sorted(ns for ns in inventory.pods_with_ips() if ns not in excluded_namespaces)
+
 def set_logger(log_instance):
     """Set the global logger."""
     global logger
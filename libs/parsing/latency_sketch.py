@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Latency quantile sketches for Kubernetes Communications Graph Visualizer
+
+The response times of the log lines are kept per (http_host, source) and per edge in
+DDSketches: a response time x falls in the bin ceil(log(x) / log(gamma)), with
+gamma = (1 + a) / (1 - a), so that every quantile is returned within a relative error a
+(LATENCY_SKETCH_ACCURACY). The bins are a numpy array of counts covering the range of the
+bins seen, capped at LATENCY_SKETCH_MAX_BINS by collapsing the lowest bins into one, so
+the size of a sketch does not depend on the number of requests. Sketches merge by adding
+their counts, across batches, parsing processes, pods and cycles; a LatencyWindow keeps
+the sketches of the last LATENCY_WINDOW_CYCLES cycles of an edge and merges them on read.
+"""
+
+import math
+from collections import deque
+
+import numpy as np
+
+from config.constants import LATENCY_SKETCH_ACCURACY, LATENCY_SKETCH_MAX_BINS, LATENCY_WINDOW_CYCLES
+
+# Response times below this number of seconds (nginx logs them by the millisecond) are
+# counted as zero
+MIN_LATENCY = 1e-6
+
+GAMMA = (1 + LATENCY_SKETCH_ACCURACY) / (1 - LATENCY_SKETCH_ACCURACY)
+LOG_GAMMA = math.log(GAMMA)
+
+# Bins are stored relative to the bin of MIN_LATENCY, so that they are never negative
+_MIN_INDEX = math.ceil(math.log(MIN_LATENCY) / LOG_GAMMA)
+
+# Quantiles of the summaries served with the graph
+SUMMARY_QUANTILES = (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+
+
+def latency_value(response_time):
+    """Return a response_time field in seconds, NaN if it is not a number."""
+    try:
+        return float(response_time)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def bin_indexes(values):
+    """Return the bins of an array of response times, with -1 for the zero bin.
+
+    Args:
+        values (numpy.ndarray): Response times in seconds, without NaN
+    """
+    indexes = np.full(len(values), -1, dtype=np.int64)
+    positive = values >= MIN_LATENCY
+    indexes[positive] = np.ceil(np.log(values[positive]) / LOG_GAMMA).astype(np.int64) - _MIN_INDEX
+    return indexes
+
+
+class LatencySketch:
+    """A DDSketch of response times with a bounded number of bins."""
+
+    __slots__ = ("offset", "counts", "zero_count")
+
+    def __init__(self):
+        self.offset = 0
+        self.counts = None
+        self.zero_count = 0
+
+    @property
+    def count(self):
+        """Number of response times added."""
+        return self.zero_count + (int(self.counts.sum()) if self.counts is not None else 0)
+
+    def _cover(self, low, high):
+        """Extend the bins to cover [low, high], collapsing the lowest ones beyond the cap.
+
+        Returns:
+            int: The lowest bin kept, into which lower bins are counted
+        """
+        if self.counts is not None:
+            low = min(low, self.offset)
+            high = max(high, self.offset + len(self.counts) - 1)
+        low = max(low, high - LATENCY_SKETCH_MAX_BINS + 1)
+        if self.counts is None:
+            self.offset, self.counts = low, np.zeros(high - low + 1, dtype=np.int64)
+        elif low != self.offset or high != self.offset + len(self.counts) - 1:
+            counts = np.zeros(high - low + 1, dtype=np.int64)
+            start = self.offset - low
+            if start < 0:
+                # The lowest bins are collapsed into the lowest kept
+                kept = self.counts[-start:]
+                counts[0] = self.counts[:-start].sum()
+                counts[:len(kept)] += kept
+            else:
+                counts[start:start + len(self.counts)] = self.counts
+            self.offset, self.counts = low, counts
+        return low
+
+    def add_indexes(self, indexes):
+        """Add the response times of an array of bins returned by bin_indexes()."""
+        zero = indexes < 0
+        zeros = int(zero.sum())
+        self.zero_count += zeros
+        if zeros:
+            indexes = indexes[~zero]
+        if not len(indexes):
+            return
+        low = self._cover(int(indexes.min()), int(indexes.max()))
+        self.counts += np.bincount(np.maximum(indexes, low) - self.offset, minlength=len(self.counts))
+
+    def add(self, response_time):
+        """Add one response time in seconds."""
+        if math.isnan(response_time):
+            return
+        if response_time < MIN_LATENCY:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(response_time) / LOG_GAMMA) - _MIN_INDEX
+        low = self._cover(index, index)
+        self.counts[max(index, low) - self.offset] += 1
+
+    def merge(self, other):
+        """Add the response times of another sketch."""
+        self.zero_count += other.zero_count
+        if other.counts is None:
+            return
+        low = self._cover(other.offset, other.offset + len(other.counts) - 1)
+        start = other.offset - low
+        if start < 0:
+            kept = other.counts[-start:]
+            self.counts[0] += other.counts[:-start].sum()
+            self.counts[:len(kept)] += kept
+        else:
+            self.counts[start:start + len(other.counts)] += other.counts
+
+    def copy(self):
+        """Return an independent copy of the sketch."""
+        sketch = LatencySketch()
+        sketch.offset = self.offset
+        sketch.counts = self.counts.copy() if self.counts is not None else None
+        sketch.zero_count = self.zero_count
+        return sketch
+
+    def quantile(self, q):
+        """Return the q-quantile of the response times in seconds, None if there are none."""
+        count = self.count
+        if not count:
+            return None
+        rank = q * (count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        position = int(np.searchsorted(np.cumsum(self.counts), rank - self.zero_count, side="right"))
+        index = self.offset + min(position, len(self.counts) - 1) + _MIN_INDEX
+        # Middle of the bin, within the relative accuracy of every value of the bin
+        return 2 * GAMMA ** index / (GAMMA + 1)
+
+    def summary(self):
+        """Return the number of response times and their quantiles in seconds, for the graph payload."""
+        summary = {"count": self.count}
+        for name, q in SUMMARY_QUANTILES:
+            value = self.quantile(q)
+            summary[name] = round(value, 6) if value is not None else None
+        return summary
+
+
+class LatencyWindow:
+    """The sketches of the last cycles that reported an edge, one per cycle.
+
+    The oldest cycle is dropped when a new one starts, so merged() spans a sliding window
+    of cycles rather than only the last one or the whole life of the edge.
+    """
+
+    __slots__ = ("sketches",)
+
+    def __init__(self, cycles=LATENCY_WINDOW_CYCLES):
+        self.sketches = deque(maxlen=cycles)  # (cycle, LatencySketch), oldest first
+
+    def add(self, cycle, sketch):
+        """Merge a sketch into that of its cycle, starting a new cycle if needed."""
+        if self.sketches and self.sketches[-1][0] == cycle:
+            self.sketches[-1][1].merge(sketch)
+        else:
+            self.sketches.append((cycle, sketch.copy()))
+
+    def merged(self):
+        """Return one sketch of the response times of every cycle of the window."""
+        merged = LatencySketch()
+        for _, sketch in self.sketches:
+            merged.merge(sketch)
+        return merged
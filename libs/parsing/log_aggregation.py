@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Columnar aggregation of the http_host counts for Kubernetes Communications Graph Visualizer
+
+parse_logs counts the requests of each (http_host, source) of a namespace by status class.
+Instead of updating the nested count dictionaries line by line, it appends each line to
+columns: the dictionary-encoded (http_host, source) key and the integer status code. Every
+AGGREGATION_BATCH_LINES lines, and at the end of the logs, the columns are reduced with
+numpy (one bincount over key and status class) and added to the http_host_counts structure,
+which is touched once per key of the batch instead of once per line.
+
+The counts of a key are a HostCounts, a slotted record read like the former dictionary
+({'count', '4xx', '5xx', '3xx', '2xx', '5xx_entries'}), and the strings of the keys are
+interned, so that the counts of tens of thousands of keys stay small. The response times
+of a key go into a LatencySketch, whose quantiles are its 'latency', and with
+ROUTE_BREAKDOWN its requests are counted per route template in its 'routes'.
+
+The 5xx log entries of a key are a uniform reservoir sample of at most ERROR_SAMPLE_SIZE
+entries, while its '5xx' count stays exact, so that an error storm does not grow the
+counts, the database rows or the tooltips. Samples of the same key, from successive
+batches, chunks or parsing processes, are merged in proportion to their 5xx counts.
+
+Comparison with the per-line updates on a recorded log file:
+
+    python -m libs.parsing.log_aggregation <file.log>
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from collections.abc import Mapping
+
+import numpy as np
+
+from config.constants import AGGREGATION_BATCH_LINES, ERROR_SAMPLE_SIZE
+from libs.parsing.latency_sketch import LatencySketch, bin_indexes, latency_value
+from libs.parsing.route_normalization import merge_route_counts
+
+# Status classes counted per key, in the order of the columns of a reduced batch
+STATUS_CLASSES = ('2xx', '3xx', '4xx', '5xx')
+
+
+def status_code_value(status):
+    """Return a status field as an integer, -1 if it is not a 3-digit code.
+
+    A code is counted in a class when its text is 3 digits, as with the former regexes.
+    """
+    if type(status) is int:
+        return status if 100 <= status <= 999 else -1
+    if isinstance(status, str) and len(status) == 3 and status.isdigit():
+        return int(status)
+    return -1
+
+
+# Keys of the HostCounts mapping, and the attribute holding each of them
+HOST_COUNT_FIELDS = {'count': 'count', '4xx': 'c4xx', '5xx': 'c5xx', '3xx': 'c3xx', '2xx': 'c2xx', '5xx_entries': 'entries',
+                     'latency': 'latency', 'routes': 'routes'}
+
+
+class HostCounts(Mapping):
+    """Counts of one (http_host, source) key, read and updated like the former dictionary."""
+
+    __slots__ = ('count', 'c2xx', 'c3xx', 'c4xx', 'c5xx', 'entries', 'sketch', 'routes')
+
+    def __init__(self):
+        self.count = self.c2xx = self.c3xx = self.c4xx = self.c5xx = 0
+        # Shared until the key has a 5xx entry
+        self.entries = ()
+        self.sketch = None
+        # {route: count}, None without route breakdown
+        self.routes = None
+
+    @property
+    def latency(self):
+        """The number of response times and their quantiles, None if no line had one."""
+        return self.sketch.summary() if self.sketch is not None else None
+
+    def add_latency(self, sketch):
+        """Add the response times of a sketch."""
+        if self.sketch is None:
+            self.sketch = sketch.copy()
+        else:
+            self.sketch.merge(sketch)
+
+    def merge(self, other):
+        """Add the counts of the same key from another batch, chunk or process."""
+        # The samples are merged in proportion to the 5xx counts they were drawn from
+        self.entries = merge_error_samples(self.entries, self.c5xx, other.entries, other.c5xx)
+        self.count += other.count
+        self.c2xx += other.c2xx
+        self.c3xx += other.c3xx
+        self.c4xx += other.c4xx
+        self.c5xx += other.c5xx
+        if other.sketch is not None:
+            self.add_latency(other.sketch)
+        if other.routes:
+            self.routes = merge_route_counts(self.routes, other.routes)
+
+    def __getitem__(self, name):
+        try:
+            return getattr(self, HOST_COUNT_FIELDS[name])
+        except KeyError:
+            raise KeyError(name) from None
+
+    def __setitem__(self, name, value):
+        try:
+            setattr(self, HOST_COUNT_FIELDS[name], value)
+        except KeyError:
+            raise KeyError(name) from None
+
+    def __iter__(self):
+        return iter(HOST_COUNT_FIELDS)
+
+    def __len__(self):
+        return len(HOST_COUNT_FIELDS)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+def host_key(http_host, source):
+    """Return the (http_host, source) key of new counts, with its strings interned."""
+    return (sys.intern(http_host) if type(http_host) is str else http_host,
+            sys.intern(source) if type(source) is str else source)
+
+
+def merge_error_samples(sample, seen, other, other_seen, size=ERROR_SAMPLE_SIZE):
+    """Merge two uniform samples of 5xx entries into one of at most size entries.
+
+    Args:
+        sample (list): Sample of the first entries
+        seen (int): Number of entries the first sample was drawn from
+        other (list): Sample of the other entries
+        other_seen (int): Number of entries the other sample was drawn from
+
+    Returns:
+        list: A uniform sample of the seen + other_seen entries
+    """
+    if len(sample) + len(other) <= size:
+        return list(sample) + list(other)
+    sample = random.sample(sample, len(sample))
+    other = random.sample(other, len(other))
+    merged = []
+    # Each entry is taken from a sample with the probability that a uniform draw among the
+    # entries not taken yet falls in the entries that sample was drawn from
+    while len(merged) < size and (sample or other):
+        if sample and (not other or random.randrange(max(1, seen + other_seen)) < seen):
+            merged.append(sample.pop())
+            seen -= 1
+        else:
+            merged.append(other.pop())
+            other_seen -= 1
+    return merged
+
+
+class HostCountAggregator:
+    """Counts of the (http_host, source) keys of one namespace, aggregated in batches."""
+
+    def __init__(self, host_counts, batch_lines=AGGREGATION_BATCH_LINES, routes=None):
+        """Initialize the aggregator.
+
+        Args:
+            host_counts (dict): The http_host counts of the namespace, {(http_host, source): counts},
+                updated by flush()
+            batch_lines (int): Number of lines aggregated at a time
+            routes (RouteNormalizer, optional): Normalizer of the requests counted per route, None
+                to count no routes
+        """
+        self.host_counts = host_counts
+        self.batch_lines = batch_lines
+        self._normalize = routes.normalize if routes is not None else None
+        self._key_ids = {}
+        self._keys = []
+        self._ids = []
+        self._statuses = []
+        self._latencies = []
+        self._routes = []
+        self._errors = {}
+
+    def add(self, http_host, source, status, response_time, request, time_local, error):
+        """Count one request."""
+        key = (http_host, source)
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self._keys)
+            self._keys.append(host_key(http_host, source))
+        code = status_code_value(status)
+        self._ids.append(key_id)
+        self._statuses.append(code)
+        self._latencies.append(latency_value(response_time))
+        if self._normalize is not None:
+            self._routes.append(self._normalize(request))
+        if 500 <= code < 600:
+            # Keep the log entry for 5xx errors in the reservoir of the key (algorithm R)
+            errors = self._errors.get(key_id)
+            if errors is None:
+                errors = self._errors[key_id] = [0, []]
+            errors[0] += 1
+            slot = len(errors[1]) if len(errors[1]) < ERROR_SAMPLE_SIZE else random.randrange(errors[0])
+            if slot < ERROR_SAMPLE_SIZE:
+                entry = {
+                    'status': status,
+                    'request': request,
+                    'time': time_local,
+                    'error': error
+                }
+                if slot == len(errors[1]):
+                    errors[1].append(entry)
+                else:
+                    errors[1][slot] = entry
+        if len(self._ids) >= self.batch_lines:
+            self.flush()
+
+    def flush(self):
+        """Add the counts of the pending lines to the http_host counts."""
+        if not self._ids:
+            return
+        ids = np.array(self._ids, dtype=np.intp)
+        codes = np.array(self._statuses, dtype=np.int64)
+        # Column 0 counts the codes of no counted class, columns 1-4 the classes of STATUS_CLASSES
+        classes = np.where(codes >= 200, codes // 100 - 1, 0)
+        classes[classes > len(STATUS_CLASSES)] = 0
+        key_count = len(self._keys)
+        columns = len(STATUS_CLASSES) + 1
+        per_key = np.bincount(ids * columns + classes, minlength=key_count * columns).reshape(key_count, columns)
+        totals = per_key.sum(axis=1)
+
+        # Bins of the known response times, grouped by key
+        latencies = np.array(self._latencies, dtype=np.float64)
+        known = ~np.isnan(latencies)
+        latency_ids = ids[known]
+        order = np.argsort(latency_ids, kind='stable')
+        latency_ids = latency_ids[order]
+        latency_bins = bin_indexes(latencies[known][order])
+        latency_keys, starts = np.unique(latency_ids, return_index=True)
+        latency_ranges = dict(zip(latency_keys.tolist(), zip(starts.tolist(), starts[1:].tolist() + [len(latency_ids)])))
+
+        # Requests per key and route, the lines that are not requests having no route
+        key_routes = {}
+        for (key_id, route), count in Counter(zip(self._ids, self._routes)).items():
+            if route is not None:
+                key_routes.setdefault(key_id, {})[route] = count
+
+        host_counts = self.host_counts
+        for key_id in np.flatnonzero(totals).tolist():
+            key = self._keys[key_id]
+            counts = host_counts.get(key)
+            if counts is None:
+                counts = host_counts[key] = HostCounts()
+            other, c2xx, c3xx, c4xx, c5xx = per_key[key_id].tolist()
+            if key_id in self._errors:
+                seen, sample = self._errors[key_id]
+                counts.entries = merge_error_samples(counts.entries, counts.c5xx, sample, seen)
+            counts.count += other + c2xx + c3xx + c4xx + c5xx
+            counts.c2xx += c2xx
+            counts.c3xx += c3xx
+            counts.c4xx += c4xx
+            counts.c5xx += c5xx
+            if key_id in latency_ranges:
+                start, end = latency_ranges[key_id]
+                if counts.sketch is None:
+                    counts.sketch = LatencySketch()
+                counts.sketch.add_indexes(latency_bins[start:end])
+            if key_id in key_routes:
+                counts.routes = merge_route_counts(counts.routes, key_routes[key_id])
+
+        self._ids = []
+        self._statuses = []
+        self._latencies = []
+        self._routes = []
+        self._errors = {}
+
+
+def add_host_count(host_counts, http_host, source, status, response_time, request, time_local, error, routes=None):
+    """Count one request directly in the http_host counts, as parse_logs did per line."""
+    key = (http_host, source)
+    counts = host_counts.get(key)
+    if counts is None:
+        counts = host_counts[host_key(http_host, source)] = HostCounts()
+    counts['count'] += 1
+    code = status_code_value(status)
+    if 200 <= code < 600:
+        status_class = STATUS_CLASSES[code // 100 - 2]
+        if status_class == '5xx':
+            entry = {'status': status, 'request': request, 'time': time_local, 'error': error}
+            counts['5xx_entries'] = merge_error_samples(counts['5xx_entries'], counts['5xx'], [entry], 1)
+        counts[status_class] += 1
+    latency = latency_value(response_time)
+    if latency == latency:
+        if counts.sketch is None:
+            counts.sketch = LatencySketch()
+        counts.sketch.add(latency)
+    route = routes.normalize(request) if routes is not None else None
+    if route is not None:
+        counts.routes = merge_route_counts(counts.routes, {route: 1})
+
+
+def benchmark(rows, repeat=3):
+    """Compare the per-line updates with the batched aggregation.
+
+    Args:
+        rows (list): (http_host, source, status, response_time, request, time_local, error) tuples
+
+    Returns:
+        dict: {"per_line", "batched"}: best number of rows counted per second over the runs
+    """
+    def per_line():
+        host_counts = {}
+        for row in rows:
+            add_host_count(host_counts, *row)
+
+    def batched():
+        aggregator = HostCountAggregator({})
+        add = aggregator.add
+        for row in rows:
+            add(*row)
+        aggregator.flush()
+
+    results = {}
+    for name, run in (("per_line", per_line), ("batched", batched)):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        results[name] = len(rows) / best if best else float("inf")
+    return results
+
+
+if __name__ == "__main__":
+    from libs.parsing.log_projection import iter_log_fields
+
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m libs.parsing.log_aggregation <file.log>")
+    with open(sys.argv[1], encoding="utf-8", errors="replace") as f:
+        log_lines = f.read().splitlines()
+    log_rows = [(fields[3], fields[1], fields[4], fields[5], fields[2], fields[6], fields[7])
+                for _, fields in iter_log_fields(log_lines) if fields is not None and fields[3]]
+    for mode, rate in benchmark(log_rows).items():
+        print(f"{mode:10} {rate:12,.0f} rows/s")
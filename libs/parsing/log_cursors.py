@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Log cursors for incremental log collection in Kubernetes Communications Graph Visualizer
+
+A cursor remembers, per (context, namespace, pod), the timestamp of the last log line
+that was collected and the hashes of the lines seen at that timestamp. The next
+collection only asks for lines since that timestamp, and the cursor drops the lines of
+the overlapping second that were already returned by the previous collection.
+"""
+
+import threading
+import time
+
+from config.constants import LOG_CURSOR_TTL
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+def normalize_timestamp(timestamp):
+    """Turn an RFC3339Nano timestamp into a string that sorts chronologically.
+
+    Kubernetes trims trailing zeros from the fractional part, so the raw strings do
+    not compare correctly ("...05.12Z" sorts after "...05.123Z").
+
+    Args:
+        timestamp (str): A timestamp such as 2024-01-31T10:00:05.123456789Z
+
+    Returns:
+        str: The timestamp with a 9-digit fractional part, or None if it is not valid
+    """
+    if len(timestamp) < 20 or timestamp[-1] != 'Z' or timestamp[10] != 'T':
+        return None
+    seconds, _, fraction = timestamp[:-1].partition('.')
+    if len(seconds) != 19 or (fraction and not fraction.isdigit()):
+        return None
+    return f"{seconds}.{fraction[:9].ljust(9, '0')}Z"
+
+
+class LogCursorStore:
+    """Thread-safe store of log cursors keyed by (context, namespace, pod)."""
+
+    def __init__(self, ttl=LOG_CURSOR_TTL):
+        """Initialize the store.
+
+        Args:
+            ttl (int): Seconds after which an unused cursor (e.g. of a deleted pod) is dropped
+        """
+        self.ttl = ttl
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._last_prune = time.time()
+
+    def since_time(self, key):
+        """Return the --since-time value for a cursor, or None if there is no cursor yet.
+
+        The API server only honours whole seconds, so the value is truncated and the
+        overlapping lines are filtered out by advance().
+        """
+        with self._lock:
+            cursor = self._cursors.get(key)
+        if cursor is None:
+            return None
+        return cursor[0][:19] + "Z"
+
+    def advance(self, key, lines):
+        """Filter out already collected lines and move the cursor past the new ones.
+
+        Args:
+            key (tuple): The (context, namespace, pod) of the cursor
+            lines (iterable): Log lines prefixed with their timestamp (kubectl --timestamps)
+
+        Returns:
+            list: The new log lines, without their timestamp prefix
+        """
+        return list(self.iter_advance(key, lines))
+
+    def iter_advance(self, key, lines):
+        """Streaming version of advance(): yield the new lines as they are read.
+
+        The cursor is moved past the lines yielded so far once the iteration ends,
+        including when the consumer stops early.
+        """
+        with self._lock:
+            cursor = self._cursors.get(key)
+        last_ts, seen = cursor[:2] if cursor else (None, frozenset())
+
+        max_ts = last_ts
+        max_ts_hashes = set(seen)
+        try:
+            for line in lines:
+                timestamp, _, content = line.partition(' ')
+                ts = normalize_timestamp(timestamp)
+                if ts is None:
+                    # No timestamp prefix: nothing to compare against, keep the line as is
+                    if line.strip():
+                        yield line
+                    continue
+
+                if last_ts is not None:
+                    if ts < last_ts:
+                        continue
+                    if ts == last_ts and hash(content) in seen:
+                        continue
+
+                if max_ts is None or ts > max_ts:
+                    max_ts = ts
+                    max_ts_hashes = {hash(content)}
+                elif ts == max_ts:
+                    max_ts_hashes.add(hash(content))
+                yield content
+        finally:
+            now = time.time()
+            with self._lock:
+                if max_ts is not None:
+                    self._cursors[key] = (max_ts, frozenset(max_ts_hashes), now)
+                if now - self._last_prune > self.ttl:
+                    self._prune(now)
+
+    def _prune(self, now):
+        """Drop the cursors that have not been advanced for longer than the TTL."""
+        expired = [key for key, cursor in self._cursors.items() if now - cursor[2] > self.ttl]
+        for key in expired:
+            del self._cursors[key]
+        self._last_prune = now
+        if expired and logger:
+            logger.debug(f"Dropped {len(expired)} expired log cursors")
+
+    def reset(self, key=None):
+        """Forget one cursor, or all of them if key is None."""
+        with self._lock:
+            if key is None:
+                self._cursors.clear()
+            else:
+                self._cursors.pop(key, None)
+
+
+# Per-pod timestamp cursors of the incremental log collection
+log_cursors = LogCursorStore()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Cross-cycle deduplication of log tails for Kubernetes Communications Graph Visualizer
+
+In "tail" collection mode every cycle fetches the last lines of each namespace again, so
+in quiet namespaces most of them were already counted by the previous cycles. Before
+they are parsed, the lines of a fetch are looked up in the Bloom filters of the lines
+fetched for the namespace in the last LOG_DEDUP_WINDOW seconds, and the lines found are
+skipped. The lines of a fetch are only added to the filters once the fetch is complete,
+so identical lines of the same fetch, which are distinct requests, are all counted.
+
+Each namespace keeps LOG_DEDUP_GENERATIONS filters of LOG_DEDUP_CAPACITY lines at most:
+a new one is started when the current one is older than LOG_DEDUP_WINDOW or full, and
+the oldest is dropped, so the memory used per namespace is bounded. Every fetched line
+is added again, which keeps the lines still returned by the tail in the recent filters.
+A false positive (LOG_DEDUP_ERROR_RATE) skips a line that was not counted yet.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from config.constants import (LOG_DEDUP_WINDOW, LOG_DEDUP_GENERATIONS, LOG_DEDUP_CAPACITY, LOG_DEDUP_ERROR_RATE,
+                              LOG_DEDUP_BATCH_LINES)
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+def line_fingerprints(lines):
+    """Return the 64-bit fingerprints of a list of lines.
+
+    The hash of a string is salted per process, so fingerprints are only compared within
+    the process that computed them.
+    """
+    return np.array([hash(line) for line in lines], dtype=np.int64).view(np.uint64)
+
+
+class BloomFilter:
+    """A Bloom filter of line fingerprints, its bits packed in a numpy array."""
+
+    __slots__ = ("size", "hashes", "bits", "count", "created")
+
+    def __init__(self, capacity=LOG_DEDUP_CAPACITY, error_rate=LOG_DEDUP_ERROR_RATE):
+        """Allocate the filter.
+
+        Args:
+            capacity (int): Number of lines for which the false positive rate is error_rate
+            error_rate (float): False positive rate at capacity
+        """
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+        self.count = 0
+        self.created = time.time()
+
+    def _positions(self, fingerprints):
+        """Return the bit positions of the fingerprints, one row per hash function."""
+        # Double hashing: the k positions are h1 + i * h2 for the two halves of the fingerprint
+        low = fingerprints & np.uint64(0xFFFFFFFF)
+        high = (fingerprints >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.hashes, dtype=np.uint64)[:, None]
+        return (low[None, :] + steps * high[None, :]) % np.uint64(self.size)
+
+    def contains(self, fingerprints):
+        """Return a boolean array telling which fingerprints may have been added."""
+        positions = self._positions(fingerprints)
+        found = self.bits[positions >> np.uint64(3)] & (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        return found.all(axis=0)
+
+    def add(self, fingerprints):
+        """Add an array of fingerprints."""
+        positions = self._positions(fingerprints).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3), np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8))
+        self.count += len(fingerprints)
+
+
+class LineDeduplicator:
+    """Rotating Bloom filters of the lines fetched for each (context, namespace)."""
+
+    def __init__(self, window=LOG_DEDUP_WINDOW, generations=LOG_DEDUP_GENERATIONS, capacity=LOG_DEDUP_CAPACITY,
+                 batch_lines=LOG_DEDUP_BATCH_LINES):
+        """Initialize the deduplicator.
+
+        Args:
+            window (int): Seconds after which a new filter is started for a namespace
+            generations (int): Number of filters kept per namespace
+            capacity (int): Number of lines after which a new filter is started
+            batch_lines (int): Number of lines looked up at a time
+        """
+        self.window = window
+        self.generations = generations
+        self.capacity = capacity
+        self.batch_lines = batch_lines
+        self._filters = {}
+        self._lock = threading.Lock()
+
+    def filter(self, key, lines):
+        """Yield the lines of a fetch that were not fetched for the same key recently.
+
+        The lines are added to the filters of the key once all of them have been read.
+
+        Args:
+            key (tuple): The (context, namespace) of the fetch
+            lines (iterable): The fetched log lines
+        """
+        with self._lock:
+            filters = list(self._filters.get(key, ()))
+        fetched = []
+        skipped = 0
+        batch = []
+        for line in lines:
+            if not line.strip():
+                continue
+            batch.append(line)
+            if len(batch) >= self.batch_lines:
+                skipped += yield from self._new_lines(batch, filters, fetched)
+                batch = []
+        if batch:
+            skipped += yield from self._new_lines(batch, filters, fetched)
+        if fetched:
+            self._add(key, np.concatenate(fetched))
+        if skipped:
+            logger.info(f"Skipped {skipped} log lines of namespace {key[1]} in context {key[0]} already counted by a previous cycle")
+
+    def _new_lines(self, batch, filters, fetched):
+        """Yield the lines of a batch found in none of the filters, and return the number of lines skipped."""
+        fingerprints = line_fingerprints(batch)
+        fetched.append(fingerprints)
+        if not filters:
+            yield from batch
+            return 0
+        seen = np.zeros(len(batch), dtype=bool)
+        for bloom in filters:
+            seen |= bloom.contains(fingerprints)
+        for line, duplicate in zip(batch, seen.tolist()):
+            if not duplicate:
+                yield line
+        return int(seen.sum())
+
+    def _add(self, key, fingerprints):
+        """Add the fingerprints of a complete fetch to the current filter of a key, rotating the filters."""
+        with self._lock:
+            filters = self._filters.get(key)
+            if filters is None:
+                filters = self._filters[key] = deque(maxlen=self.generations)
+            now = time.time()
+            if not filters or now - filters[-1].created >= self.window or filters[-1].count + len(fingerprints) > self.capacity:
+                filters.append(BloomFilter(max(self.capacity, len(fingerprints))))
+            filters[-1].add(fingerprints)
+
+    def snapshot(self):
+        """Return the number of filters and the memory they use."""
+        with self._lock:
+            blooms = [bloom for filters in self._filters.values() for bloom in filters]
+        return {"namespaces": len(self._filters), "filters": len(blooms), "bytes": sum(bloom.bits.nbytes for bloom in blooms)}
+
+
+# Deduplicator of the "tail" fetches
+log_deduplicator = LineDeduplicator()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
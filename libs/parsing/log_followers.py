@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Streaming log followers for Kubernetes Communications Graph Visualizer
+
+In "stream" collection mode a long-lived follower thread is kept per target deployment.
+It streams log lines continuously (kubectl logs -f, or the follow=true API endpoint)
+into a bounded per-namespace ring buffer, so a graph refresh only has to drain the
+buffers instead of waiting for the logs to be downloaded.
+"""
+
+import subprocess
+import threading
+import time
+from collections import deque
+
+from config.constants import (COLLECTION_BACKEND, LOG_LINES_LIMIT, LOG_BUFFER_LINES,
+                              FOLLOWER_BACKOFF_MIN, FOLLOWER_BACKOFF_MAX, FOLLOWER_READ_TIMEOUT)
+from libs.parsing.kube_api import KubeApiError, get_api_client, iter_pod_log
+from libs.parsing.log_cursors import normalize_timestamp
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+class LogRingBuffer:
+    """Bounded buffer of log lines; the oldest lines are dropped when it is full."""
+
+    def __init__(self, capacity=LOG_BUFFER_LINES):
+        self.capacity = capacity
+        self.dropped = 0
+        self._lines = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def append(self, line):
+        """Add a line, dropping the oldest one if the buffer is full."""
+        with self._lock:
+            if len(self._lines) == self.capacity:
+                self.dropped += 1
+            self._lines.append(line)
+
+    def drain(self):
+        """Remove and return every buffered line, oldest first.
+
+        Returns:
+            tuple: (lines, dropped) - the buffered lines and the number of lines lost to overflow since the last drain
+        """
+        with self._lock:
+            lines, self._lines = self._lines, deque(maxlen=self.capacity)
+            dropped, self.dropped = self.dropped, 0
+        return lines, dropped
+
+
+class LogFollower(threading.Thread):
+    """Thread that follows the logs of one deployment and reconnects with exponential backoff."""
+
+    def __init__(self, context, namespace, pod_name, kubeconfig, buffer):
+        """Initialize the follower.
+
+        Args:
+            context (str): The Kubernetes context
+            namespace (str): The namespace of the deployment
+            pod_name (str): The pod to follow with the "api" backend (kubectl follows deployment/<namespace>)
+            kubeconfig (str): Path to the kubeconfig file
+            buffer (LogRingBuffer): The buffer receiving the lines
+        """
+        super().__init__(name=f"log-follower-{context}-{namespace}", daemon=True)
+        self.context = context
+        self.namespace = namespace
+        self.pod_name = pod_name
+        self.kubeconfig = kubeconfig
+        self.buffer = buffer
+        self.reconnects = 0
+        self._stop_event = threading.Event()
+        self._process = None
+        self._last_timestamp = None
+        self._last_hashes = set()  # Hashes of the lines received at _last_timestamp
+
+    def stop(self):
+        """Ask the follower to stop and terminate its kubectl process if any."""
+        self._stop_event.set()
+        process = self._process
+        if process and process.poll() is None:
+            process.terminate()
+
+    def run(self):
+        """Follow the logs until stopped, reconnecting with exponential backoff."""
+        backoff = FOLLOWER_BACKOFF_MIN
+        while not self._stop_event.is_set():
+            started = time.time()
+            try:
+                received = self._follow()
+                logger.info(f"Log follower for {self.namespace} in context {self.context} ended after {received} lines")
+            except (KubeApiError, OSError, subprocess.SubprocessError) as e:
+                received = 0
+                logger.warning(f"Log follower for {self.namespace} in context {self.context} failed: {e}")
+
+            if self._stop_event.is_set():
+                break
+            # A stream that delivered lines for a while is healthy: start over with a short delay
+            if received and time.time() - started > FOLLOWER_BACKOFF_MAX:
+                backoff = FOLLOWER_BACKOFF_MIN
+            self.reconnects += 1
+            logger.debug(f"Reconnecting log follower for {self.namespace} in context {self.context} in {backoff}s")
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, FOLLOWER_BACKOFF_MAX)
+
+    def _follow(self):
+        """Open one stream and copy its lines into the buffer until it ends.
+
+        Lines carry their timestamp so that, after a reconnection, the stream resumes
+        from the last line received instead of replaying the tail.
+
+        Returns:
+            int: Number of lines received on this stream
+        """
+        since_time = self._last_timestamp[:19] + "Z" if self._last_timestamp else None
+        if COLLECTION_BACKEND == "api":
+            client = get_api_client(self.context, self.kubeconfig)
+            lines = iter_pod_log(client, self.namespace, self.pod_name,
+                                 tail_lines=None if since_time else LOG_LINES_LIMIT, since_time=since_time,
+                                 timestamps=True, follow=True, timeout=FOLLOWER_READ_TIMEOUT)
+            return self._consume(lines)
+
+        cmd = ["kubectl", "logs", "-f", "-n", self.namespace, "deployment/" + self.namespace, "--timestamps"]
+        if since_time:
+            cmd.extend(["--since-time", since_time])
+        else:
+            cmd.extend(["--tail", str(LOG_LINES_LIMIT)])
+        if self.kubeconfig:
+            cmd[1:1] = ["--kubeconfig", self.kubeconfig]
+        elif self.context:
+            cmd[1:1] = ["--context", self.context]
+
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            received = self._consume(line.rstrip('\n') for line in self._process.stdout)
+        finally:
+            self._process.stdout.close()
+            stderr = self._process.stderr.read()
+            self._process.stderr.close()
+            returncode = self._process.wait()
+        if returncode and not self._stop_event.is_set():
+            raise subprocess.SubprocessError(f"kubectl exited with code {returncode}: {stderr.strip()[:300]}")
+        return received
+
+    def _consume(self, lines):
+        """Strip the timestamps and append the lines that were not received before.
+
+        Only the lines replayed by --since-time after a reconnection are skipped: those older
+        than the resume point, and those at its timestamp whose content was already received,
+        as in LogCursorStore.iter_advance. Lines of one stream sharing a timestamp are all kept.
+        """
+        resume_ts, resume_hashes = self._last_timestamp, frozenset(self._last_hashes)
+        received = 0
+        for line in lines:
+            if self._stop_event.is_set():
+                break
+            timestamp, _, content = line.partition(' ')
+            ts = normalize_timestamp(timestamp)
+            if ts is None:
+                content = line
+            else:
+                if resume_ts is not None:
+                    if ts < resume_ts:
+                        continue
+                    if ts == resume_ts and hash(content) in resume_hashes:
+                        continue
+                if self._last_timestamp is None or ts > self._last_timestamp:
+                    self._last_timestamp = ts
+                    self._last_hashes = {hash(content)}
+                elif ts == self._last_timestamp:
+                    self._last_hashes.add(hash(content))
+            if content:
+                self.buffer.append(content)
+                received += 1
+        return received
+
+
+class LogFollowerManager:
+    """Keeps one follower and one ring buffer per (context, namespace)."""
+
+    def __init__(self):
+        self._followers = {}
+        self._buffers = {}
+        self._lock = threading.Lock()
+
+    def ensure(self, context, namespace, pod_name, kubeconfig=None):
+        """Start the follower of a namespace if it is not already running.
+
+        With the "api" backend a follower is bound to one pod, so it is replaced when the
+        namespace is now served by another pod (after a rollout for instance).
+        """
+        key = (context, namespace)
+        with self._lock:
+            follower = self._followers.get(key)
+            if follower and follower.is_alive():
+                if COLLECTION_BACKEND != "api" or follower.pod_name == pod_name:
+                    return
+                follower.stop()
+                logger.info(f"Pod {follower.pod_name} followed for namespace {namespace} in context {context} "
+                            f"was replaced by {pod_name}, restarting the log follower")
+            buffer = self._buffers.setdefault(key, LogRingBuffer())
+            follower = LogFollower(context, namespace, pod_name, kubeconfig, buffer)
+            self._followers[key] = follower
+            follower.start()
+        logger.info(f"Started log follower for namespace {namespace} in context {context}")
+
+    def drain(self, context, namespace):
+        """Return the lines buffered for a namespace since the previous drain.
+
+        Returns:
+            deque: The buffered log lines, oldest first
+        """
+        with self._lock:
+            buffer = self._buffers.get((context, namespace))
+        if buffer is None:
+            return deque()
+        lines, dropped = buffer.drain()
+        if dropped:
+            logger.warning(f"Log buffer of namespace {namespace} in context {context} overflowed, {dropped} lines were dropped")
+        logger.debug(f"Drained {len(lines)} buffered log lines for namespace {namespace} in context {context}")
+        return lines
+
+    def retain(self, keys):
+        """Stop the followers whose (context, namespace) is not in keys."""
+        with self._lock:
+            stale = [key for key in self._followers if key not in keys]
+            for key in stale:
+                self._followers.pop(key).stop()
+                self._buffers.pop(key, None)
+        for context, namespace in stale:
+            logger.info(f"Stopped log follower for namespace {namespace} in context {context}")
+
+    def stop_all(self):
+        """Stop every follower."""
+        self.retain(set())
+
+
+# Log followers of the streaming collection, one per namespace
+log_followers = LogFollowerManager()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Projection log parser for Kubernetes Communications Graph Visualizer
+
+parse_logs only uses a few of the fields of the nginx JSON log lines (see
+config/log_format_nginx.txt), which carry many more. In "projection" mode the needed
+fields are pulled out of each line by a regex specialized for the layout of the lines
+(their keys, in order), learned from the first line decoded in full, without building
+a dict of the whole line. Lines that do not have exactly that layout, or that contain
+escape sequences or nested values, are decoded in full instead.
+
+Speed and allocations of both modes on a recorded log file:
+
+    python -m libs.parsing.log_projection <file.log>
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from operator import itemgetter
+
+from config.constants import LOG_PARSER
+from libs.parsing.json_decoding import get_json_decoder
+
+# Fields of a log line used by parse_logs, in the order of the tuples returned
+LOG_FIELDS = ("remoteaddr", "auth", "request", "http_host", "status", "response_time", "time_local", "error")
+
+# Largest number of keys of a layout, and number of layouts kept
+MAX_LAYOUT_KEYS = 64
+MAX_LAYOUTS = 32
+
+_STRING = r'"[^"\\]*"'
+_LITERAL = r'-?\d[\d.eE+-]*|true|false|null'
+_LITERALS = {"true": True, "false": False, "null": None}
+
+
+def _literal(token):
+    """Convert a JSON number or literal token the way json.loads does."""
+    if token in _LITERALS:
+        return _LITERALS[token]
+    if token.lstrip("-").isdigit():
+        return int(token)
+    return float(token)
+
+
+class LineLayout:
+    """Scanner of the log lines whose keys are exactly a given sequence."""
+
+    def __init__(self, keys, strings, compact=False):
+        """Compile the scanner.
+
+        Args:
+            keys (tuple): Keys of the lines, in order
+            strings (frozenset): Needed fields whose values are strings, the others being numbers or literals
+            compact (bool): The lines have no whitespace around the separators, which makes
+                a faster regex possible
+        """
+        self.keys = keys
+        ws = '' if compact else r'\s*'
+        parts = []
+        present = [key for key in keys if key in LOG_FIELDS]
+        for key in keys:
+            name = re.escape(json.dumps(key, ensure_ascii=False)) + ws + ':' + ws
+            if key not in LOG_FIELDS:
+                parts.append(name + '(?:' + _STRING + '|' + _LITERAL + ')')
+            elif key in strings:
+                parts.append(name + r'"([^"\\]*)"')
+            else:
+                parts.append(name + '(' + _LITERAL + ')')
+        self.regex = re.compile(r'\s*\{' + ws + (ws + ',' + ws).join(parts) + ws + r'\}\s*')
+        # Positions of the numbers and literals among the groups, and position of each field
+        # of LOG_FIELDS among the groups, the fields of no key pointing to a trailing ""
+        self._literals = tuple(i for i, key in enumerate(present) if key not in strings)
+        self._pick = itemgetter(*(present.index(field) if field in present else len(present) for field in LOG_FIELDS))
+
+    def scan(self, line):
+        """Return the LOG_FIELDS of a line, "" for the fields of no key, or None if the line does not fit."""
+        match = self.regex.fullmatch(line)
+        if match is None:
+            return None
+        values = match.groups() + ("",)
+        if self._literals:
+            values = list(values)
+            try:
+                for i in self._literals:
+                    values[i] = _literal(values[i])
+            except ValueError:
+                return None
+        return self._pick(values)
+
+
+_layouts = {}
+_layouts_lock = threading.Lock()
+
+
+def get_layout(entry, line):
+    """Return the shared LineLayout of the lines like a decoded one, or None if they cannot be scanned.
+
+    Args:
+        entry (dict): The decoded line
+        line (str): The line, from which the separators are learned
+    """
+    if len(entry) > MAX_LAYOUT_KEYS:
+        return None
+    strings = set()
+    for field in LOG_FIELDS:
+        value = entry.get(field)
+        if isinstance(value, str):
+            strings.add(field)
+        elif isinstance(value, (dict, list)):
+            return None
+    key = (tuple(entry), frozenset(strings), '": ' not in line and ', "' not in line)
+    layout = _layouts.get(key)
+    if layout is None:
+        layout = LineLayout(*key)
+        with _layouts_lock:
+            if len(_layouts) >= MAX_LAYOUTS:
+                _layouts.clear()
+            _layouts[key] = layout
+    return layout
+
+
+def project_entry(entry):
+    """Return the LOG_FIELDS of a decoded log line, or None if it is not a JSON object."""
+    if not isinstance(entry, dict):
+        return None
+    get = entry.get
+    return tuple(get(field, "") for field in LOG_FIELDS)
+
+
+def iter_log_fields(lines, mode=None):
+    """Yield the fields of each non-empty log line as the lines arrive.
+
+    Args:
+        lines (iterable): Log lines
+        mode (str, optional): "projection", "full" or "auto", LOG_PARSER by default
+
+    Yields:
+        tuple: (line, tuple of the LOG_FIELDS values or None if the line is not a valid JSON object)
+    """
+    decoder = get_json_decoder()
+    mode = mode or LOG_PARSER
+    if mode == "auto":
+        # A C decoder builds the whole dict faster than the regex scan extracts the fields
+        mode = "projection" if decoder.name == "json" else "full"
+    if mode == "full":
+        for line, entry in decoder.iter_decode(lines):
+            yield line, project_entry(entry)
+        return
+
+    layout = None
+    for line in lines:
+        if not line.strip():
+            continue
+        fields = layout.scan(line) if layout is not None else None
+        if fields is None:
+            entry = decoder.decode(line)
+            fields = project_entry(entry)
+            if fields is not None:
+                # Scan the next lines with the layout of this one
+                layout = get_layout(entry, line)
+        yield line, fields
+
+
+def benchmark(lines, repeat=3):
+    """Compare the "full" and "projection" modes on a list of lines.
+
+    Returns:
+        dict: {mode: {"lines_per_second", "bytes_per_line", "blocks_per_line"}}, the memory
+            figures being those of the objects each mode builds from a line (the decoded
+            dict, or the tuple of the needed fields)
+    """
+    decoder = get_json_decoder()
+    # Learn the layouts first, so that only the scans are measured
+    layouts = {}
+    for line in lines:
+        entry = decoder.decode(line)
+        if isinstance(entry, dict):
+            layout = get_layout(entry, line)
+            if layout is not None:
+                layouts[layout.regex.pattern] = layout
+
+    def scan(line):
+        for layout in layouts.values():
+            fields = layout.scan(line)
+            if fields is not None:
+                return fields
+        return project_entry(decoder.decode(line))
+
+    build = {"full": decoder.decode, "projection": scan}
+    results = {}
+    for mode in ("full", "projection"):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in iter_log_fields(lines, mode):
+                pass
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+
+        tracemalloc.start()
+        blocks = sys.getallocatedblocks()
+        built = [build[mode](line) for line in lines]
+        size, _ = tracemalloc.get_traced_memory()
+        blocks = sys.getallocatedblocks() - blocks
+        tracemalloc.stop()
+        del built
+        count = max(1, len(lines))
+        results[mode] = {
+            "lines_per_second": len(lines) / best if best else float("inf"),
+            "bytes_per_line": size / count,
+            "blocks_per_line": blocks / count,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python -m libs.parsing.log_projection <file.log>")
+    with open(sys.argv[1], encoding="utf-8", errors="replace") as f:
+        log_lines = f.read().splitlines()
+    for parser_mode, figures in benchmark(log_lines).items():
+        print(f"{parser_mode:10} {figures['lines_per_second']:12,.0f} lines/s "
+              f"{figures['bytes_per_line']:8,.0f} bytes/line {figures['blocks_per_line']:6.1f} blocks/line")
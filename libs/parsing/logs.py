@@ -5,13 +5,29 @@
 Log parsing functions for Kubernetes Communications Graph Visualizer
 """
 
-import json
 import yaml
 import re
 from urllib.parse import urlparse, parse_qs
 import subprocess
-from collections import defaultdict
-from config.constants import LOG_LINES_LIMIT
+import concurrent.futures
+import queue
+import threading
+from collections import Counter, defaultdict
+from config.constants import (LOG_LINES_LIMIT, COLLECTION_BACKEND, LOG_COLLECTION_MODE, REPLICA_COLLECTION, ADAPTIVE_TAIL,
+                              LOG_LINE_QUEUE_SIZE, LOG_DEDUP, ROUTE_BREAKDOWN)
+from libs.parsing.kube_api import KubeApiError, get_api_client, iter_pod_log
+from libs.parsing.log_cursors import log_cursors
+from libs.parsing.log_followers import log_followers
+from libs.parsing.concurrency import timed_stream, collection_slots, context_limit
+from libs.parsing.tail_sizing import tail_sizer
+from libs.parsing.ip_index import get_ip_index
+from libs.parsing.source_rules import get_source_rules
+from libs.parsing.log_projection import iter_log_fields
+from libs.parsing.parse_pool import get_parse_pool
+from libs.parsing.log_aggregation import HostCountAggregator, HostCounts
+from libs.parsing.tracing import tracer
+from libs.parsing.probe_filter import probe_counter, probe_filter_mode
+from libs.parsing.log_dedup import log_deduplicator
 
 # Global logger (will be set by the main script)
 logger = None
@@ -36,166 +52,91 @@ def extract_field_from_request(request, field_name):
     return query_params.get(field_name, [None])[0]
 
 def parse_logs(logs, namespace, http_host_counts, namespaces_list, pods_with_ips):
-    """Parse nginx logs to extract communication data and error counts."""
+    """Parse nginx logs to extract communication data and error counts.
+    
+    The logs are either a string or an iterable of lines, such as the generator
+    returned by iter_logs, which is then consumed as the lines arrive.
+    """
     logger.info(f"Parsing logs for namespace {namespace}")
     communications = []
+    ip_index = get_ip_index(pods_with_ips)
+    rules = get_source_rules()
+    host_counts = HostCountAggregator(http_host_counts[namespace], routes=rules.routes if ROUTE_BREAKDOWN else None)
+    # None unless the namespace is traced, the per-line messages are only built for sampled lines
+    trace = tracer.start(namespace)
+    # Probe requests are filtered out before the source attribution unless kept
+    probe_mode = probe_filter_mode()
+    probe_counts = Counter()
     
     line_count = 0
     valid_json_count = 0
     skipped_metrics_count = 0
 
-    for line in logs.split('\n'):
-        if not line.strip():
-            continue
-            
+    lines = logs.split('\n') if isinstance(logs, str) else logs
+    for line, fields in iter_log_fields(lines):
         line_count += 1
+        traced = trace is not None and trace.sample()
         source = ""
-        try:
-            log_entry = json.loads(line)
-            valid_json_count += 1
-            
-            # Extract infos from json line
-            # the auth field in the json log_entry represents the source namespace or the origine of the request
-            remoteaddr = extract_field_from_json_line(log_entry, "remoteaddr")
-            auth = extract_field_from_json_line(log_entry, "auth")
-            user_agent = extract_field_from_json_line(log_entry, "user_agent")
-            request = extract_field_from_json_line(log_entry, "request")
-            http_host = extract_field_from_json_line(log_entry, "http_host")
-            status_code = extract_field_from_json_line(log_entry, "status")
-            response_time = extract_field_from_json_line(log_entry, "response_time")
-
-            remoteaddr_parsed_match = re.search(r'(\d+\.\d+\.\d+\.\d+)$', remoteaddr)
-            #logger.debug(f"for ns {namespace} remoteaddr: {remoteaddr} -> remoteaddr_parsed_match: {remoteaddr_parsed_match}")
-            if remoteaddr_parsed_match:
-                remoteaddr_parsed = remoteaddr_parsed_match.group(1)
-            else:
-                #logger.warning(f"No valid IP found in remoteaddr: {remoteaddr} for namespace {namespace} remoteaddr_parsed_match: {remoteaddr_parsed_match}")
-                remoteaddr_parsed = "unknown"  # or handle as needed
-
-            # healthcheck or monitoring request
-            if ("/metrics" in request.lower() or "/alive" in request.lower() or "/ready" in request.lower() or "/health" in request.lower() or "/ok.php" in request.lower() or "/monitoring" in request.lower()):
-                skipped_metrics_count += 1
-                #logger.debug(f"Skipping healthchecks request: {request}")
-            
-            # # # loop test to detect namespace in the pods_with_ips
-            source_found = False
-            for ns, pods in pods_with_ips.items():
-                if source_found:
-                    break
-                    
-                for pod_name, pod_info in pods_with_ips[ns].items():
-                    pod_ip = pod_info["ip"]
-                    if remoteaddr_parsed == pod_ip:
-                        # the remoteaddr IP {remoteaddr} has been detected in namespace {ns} for pod {pod_name} 
-                        source = ns
-                        logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected in namespace: {ns} for pod {pod_name} - setting source to {ns} for namespace {namespace}")
-                        source_found = True
-                        break  # Found exact match, no need to check other pods
-            
-            # Check special IP addresses outside the pod loop - only if no source was found by IP match
-            if not source_found:
-                # Check xinflbpub IPs
-                if str(remoteaddr_parsed).startswith("172.17.2.5") or str(remoteaddr_parsed).startswith("172.18.2.5"):
-                    if auth:
-                        source = "xinflbpub-from-" + auth  # Fixed string concatenation
-                        logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a xinflbpub IP and auth is defined as {auth} - setting source to xinflbpub-from-{auth} for namespace {namespace}")
-                    else:
-                        if namespace == "api-pay-public":
-                            if "/pspnotification/" in request:
-                                origin = re.search(r'/([^/]+) HTTP', request).group(1) 
-                                source = "xinflbpub-from-" + origin
-                                logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a xinflbpub IP and auth is empty but pspnotif identified for api-pay-public - setting source to xinflbpub-from-{origin} for namespace {namespace}")
-                        else:
-                            source = "xinflbpub"
-                            logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a xinflbpub IP and auth is empty - setting source to xinflbpub for namespace {namespace}")
-                    source_found = True
-                
-                elif str(remoteaddr_parsed).startswith("10.121.232") and auth:
-                    source = auth
-                    logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a kube worker IP and auth is defined as {auth} - setting source to {auth} for namespace {namespace}")
-                    source_found = True
-                
-                # Check kube worker IPs
-                elif str(remoteaddr_parsed).startswith("10.121.232") and not auth:
-                    source = "From-kubeworkers"
-                    logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a kube worker IP - setting source to {source} for namespace {namespace}")
-                    source_found = True
-                
-                # Check xpayhdws IPs
-                elif remoteaddr_parsed in ["10.120.100.186", "10.120.1.54", "10.120.1.155", "10.120.101.224"]:
-                    source = "xpayhdws"
-                    logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a xpayhdws IP - setting source to {source} for namespace {namespace}")
-                    source_found = True
-                
-                # Check for unknown IPs with auth
-                elif "unknown" in str(remoteaddr_parsed).lower() and auth:
-                    source = auth
-                    logger.debug(f"Remoteaddr IP {remoteaddr_parsed} detected as a unknown IP - auth already set to {auth} for namespace {namespace}")
-                    source_found = True
-                
-                # Fallback to auth or unknown
-                else:
-                    if auth:
-                        source = auth
-                        logger.debug(f"Source IP not detected in any namespace but has IP: {remoteaddr_parsed} and auth field {auth} - setting source to {auth} for namespace {namespace}")
-                    else:
-                        source = "unknown"
-                        logger.debug(f"Source IP not detected in any namespace but has IP: {remoteaddr_parsed} and auth field is empty - setting source to unknown for namespace {namespace}")
-
-            target = namespace
-
-            logger.debug(f"Communication detected: {source} -> {target}")
-            communications.append((source, target))
-            
-            # Update http_host counts for the current namespace
-            if http_host:
-                # Include the auth value in the key for counting
-                #auth_value = auth if auth else "unknown"  # Use "unknown_auth" if source is empty
-                auth_value = source
-                if (http_host, auth_value) not in http_host_counts[namespace]:
-                    http_host_counts[namespace][(http_host, auth_value)] = {
-                        'count': 0, 
-                        '4xx': 0, 
-                        '5xx': 0, 
-                        '3xx': 0, 
-                        '2xx': 0,
-                        '5xx_entries': []  # New array to store 5xx log entries
-                    }
-                
-                # Increment the count for the http_host
-                http_host_counts[namespace][(http_host, auth_value)]['count'] += 1
-                
-                # Update error counts based on the current log entry
-                if status_code is not None:
-                    status_code_str = str(status_code)
-                    if re.match(r'^4\d{2}$', status_code_str):  # Matches 4xx
-                        http_host_counts[namespace][(http_host, auth_value)]['4xx'] += 1
-                        logger.debug(f"4xx error detected for namespace {namespace} from auth {auth_value} with http_host {http_host} - setting count to {http_host_counts[namespace][(http_host, auth_value)]['4xx']}")
-                    elif re.match(r'^5\d{2}$', status_code_str):  # Matches 5xx
-                        http_host_counts[namespace][(http_host, auth_value)]['5xx'] += 1
-                        # Store the log entry for 5xx errors with specific fields
-                        log_details = {
-                            'status': status_code,
-                            'request': request,
-                            'time': extract_field_from_json_line(log_entry, "time_local"),
-                            'error': extract_field_from_json_line(log_entry, "error")
-                        }
-                        http_host_counts[namespace][(http_host, auth_value)]['5xx_entries'].append(log_details)
-                        logger.debug(f"5xx error detected in namespace {namespace} from auth {auth_value} with http_host {http_host} - setting count to {http_host_counts[namespace][(http_host, auth_value)]['5xx']}")
-                        logger.debug(f"Stored 5xx error details: {log_details}")
-                    elif re.match(r'^3\d{2}$', status_code_str):  # Matches 3xx
-                        http_host_counts[namespace][(http_host, auth_value)]['3xx'] += 1
-                    elif re.match(r'^2\d{2}$', status_code_str):  # Matches 2xx
-                        http_host_counts[namespace][(http_host, auth_value)]['2xx'] += 1
-                logger.debug(f"Errors for {http_host}: 4xx: {http_host_counts[namespace][(http_host, auth_value)]['4xx']}, 5xx: {http_host_counts[namespace][(http_host, auth_value)]['5xx']}, 3xx: {http_host_counts[namespace][(http_host, auth_value)]['3xx']}, 2xx: {http_host_counts[namespace][(http_host, auth_value)]['2xx']}")
-            
-        except json.JSONDecodeError:
+        if fields is None:
             # Not a valid JSON log line, skip
-            logger.debug(f"Invalid JSON log line: {line[:100]}...")
+            if traced:
+                trace.log(f"Invalid JSON log line: {line[:100]}...")
             continue
+        valid_json_count += 1
+        
+        # Fields of the json line (see LOG_FIELDS)
+        # the auth field in the json log line represents the source namespace or the origine of the request
+        remoteaddr, auth, request, http_host, status_code, response_time, time_local, error = fields
+
+        # healthcheck or monitoring request
+        probe = rules.probe(request)
+        if probe is not None:
+            skipped_metrics_count += 1
+            if probe_mode != "keep":
+                if probe_mode == "count":
+                    probe_counts[probe] += 1
+                if traced:
+                    trace.log(f"Filtered {probe} probe request: {request}")
+                continue
+
+        remoteaddr_parsed_match = re.search(r'(\d+\.\d+\.\d+\.\d+)$', remoteaddr)
+        #logger.debug(f"for ns {namespace} remoteaddr: {remoteaddr} -> remoteaddr_parsed_match: {remoteaddr_parsed_match}")
+        if remoteaddr_parsed_match:
+            remoteaddr_parsed = remoteaddr_parsed_match.group(1)
+        else:
+            #logger.warning(f"No valid IP found in remoteaddr: {remoteaddr} for namespace {namespace} remoteaddr_parsed_match: {remoteaddr_parsed_match}")
+            remoteaddr_parsed = "unknown"  # or handle as needed
+
+        # Look the remote address up in the pod IP index built from pods_with_ips
+        pod_match = ip_index.lookup(remoteaddr_parsed)
+        if pod_match is not None:
+            source = pod_match[0]
+            if traced:
+                trace.log(f"Remoteaddr IP {remoteaddr_parsed} detected in namespace: {source} for pod {pod_match[1]} - setting source to {source} for namespace {namespace}")
+        else:
+            # Not a pod: the source rules decide from the address range, auth and request
+            source, rule_name = rules.classify(remoteaddr_parsed, auth, namespace, request)
+            if traced:
+                trace.log(f"Remoteaddr IP {remoteaddr_parsed} with auth field {auth!r} matched {rule_name} - setting source to {source} for namespace {namespace}")
+
+        target = namespace
+
+        if traced:
+            trace.log(f"Communication detected: {source} -> {target}")
+        communications.append((source, target))
+        
+        # Count the request for its http_host and source, aggregated by batches of lines
+        if http_host:
+            host_counts.add(http_host, source, status_code, response_time, request, time_local, error)
+            if traced:
+                trace.log(f"Counted status {status_code} for http_host {http_host} from {source}")
+
+    host_counts.flush()
+    if probe_counts:
+        probe_counter.add(namespace, probe_counts)
     
     logger.info(f"Log parsing results: {line_count} lines, {valid_json_count} valid JSON, "
-               f"{skipped_metrics_count} metrics requests skipped, {len(communications)} communications detected")
+               f"{skipped_metrics_count} metrics requests ({probe_mode}), {len(communications)} communications detected")
     
     return communications
 
@@ -222,44 +163,173 @@ def extract_and_parse_logs_threaded(context, namespace, http_host_counts_lock, k
     logger.info(f"Thread extracting and parsing logs for namespace: {namespace} in context: {context} with kubeconfig: {kubeconfig}")
     
     # Find a web pod in this namespace
-    from libs.parsing.kubernetes import find_web_pod_in_namespace
+    from libs.parsing.kubernetes import find_web_pod_in_namespace, find_replica_pods_in_namespace
     web_pod = find_web_pod_in_namespace(context, namespace, kubeconfig, pods_with_ips)
     
     if not web_pod:
         logger.warning(f"In context {context}, no pods found in namespace {namespace}")
         return [], {}
     
-    # Extract logs from the pod
-    logs = extract_logs(context, namespace, web_pod, kubeconfig)
+    # Take what the follower buffered since the last cycle, or stream the logs of the pods
+    # straight into the parser, line by line, without buffering the whole output
+    if LOG_COLLECTION_MODE == "stream":
+        log_followers.ensure(context, namespace, web_pod, kubeconfig)
+        lines = LineCounter(log_followers.drain(context, namespace))
+    elif REPLICA_COLLECTION:
+        replicas = find_replica_pods_in_namespace(context, namespace, web_pod, pods_with_ips)
+        lines = LineCounter(iter_replica_logs(context, namespace, replicas, kubeconfig))
+    else:
+        lines = LineCounter(iter_logs(context, namespace, web_pod, kubeconfig))
+    
+    communications, local_http_host_counts = parse_namespace_logs(namespace, drop_counted_lines(context, namespace, lines),
+                                                                  namespaces, pods_with_ips)
+    if LOG_COLLECTION_MODE != "stream":
+        observe_logs_window(context, namespace, lines.lines, lines.bytes)
     
-    if not logs:
+    if not lines.lines:
         logger.warning(f"For context {context}, no logs extracted from pod {web_pod} in namespace {namespace}")
         return [], {}
     
-    # Parse the logs
+    return communications, local_http_host_counts
+
+class LineCounter:
+    """Iterable counting the lines and bytes of the log lines flowing through it."""
+    
+    def __init__(self, lines):
+        self._lines = lines
+        self.lines = 0
+        self.bytes = 0
+    
+    def __iter__(self):
+        for line in self._lines:
+            self.lines += 1
+            self.bytes += len(line) + 1
+            yield line
+
+def parse_namespace_logs(namespace, logs, namespaces=None, pods_with_ips=None):
+    """
+    Parse the logs of a namespace into thread-local results.
+    
+    Args:
+        namespace (str): The namespace the logs were collected from
+        logs (str or iterable): The collected log lines
+        namespaces (list, optional): List of known namespaces
+        pods_with_ips (dict, optional): Dictionary of pods with their IPs
+    
+    Returns:
+        A tuple containing:
+        - List of communications detected, aggregated as (source, target, {'weight': n}) when
+          parsed by the worker processes
+        - Dictionary of http_host counts for this namespace
+    """
+    # Parse in the worker processes when their pool is active for these pods
+    pool = get_parse_pool(pods_with_ips)
+    if pool is not None:
+        return pool.parse(namespace, logs)
+    
     # Use a local dictionary to collect http_host_counts for this namespace
-    local_http_host_counts = defaultdict(lambda: defaultdict(lambda: {'count': 0, '4xx': 0, '5xx': 0, '3xx': 0, '2xx': 0}))
+    local_http_host_counts = defaultdict(lambda: defaultdict(HostCounts))
     communications = parse_logs(logs, namespace, {namespace: local_http_host_counts[namespace]}, namespaces, pods_with_ips)
     
     # Return the local results to be merged with the global data under a lock by the caller
     return communications, local_http_host_counts
 
-def extract_logs(context, namespace, pod_name, kubeconfig=None):
-    """Extract logs from a pod.
+def get_logs_cursor(context, namespace, target):
+    """Return the cursor key and since-time of a log target.
     
     Args:
         context (str): The Kubernetes context
-        namespace (str): The namespace of the pod
-        pod_name (str): The name of the pod
+        namespace (str): The namespace of the target
+        target (str): The pod name, or deployment/<name> for kubectl
+        
+    Returns:
+        tuple: (cursor_key, since_time), both None outside "incremental" collection mode
+    """
+    if LOG_COLLECTION_MODE != "incremental":
+        return None, None
+    cursor_key = (context, namespace, target)
+    return cursor_key, log_cursors.since_time(cursor_key)
+
+def get_logs_window(context, namespace, replicas=1):
+    """Return the line cap and time window of a fetch without cursor.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the target
+        replicas (int): Number of pods the namespace is read from
+        
+    Returns:
+        tuple: (tail_lines, since_seconds), since_seconds being None for a plain tail;
+        (LOG_LINES_LIMIT, None) unless adaptive tail sizing is used (see tail_sizing.py)
+    """
+    if not ADAPTIVE_TAIL or LOG_COLLECTION_MODE != "tail":
+        return LOG_LINES_LIMIT, None
+    return tail_sizer.request(context, namespace, replicas)
+
+def observe_logs_window(context, namespace, lines, size):
+    """Feed the number of lines and bytes fetched for a namespace back to the adaptive tail sizing."""
+    if ADAPTIVE_TAIL and LOG_COLLECTION_MODE == "tail":
+        tail_sizer.observe(context, namespace, lines, size)
+
+def drop_counted_lines(context, namespace, lines):
+    """Skip the lines of a "tail" fetch already fetched for the namespace by a recent cycle (see log_dedup.py).
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace the lines were fetched from
+        lines (str or iterable): The fetched log lines
+        
+    Returns:
+        iterable: The lines to parse, unchanged outside "tail" collection mode
+    """
+    if not LOG_DEDUP or LOG_COLLECTION_MODE != "tail":
+        return lines
+    if isinstance(lines, str):
+        lines = lines.splitlines()
+    return log_deduplicator.filter((context, namespace), lines)
+
+def apply_logs_cursor(cursor_key, output):
+    """Keep only the lines of a timestamped log output that are newer than its cursor.
+    
+    Args:
+        cursor_key (tuple): The cursor returned by get_logs_cursor, or None
+        output (str): The raw log output
+        
+    Returns:
+        str: The new log lines, or the output unchanged if there is no cursor
+    """
+    if cursor_key is None:
+        return output
+    return "\n".join(log_cursors.advance(cursor_key, output.splitlines()))
+
+def build_logs_command(context, namespace, kubeconfig=None, since_time=None, timestamps=False, target=None,
+                       tail_lines=LOG_LINES_LIMIT, since_seconds=None):
+    """Build the kubectl command reading the logs of a pod, or of the deployment of a namespace.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the deployment
         kubeconfig (str, optional): Path to the kubeconfig file
+        since_time (str, optional): Read the lines written since this RFC3339 time instead of the last LOG_LINES_LIMIT lines
+        timestamps (bool): Prefix every line with its timestamp
+        target (str, optional): The pod to read, deployment/<namespace> by default
+        tail_lines (int): Number of lines to read from the end of the log without since_time
+        since_seconds (int, optional): Only read the lines written in the last since_seconds seconds, without since_time
         
     Returns:
-        str: The logs from the pod
+        list: The command arguments
     """
-    logger.info(f"Extracting logs from pod {pod_name} in namespace {namespace} in context {context} with kubeconfig: {kubeconfig}")
     #cmd = ["kubectl", "logs", "-n", namespace, pod_name, "--tail", str(LOG_LINES_LIMIT)]
-    cmd = ["kubectl", "logs", "-n", namespace, "deployment/" + namespace, "--tail", str(LOG_LINES_LIMIT)]
+    cmd = ["kubectl", "logs", "-n", namespace, target or "deployment/" + namespace]
     #cmd = ["kubectl", "logs", "-n", namespace, "deployment/" + namespace, "--since", "1m"]
+    if since_time:
+        cmd.extend(["--since-time", since_time])
+    else:
+        cmd.extend(["--tail", str(tail_lines)])
+        if since_seconds:
+            cmd.extend(["--since", f"{since_seconds}s"])
+    if timestamps:
+        cmd.append("--timestamps")
     
     # Add context if specified
     if context and not kubeconfig:
@@ -268,17 +338,217 @@ def extract_logs(context, namespace, pod_name, kubeconfig=None):
     elif kubeconfig:
         cmd.insert(1, "--kubeconfig")
         cmd.insert(2, kubeconfig)
+    return cmd
+
+def extract_logs(context, namespace, pod_name, kubeconfig=None, replica=False, replicas=1):
+    """Extract logs from a pod.
+    
+    Buffered version of iter_logs, for callers that need the whole output at once.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        kubeconfig (str, optional): Path to the kubeconfig file
+        replica (bool): Read pod_name itself with kubectl instead of deployment/<namespace>
+        replicas (int): Number of pods the logs of the namespace are read from
+        
+    Returns:
+        str: The logs from the pod
+    """
+    return "\n".join(iter_logs(context, namespace, pod_name, kubeconfig, replica, replicas))
+
+def iter_logs(context, namespace, pod_name, kubeconfig=None, replica=False, replicas=1):
+    """Yield the log lines of a pod as they are read from kubectl or the API server.
+    
+    In "incremental" collection mode only the lines written since the previous call
+    for the same pod are returned (see log_cursors.py); the first call falls back to
+    the last LOG_LINES_LIMIT lines. In "tail" mode the number of lines and the time
+    window may be sized by the traffic of the namespace (see tail_sizing.py).
+    
+    Errors are logged and end the iteration, like an empty output.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        kubeconfig (str, optional): Path to the kubeconfig file
+        replica (bool): Read pod_name itself with kubectl instead of deployment/<namespace>
+        replicas (int): Number of pods the logs of the namespace are read from
         
+    Yields:
+        str: Each log line, without its trailing newline
+    """
+    logger.info(f"Extracting logs from pod {pod_name} in namespace {namespace} in context {context} with kubeconfig: {kubeconfig}")
+    if COLLECTION_BACKEND == "api":
+        yield from iter_logs_api(context, namespace, pod_name, kubeconfig, replicas)
+        return
+
+    target = pod_name if replica else "deployment/" + namespace
+    cursor_key, since_time = get_logs_cursor(context, namespace, target)
+    tail_lines, since_seconds = get_logs_window(context, namespace, replicas) if not since_time else (None, None)
+    cmd = build_logs_command(context, namespace, kubeconfig, since_time, timestamps=cursor_key is not None, target=target,
+                             tail_lines=tail_lines, since_seconds=since_seconds)
+    
+    lines = 0
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-        log_lines = result.stdout.strip().split('\n')
-        valid_lines = [line for line in log_lines if line.strip()]
-        logger.debug(f"In context {context}, extracted {len(valid_lines)} log lines from {pod_name}")
-        return result.stdout
+        for line in apply_logs_cursor_lines(cursor_key, timed_stream(context, iter_command_lines(cmd))):
+            lines += 1
+            yield line
+        logger.debug(f"In context {context}, extracted {lines} log lines from {target}" + (f" since {since_time}" if since_time else ""))
     except subprocess.CalledProcessError as e:
         logger.error(f"In context {context}, error extracting logs from pod {pod_name}: {e}")
-        logger.debug(f"Command output: {e.stdout}\n{e.stderr}")
-        return ""
+        logger.debug(f"Command output: {e.stderr}")
+
+def iter_command_lines(cmd):
+    """Run a command and yield the lines of its output as they are written.
+    
+    The command is terminated if the consumer stops early.
+    
+    Raises:
+        subprocess.CalledProcessError: If the command exits with a non-zero code
+    """
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors='replace')
+    completed = False
+    try:
+        for line in process.stdout:
+            yield line.rstrip('\n')
+        completed = True
+    finally:
+        if not completed and process.poll() is None:
+            process.terminate()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        process.stderr.close()
+        returncode = process.wait()
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, cmd, None, stderr)
+
+def apply_logs_cursor_lines(cursor_key, lines):
+    """Streaming version of apply_logs_cursor, for an iterable of timestamped lines."""
+    if cursor_key is None:
+        return lines
+    return log_cursors.iter_advance(cursor_key, lines)
+
+def iter_replica_logs(context, namespace, pod_names, kubeconfig=None):
+    """Yield the log lines of several replicas, read in parallel.
+    
+    The calling namespace task holds one collection slot of the context; a reader is
+    added for each further slot free in collection_slots, up to one per replica, and
+    the readers share the replicas. The fan-out therefore counts against the same
+    per-context limit as the scheduler. Each reader feeds a bounded queue, so memory
+    stays bounded by LOG_LINE_QUEUE_SIZE lines whatever the size of the logs. The
+    lines of the replicas are interleaved.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the pods
+        pod_names (list): The replicas returned by find_replica_pods_in_namespace
+        kubeconfig (str, optional): Path to the kubeconfig file
+        
+    Yields:
+        str: Each log line, without its trailing newline
+    """
+    if len(pod_names) == 1:
+        yield from iter_logs(context, namespace, pod_names[0], kubeconfig, replica=True)
+        return
+    
+    extra_slots = 0
+    while extra_slots < len(pod_names) - 1 and collection_slots.try_acquire(context, context_limit(context)):
+        extra_slots += 1
+    
+    lines = queue.Queue(maxsize=LOG_LINE_QUEUE_SIZE)
+    remaining_pods = queue.Queue()
+    for pod_name in pod_names:
+        remaining_pods.put(pod_name)
+    stop = threading.Event()
+    done = object()
+    
+    def put(item):
+        # Give up when the consumer is gone rather than blocking on a full queue forever
+        while not stop.is_set():
+            try:
+                lines.put(item, timeout=1)
+                return True
+            except queue.Full:
+                continue
+        return False
+    
+    def read(holds_slot):
+        try:
+            while not stop.is_set():
+                try:
+                    pod_name = remaining_pods.get_nowait()
+                except queue.Empty:
+                    return
+                try:
+                    for line in iter_logs(context, namespace, pod_name, kubeconfig, replica=True, replicas=len(pod_names)):
+                        if not put(line):
+                            return
+                except Exception as e:
+                    logger.error(f"In context {context}, error reading logs from replica {pod_name} in namespace {namespace}: {e}")
+        finally:
+            if holds_slot:
+                collection_slots.release(context)
+            put(done)
+    
+    readers = 1 + extra_slots
+    logger.debug(f"In context {context}, reading {len(pod_names)} replicas of namespace {namespace} with {readers} readers")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=readers) as executor:
+        for reader in range(readers):
+            executor.submit(read, reader > 0)
+        try:
+            while readers:
+                line = lines.get()
+                if line is done:
+                    readers -= 1
+                else:
+                    yield line
+        finally:
+            stop.set()
+
+def iter_logs_api(context, namespace, pod_name, kubeconfig=None, replicas=1):
+    """Yield the log lines of a pod read through the API server instead of kubectl.
+    
+    The API has no equivalent of "kubectl logs deployment/<name>", so the logs are
+    read from the pod selected by find_web_pod_in_namespace.
+    
+    Args:
+        context (str): The Kubernetes context
+        namespace (str): The namespace of the pod
+        pod_name (str): The name of the pod
+        kubeconfig (str, optional): Path to the kubeconfig file
+        replicas (int): Number of pods the logs of the namespace are read from
+        
+    Yields:
+        str: Each log line, without its trailing newline
+    """
+    cursor_key, since_time = get_logs_cursor(context, namespace, pod_name)
+    lines = 0
+    try:
+        client = get_api_client(context, kubeconfig)
+        if since_time:
+            body = iter_pod_log(client, namespace, pod_name, since_time=since_time, timestamps=True)
+        else:
+            tail_lines, since_seconds = get_logs_window(context, namespace, replicas)
+            body = iter_pod_log(client, namespace, pod_name, tail_lines, timestamps=cursor_key is not None,
+                                since_seconds=since_seconds)
+        for line in apply_logs_cursor_lines(cursor_key, timed_stream(context, body)):
+            lines += 1
+            yield line
+        logger.debug(f"In context {context}, extracted {lines} log lines from {pod_name} through the API server")
+    except KubeApiError as e:
+        logger.error(f"In context {context}, error extracting logs from pod {pod_name} through the API server: {e}")
+
+def extract_logs_api(context, namespace, pod_name, kubeconfig=None, replicas=1):
+    """Extract logs from a pod through the API server instead of kubectl.
+    
+    Buffered version of iter_logs_api.
+    
+    Returns:
+        str: The logs from the pod
+    """
+    return "\n".join(iter_logs_api(context, namespace, pod_name, kubeconfig, replicas))
 
 def set_logger(log_instance):
     """Set the global logger."""
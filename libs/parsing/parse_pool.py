@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Process pool parsing for Kubernetes Communications Graph Visualizer
+
+Parsing is CPU-bound Python, so the collection threads only use one core between them.
+When the pool is active, the collection threads send the log lines of each namespace in
+chunks to worker processes, one per core, and merge what they send back. The pods, the
+namespaces and the source rules are written once per change to a state file, which each
+worker loads when it first receives a chunk of a newer state generation, and every chunk
+comes back as compact aggregates: the number of requests per (source, target) and the
+http_host counts, instead of one tuple per line.
+
+The worker processes are kept across cycles. A new state is only written when the version
+of the pod inventory, the namespaces or the source rules change, and the workers are only
+replaced when the pool breaks.
+"""
+
+import concurrent.futures
+import logging
+import multiprocessing
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+from collections import Counter, deque
+from concurrent.futures.process import BrokenProcessPool
+
+from config.constants import PARSE_PROCESSES, PARSE_CHUNK_LINES
+from libs.parsing import source_rules, tracing
+from libs.parsing.log_aggregation import host_key
+from libs.parsing.probe_filter import probe_counter
+
+# Global logger (will be set by the main script)
+logger = None
+
+# State of a worker process, set by _load_state
+_worker_namespaces = None
+_worker_pods_with_ips = None
+_worker_generation = None
+
+
+def _init_worker(log_level):
+    """Initialize the logging of a worker process."""
+    from libs.parsing import logs, ip_index, json_decoding
+
+    logging.basicConfig(level=log_level, format='%(asctime)s - %(levelname)s - %(message)s')
+    worker_logger = logging.getLogger('graph_k8s')
+    for module in (logs, ip_index, source_rules, json_decoding, tracing):
+        module.set_logger(worker_logger)
+
+
+def _load_state(generation, path):
+    """Load the pods, namespaces and source rules of a state generation, unless already loaded."""
+    global _worker_namespaces, _worker_pods_with_ips, _worker_generation
+    if _worker_generation == generation:
+        return
+    with open(path, 'rb') as f:
+        pods_with_ips, namespaces, rules = pickle.load(f)
+    source_rules.set_source_rules(rules)
+    _worker_pods_with_ips = pods_with_ips
+    _worker_namespaces = namespaces
+    _worker_generation = generation
+
+
+def _parse_chunk(state, namespace, lines, traced_namespaces):
+    """Parse a chunk of log lines in a worker process, with the namespaces traced in the parent.
+
+    Args:
+        state (tuple): (generation, path) of the state file the chunk is parsed with
+
+    Returns:
+        tuple: ({(source, target): number of requests}, {(http_host, source): counts},
+            {metrics path: number of filtered probe requests})
+    """
+    from libs.parsing.logs import parse_namespace_logs
+
+    _load_state(*state)
+    tracing.tracer.configure(traced_namespaces)
+    communications, local_http_host_counts = parse_namespace_logs(namespace, lines, _worker_namespaces, _worker_pods_with_ips)
+    return dict(Counter(communications)), dict(local_http_host_counts[namespace]), probe_counter.take(namespace)
+
+
+def merge_host_counts(merged, counts):
+    """Add the http_host counts of a chunk to those of the previous chunks.
+
+    The keys come back from the workers as new strings, so the keys of new entries are
+    interned again here.
+    """
+    for key, host_counts in counts.items():
+        target = merged.get(key)
+        if target is None:
+            merged[host_key(*key)] = host_counts
+            continue
+        target.merge(host_counts)
+
+
+class ParsePool:
+    """Worker processes parsing the log lines of namespaces, kept across cycles."""
+
+    def __init__(self, processes, chunk_lines=PARSE_CHUNK_LINES):
+        """Start the pool.
+
+        Args:
+            processes (int): Number of worker processes
+            chunk_lines (int): Number of log lines sent to a worker at a time
+        """
+        self.processes = processes
+        self.chunk_lines = chunk_lines
+        self.broken = False
+        self.pods_with_ips = None
+        self.namespaces = None
+        self.inventory_version = None
+        self.rules_generation = None
+        self.generation = 0
+        self._state = None
+        self._state_dir = tempfile.mkdtemp(prefix="k8s-graph-parse-")
+        # Worker processes are started from a fork server rather than forked from this
+        # process, whose collection threads may hold locks at the time of the fork
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, mp_context=multiprocessing.get_context("forkserver"),
+            initializer=_init_worker, initargs=(logger.getEffectiveLevel(),))
+
+    def update(self, pods_with_ips, namespaces, inventory_version=None):
+        """Make the workers parse for these pods and namespaces and the source rules in use.
+
+        A new state file is written only if the inventory version, the namespaces or the
+        rules generation changed; the workers load it with their next chunk.
+
+        Args:
+            pods_with_ips (dict): Dictionary of pods with their IPs
+            namespaces (list): List of known namespaces
+            inventory_version: Value that changes whenever the pods change, such as
+                PodInventory.versions(); None to compare the pods themselves
+        """
+        rules = source_rules.get_source_rules()
+        rules_generation = source_rules.get_rules_generation()
+        if inventory_version is None:
+            pods_changed = pods_with_ips != self.pods_with_ips
+        else:
+            pods_changed = inventory_version != self.inventory_version
+        changed = (self._state is None or pods_changed or namespaces != self.namespaces
+                   or rules_generation != self.rules_generation)
+        # Later cycles compare their own values to the ones the workers have
+        self.pods_with_ips = pods_with_ips
+        self.namespaces = namespaces
+        self.inventory_version = inventory_version
+        self.rules_generation = rules_generation
+        if not changed:
+            return
+
+        self.generation += 1
+        path = os.path.join(self._state_dir, f"state-{self.generation}.pkl")
+        with open(path + ".tmp", 'wb') as f:
+            pickle.dump((pods_with_ips, namespaces, rules), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(path + ".tmp", path)
+        # Chunks already sent may still need the previous state, older ones are gone
+        stale = os.path.join(self._state_dir, f"state-{self.generation - 2}.pkl")
+        if os.path.exists(stale):
+            os.unlink(stale)
+        self._state = (self.generation, path)
+        logger.info(f"Sent state {self.generation} to the log parsing processes")
+
+    def parse(self, namespace, lines):
+        """Parse the log lines of a namespace in the worker processes.
+
+        At most two chunks per worker are in flight, so that lines read faster than they
+        are parsed wait in the kubectl pipe rather than in memory.
+
+        Args:
+            namespace (str): The namespace the logs were collected from
+            lines (str or iterable): The log lines
+
+        Returns:
+            A tuple containing:
+            - List of (source, target, {'weight': number of requests}) communications
+            - Dictionary of http_host counts for this namespace
+        """
+        if isinstance(lines, str):
+            lines = lines.split('\n')
+        edges = Counter()
+        host_counts = {}
+        traced_namespaces = tracing.tracer.config()
+        pending = deque()
+
+        def collect(future):
+            chunk_edges, chunk_counts, chunk_probes = future.result()
+            edges.update(chunk_edges)
+            merge_host_counts(host_counts, chunk_counts)
+            if chunk_probes:
+                probe_counter.add(namespace, chunk_probes)
+
+        try:
+            chunk = []
+            for line in lines:
+                chunk.append(line)
+                if len(chunk) >= self.chunk_lines:
+                    pending.append(self._executor.submit(_parse_chunk, self._state, namespace, chunk, traced_namespaces))
+                    chunk = []
+                    if len(pending) >= 2 * self.processes:
+                        collect(pending.popleft())
+            if chunk:
+                pending.append(self._executor.submit(_parse_chunk, self._state, namespace, chunk, traced_namespaces))
+            while pending:
+                collect(pending.popleft())
+        except BrokenProcessPool:
+            self.broken = True
+            raise
+        finally:
+            for future in pending:
+                future.cancel()
+
+        communications = [(source, target, {'weight': weight}) for (source, target), weight in edges.items()]
+        return communications, {namespace: host_counts}
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        shutil.rmtree(self._state_dir, ignore_errors=True)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def parse_processes():
+    """Return the number of worker processes to use, 0 to parse in the collection threads."""
+    processes = PARSE_PROCESSES if PARSE_PROCESSES is not None else os.cpu_count() or 1
+    # A single worker would only add the transfers to the parsing of one core
+    return processes if processes > 1 else 0
+
+
+def start_parse_pool(pods_with_ips, namespaces, inventory_version=None):
+    """Make the pool parse for the pods and namespaces of a cycle.
+
+    The worker processes are kept and receive the new pods, namespaces or source rules
+    when they changed; they are only replaced when the pool is broken.
+
+    Args:
+        pods_with_ips (dict): Dictionary of pods with their IPs
+        namespaces (list): List of known namespaces
+        inventory_version: Value that changes whenever the pods change, None to compare the pods
+
+    Returns:
+        ParsePool: The pool, or None if parsing stays in the collection threads
+    """
+    global _pool
+    processes = parse_processes()
+    with _pool_lock:
+        if _pool is not None and _pool.broken:
+            _pool.shutdown()
+            _pool = None
+        if _pool is None and processes:
+            logger.info(f"Starting {processes} log parsing processes")
+            _pool = ParsePool(processes)
+        if _pool is not None:
+            _pool.update(pods_with_ips, namespaces, inventory_version)
+        return _pool
+
+
+def get_parse_pool(pods_with_ips):
+    """Return the active pool if it parses for these pods, None otherwise."""
+    pool = _pool
+    if pool is not None and not pool.broken and pool.pods_with_ips is pods_with_ips:
+        return pool
+    return None
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
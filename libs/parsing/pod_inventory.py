@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Watch-driven pod inventory for Kubernetes Communications Graph Visualizer
+
+Keeps a long-lived inventory of the pods and their IPs of every context. Each context
+is listed once with a single all-namespaces call, then kept up to date by a watch that
+resumes from the last resourceVersion, so steady-state graph refreshes read the
+inventory from memory without any call to the cluster.
+"""
+
+import json
+import subprocess
+import threading
+from urllib.parse import urlencode
+
+from config.constants import COLLECTION_BACKEND, POD_INVENTORY_WATCH, POD_WATCH_TIMEOUT, FOLLOWER_BACKOFF_MIN, FOLLOWER_BACKOFF_MAX
+from libs.parsing.kube_api import KubeApiError, get_api_client
+from libs.parsing.kubernetes import get_pod_info
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+class ResourceExpired(Exception):
+    """Raised when the watch resourceVersion is too old and the pods must be listed again."""
+
+
+class ContextPodInventory:
+    """Pod inventory of one context, listed once and kept up to date by a watch."""
+
+    def __init__(self, context, kubeconfig):
+        """Initialize the inventory.
+
+        Args:
+            context (str): The Kubernetes context
+            kubeconfig (str): Path to the kubeconfig file
+        """
+        self.context = context
+        self.kubeconfig = kubeconfig
+        self.resource_version = None
+        self.version = 0  # Incremented on every change, lets consumers cache derived data
+        self._pods = {}  # (namespace, pod name) -> pod info
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watch_thread = None
+        self._process = None
+
+    def _get_raw(self, path, params):
+        """Read an API path with the configured backend and return the decoded JSON."""
+        if COLLECTION_BACKEND == "api":
+            return get_api_client(self.context, self.kubeconfig).get_json(path, params)
+        cmd = ["kubectl", "get", "--raw", f"{path}?{urlencode(params)}"]
+        if self.kubeconfig:
+            cmd[1:1] = ["--kubeconfig", self.kubeconfig]
+        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        return json.loads(result.stdout)
+
+    def sync(self):
+        """List every pod of the context with one call and replace the inventory."""
+        pods_data = self._get_raw("/api/v1/pods", {"limit": 0})
+        pods = {
+            (pod["metadata"]["namespace"], pod["metadata"]["name"]): get_pod_info(pod, self.context)
+            for pod in pods_data["items"]
+        }
+        with self._lock:
+            self._pods = pods
+            self.resource_version = pods_data["metadata"].get("resourceVersion")
+            self.version += 1
+            self._snapshot = None
+        logger.info(f"Listed {len(pods)} pods in context {self.context} at resourceVersion {self.resource_version}")
+
+    def start_watch(self):
+        """Start the background watch thread if it is not already running."""
+        if self._watch_thread and self._watch_thread.is_alive():
+            return
+        self._stop_event.clear()
+        self._watch_thread = threading.Thread(target=self._watch_loop, name=f"pod-watch-{self.context}", daemon=True)
+        self._watch_thread.start()
+
+    def stop(self):
+        """Stop the watch thread."""
+        self._stop_event.set()
+        process = self._process
+        if process and process.poll() is None:
+            process.terminate()
+
+    def _watch_loop(self):
+        """Watch pod events until stopped, relisting when the resourceVersion expires."""
+        backoff = FOLLOWER_BACKOFF_MIN
+        while not self._stop_event.is_set():
+            try:
+                if self.resource_version is None:
+                    self.sync()
+                if self._watch() > 0:
+                    backoff = FOLLOWER_BACKOFF_MIN
+                    continue
+            except ResourceExpired:
+                logger.info(f"Pod watch resourceVersion expired in context {self.context}, listing pods again")
+                self.resource_version = None
+                continue
+            except (KubeApiError, OSError, ValueError, KeyError, subprocess.SubprocessError) as e:
+                logger.warning(f"Pod watch failed in context {self.context}: {e}")
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, FOLLOWER_BACKOFF_MAX)
+
+    def _watch(self):
+        """Run one watch request from the current resourceVersion until the server ends it.
+
+        Returns:
+            int: Number of events received
+        """
+        params = {"watch": 1, "resourceVersion": self.resource_version,
+                  "allowWatchBookmarks": "true", "timeoutSeconds": POD_WATCH_TIMEOUT}
+        if COLLECTION_BACKEND == "api":
+            client = get_api_client(self.context, self.kubeconfig)
+            return self._apply_events(client.iter_lines("/api/v1/pods", params, timeout=POD_WATCH_TIMEOUT + 30))
+
+        cmd = ["kubectl", "get", "--raw", f"/api/v1/pods?{urlencode(params)}"]
+        if self.kubeconfig:
+            cmd[1:1] = ["--kubeconfig", self.kubeconfig]
+        self._process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        try:
+            events = self._apply_events(self._process.stdout)
+        finally:
+            if self._process.poll() is None:
+                self._process.terminate()
+            self._process.stdout.close()
+            stderr = self._process.stderr.read()
+            self._process.stderr.close()
+            returncode = self._process.wait()
+        if returncode and not self._stop_event.is_set():
+            raise subprocess.SubprocessError(f"kubectl watch exited with code {returncode}: {stderr.strip()[:300]}")
+        return events
+
+    def _apply_events(self, lines):
+        """Apply watch events to the inventory."""
+        events = 0
+        for line in lines:
+            if self._stop_event.is_set():
+                break
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            event_type = event.get("type")
+            obj = event.get("object", {})
+            if event_type == "ERROR":
+                if obj.get("code") == 410:
+                    raise ResourceExpired()
+                raise KubeApiError(obj.get("code"), obj.get("message", "watch error"))
+
+            events += 1
+            metadata = obj.get("metadata", {})
+            with self._lock:
+                self.resource_version = metadata.get("resourceVersion", self.resource_version)
+                if event_type == "BOOKMARK":
+                    continue
+                key = (metadata["namespace"], metadata["name"])
+                if event_type == "DELETED":
+                    self._pods.pop(key, None)
+                else:
+                    info = get_pod_info(obj, self.context)
+                    if self._pods.get(key) == info:
+                        continue
+                    self._pods[key] = info
+                self.version += 1
+                self._snapshot = None
+        return events
+
+    def pods_with_ips(self):
+        """Return the inventory as {namespace: {pod name: pod info}}, cached until the next change."""
+        with self._lock:
+            if self._snapshot is None:
+                snapshot = {}
+                for (namespace, pod_name), info in self._pods.items():
+                    snapshot.setdefault(namespace, {})[pod_name] = info
+                self._snapshot = snapshot
+            return self._snapshot
+
+
+class PodInventory:
+    """Pod inventories of every context, shared across graph refreshes."""
+
+    def __init__(self):
+        self._inventories = {}
+        self._lock = threading.Lock()
+
+    def get(self, context, kubeconfig):
+        """Return the inventory of a context, listing its pods and starting its watch on first use.
+
+        Without POD_INVENTORY_WATCH the pods are listed again on every call.
+        """
+        with self._lock:
+            inventory = self._inventories.get(context)
+            if inventory is None or inventory.kubeconfig != kubeconfig:
+                if inventory:
+                    inventory.stop()
+                inventory = ContextPodInventory(context, kubeconfig)
+                self._inventories[context] = inventory
+                created = True
+            else:
+                created = False
+
+        if created or not POD_INVENTORY_WATCH:
+            inventory.sync()
+        if POD_INVENTORY_WATCH:
+            inventory.start_watch()
+        return inventory
+
+    def versions(self, contexts):
+        """Return the change counters of the inventories of some contexts.
+
+        The tuple changes whenever a pod of one of these contexts changes, so consumers can
+        tell whether the pods they derived data from are still current without comparing them.
+        """
+        with self._lock:
+            return tuple((context, self._inventories[context].version if context in self._inventories else None)
+                         for context in contexts)
+
+    def retain(self, contexts):
+        """Stop and forget the inventories of contexts that are no longer configured."""
+        with self._lock:
+            for context in [c for c in self._inventories if c not in contexts]:
+                self._inventories.pop(context).stop()
+                logger.info(f"Stopped pod inventory of context {context}")
+
+
+# Watch-driven pod inventories, one per context
+pod_inventory = PodInventory()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Probe traffic filter for Kubernetes Communications Graph Visualizer
+
+Healthcheck and monitoring requests (the metrics_paths of CUSTOM_RULES_FILE, matched by a
+single regex of all the paths) are often a large share of the log lines. With PROBE_FILTER
+set to "count" or "drop", parse_logs filters them out before the source attribution, so
+they never become communications, http_host counts or database updates. In "count" mode
+they are counted per namespace and metrics path in the probe counter, served by the
+/probes route; "keep" records them like any other request.
+"""
+
+import threading
+from collections import Counter
+
+from config.constants import PROBE_FILTER
+
+PROBE_FILTER_MODES = ("count", "drop", "keep")
+
+
+class ProbeCounter:
+    """Number of filtered probe requests per namespace and metrics path."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, namespace, counts):
+        """Add the probe requests of one parse of a namespace, {metrics path: count}."""
+        with self._lock:
+            self._counts.setdefault(namespace, Counter()).update(counts)
+
+    def take(self, namespace):
+        """Remove and return the counts of a namespace, to send them from a parsing process."""
+        with self._lock:
+            return dict(self._counts.pop(namespace, {}))
+
+    def snapshot(self):
+        """Return the counts of every namespace and their total."""
+        with self._lock:
+            namespaces = {namespace: dict(counts) for namespace, counts in self._counts.items()}
+        return {
+            "mode": PROBE_FILTER,
+            "total": sum(sum(counts.values()) for counts in namespaces.values()),
+            "namespaces": namespaces,
+        }
+
+
+# Counter of the probe requests filtered by parse_logs
+probe_counter = ProbeCounter()
+
+
+def probe_filter_mode():
+    """Return PROBE_FILTER, raising ValueError if it is not a known mode."""
+    if PROBE_FILTER not in PROBE_FILTER_MODES:
+        raise ValueError(f"PROBE_FILTER must be one of {', '.join(PROBE_FILTER_MODES)}, not {PROBE_FILTER!r}")
+    return PROBE_FILTER
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Offline replay source for Kubernetes Communications Graph Visualizer
+
+Builds the graph from recorded logs instead of a live cluster, which makes production
+cycles reproducible and their performance measurable without cluster access. A replay
+directory holds one subdirectory per context (or is itself a single context):
+
+    <replay dir>/<context>/pods.json        output of "kubectl get pods -A -o json"
+    <replay dir>/<context>/<namespace>.log  recorded nginx JSON log lines of the namespace
+
+Log files are memory-mapped and parsed in chunks of whole lines, so large recordings
+are never loaded into memory at once.
+"""
+
+import json
+import mmap
+import os
+import time
+from collections import defaultdict
+
+from config.constants import REPLAY_DIR, REPLAY_CHUNK_BYTES
+from libs.parsing.kubernetes import get_pod_info
+from libs.parsing.logs import parse_logs
+from libs.parsing.parse_pool import get_parse_pool
+from libs.parsing.log_aggregation import HostCounts
+
+# Global logger (will be set by the main script)
+logger = None
+
+# Replay directory in use, REPLAY_DIR unless set from the command line
+replay_dir = REPLAY_DIR
+
+PODS_SNAPSHOT_FILE = "pods.json"
+LOG_FILE_SUFFIX = ".log"
+
+
+def iter_log_chunks(path, chunk_bytes=REPLAY_CHUNK_BYTES):
+    """Yield the content of a log file in chunks ending on line boundaries.
+
+    Args:
+        path (str): Path of the log file
+        chunk_bytes (int): Approximate size of each chunk
+
+    Yields:
+        str: Successive chunks of whole lines
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            start = 0
+            size = len(mm)
+            while start < size:
+                end = min(start + chunk_bytes, size)
+                if end < size:
+                    # Extend the chunk to the end of its last line
+                    newline = mm.find(b"\n", end)
+                    end = size if newline == -1 else newline + 1
+                yield mm[start:end].decode("utf-8", errors="replace")
+                start = end
+
+
+class ReplaySource:
+    """Recorded contexts, pod inventories and namespace logs of a replay directory."""
+
+    def __init__(self, path):
+        """Initialize the source.
+
+        Args:
+            path (str): The replay directory
+        """
+        self.path = path
+        if os.path.isfile(os.path.join(path, PODS_SNAPSHOT_FILE)):
+            self._context_dirs = {os.path.basename(os.path.normpath(path)): path}
+        else:
+            self._context_dirs = {
+                name: os.path.join(path, name) for name in sorted(os.listdir(path))
+                if os.path.isfile(os.path.join(path, name, PODS_SNAPSHOT_FILE))
+            }
+        if not self._context_dirs:
+            raise FileNotFoundError(f"No {PODS_SNAPSHOT_FILE} found in replay directory {path}")
+
+    def contexts(self):
+        """Return the recorded contexts."""
+        return list(self._context_dirs)
+
+    def pods_with_ips(self, excluded_namespaces):
+        """Return the recorded pods of every context, in the format of get_all_pods_with_ips_in_namespaces."""
+        pods_with_ips = {}
+        for context, context_dir in self._context_dirs.items():
+            with open(os.path.join(context_dir, PODS_SNAPSHOT_FILE)) as f:
+                pods_data = json.load(f)
+            for pod in pods_data["items"]:
+                namespace = pod["metadata"]["namespace"]
+                if namespace not in excluded_namespaces:
+                    pods_with_ips.setdefault(namespace, {})[pod["metadata"]["name"]] = get_pod_info(pod, context)
+        return pods_with_ips
+
+    def namespaces(self, context, excluded_namespaces):
+        """Return the non-excluded namespaces of a context that have a log file."""
+        context_dir = self._context_dirs.get(context)
+        if context_dir is None:
+            return []
+        return sorted(
+            name[:-len(LOG_FILE_SUFFIX)] for name in os.listdir(context_dir)
+            if name.endswith(LOG_FILE_SUFFIX) and name[:-len(LOG_FILE_SUFFIX)] not in excluded_namespaces
+        )
+
+    def parse_namespace(self, context, namespace, namespaces=None, pods_with_ips=None):
+        """Parse the recorded logs of a namespace chunk by chunk.
+
+        Returns:
+            A tuple containing:
+            - List of communications detected
+            - Dictionary of http_host counts for this namespace
+        """
+        path = os.path.join(self._context_dirs[context], namespace + LOG_FILE_SUFFIX)
+        local_http_host_counts = defaultdict(lambda: defaultdict(HostCounts))
+        communications = []
+        started = time.time()
+        pool = get_parse_pool(pods_with_ips)
+        if pool is not None:
+            lines = (line for chunk in iter_log_chunks(path) for line in chunk.split('\n'))
+            communications, local_http_host_counts = pool.parse(namespace, lines)
+        else:
+            for chunk in iter_log_chunks(path):
+                communications.extend(parse_logs(chunk, namespace, {namespace: local_http_host_counts[namespace]}, namespaces, pods_with_ips))
+        logger.info(f"Replayed {os.path.getsize(path)} bytes of logs of namespace {namespace} in context {context} "
+                    f"in {time.time() - started:.3f}s")
+        return communications, local_http_host_counts
+
+
+def set_replay_dir(path):
+    """Set the replay directory, None to collect from the clusters."""
+    global replay_dir
+    replay_dir = path
+
+
+def get_replay_source():
+    """Return the ReplaySource of the replay directory, or None when collecting from the clusters."""
+    return ReplaySource(replay_dir) if replay_dir else None
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
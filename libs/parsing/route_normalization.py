@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Route normalization of request paths for Kubernetes Communications Graph Visualizer
+
+Raw request paths have an unbounded cardinality (ids, tokens), so they are turned into
+route templates before they are counted per (http_host, source) and per edge:
+
+    rules:
+      routes:                                     # first matching pattern wins (optional)
+        - pattern: '/orders/[^/]+/items/[^/]+'    # regex matching the whole path
+          route: /orders/{order}/items/{item}
+
+The paths that match no pattern have their numeric, UUID and long hexadecimal or token
+segments collapsed ("/orders/1234" -> "/orders/{id}"). The query string is ignored, and
+the route is prefixed by the method ("GET /orders/{id}"). The templates of the last
+ROUTE_CACHE_SIZE distinct requests (without their query string) are kept in an LRU cache,
+so a request seen recently costs a dictionary lookup. The counts of a key or an edge keep
+at most ROUTE_MAX_PER_KEY or ROUTE_MAX_PER_EDGE routes, the others are counted as "other".
+"""
+
+import re
+from collections import OrderedDict
+
+from config.constants import ROUTE_CACHE_SIZE, ROUTE_MAX_PER_KEY
+
+# Route of the requests beyond the routes kept for a key or an edge
+OTHER_ROUTE = "other"
+
+_REQUEST = re.compile(r'([A-Z]+) (\S+)')
+
+# Segments collapsed when no pattern matches the path, tried in order after the numeric ones
+_SEGMENTS = (
+    (re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}'), "{uuid}"),
+    (re.compile(r'[0-9a-fA-F]{16,}'), "{hash}"),
+    # Long tokens mixing letters and digits, such as session ids or base64 keys
+    (re.compile(r'(?=[^/]*\d)[\w\-=.~%]{20,}'), "{token}"),
+)
+
+_MISSING = object()
+
+
+class RouteNormalizer:
+    """The route patterns of a rules file, with an LRU cache of the routes of recent requests."""
+
+    def __init__(self, config=None, cache_size=ROUTE_CACHE_SIZE):
+        """Compile the route patterns, raising ValueError if they are invalid.
+
+        Args:
+            config (list): The "routes" section of the rules file, [{"pattern", "route"}]
+            cache_size (int): Number of requests whose route is cached
+        """
+        self.patterns = []
+        for index, spec in enumerate(config or []):
+            if not isinstance(spec, dict) or "pattern" not in spec or "route" not in spec:
+                raise ValueError(f"Route {index} must have a pattern and a route")
+            self.patterns.append((re.compile(spec["pattern"]), str(spec["route"])))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def __getstate__(self):
+        # The cache is not sent to the parsing processes
+        state = self.__dict__.copy()
+        state["_cache"] = OrderedDict()
+        return state
+
+    def normalize(self, request):
+        """Return the route of a request line ("GET /orders/{id}"), None if it is not a request."""
+        # The cache key is the request without its query string
+        key = request.partition('?')[0]
+        cache = self._cache
+        route = cache.get(key, _MISSING)
+        if route is not _MISSING:
+            try:
+                cache.move_to_end(key)
+            except KeyError:
+                # Evicted by another thread in between
+                pass
+            return route
+        route = self._route(key)
+        cache[key] = route
+        if len(cache) > self.cache_size:
+            try:
+                cache.popitem(last=False)
+            except KeyError:
+                pass
+        return route
+
+    def _route(self, request):
+        """Return the route of a request line, without the cache."""
+        m = _REQUEST.match(request)
+        if not m:
+            return None
+        method, path = m.groups()
+        for pattern, route in self.patterns:
+            if pattern.fullmatch(path):
+                return f"{method} {route}"
+        return f"{method} {'/'.join(collapse_segment(segment) for segment in path.split('/'))}"
+
+
+def collapse_segment(segment):
+    """Return the placeholder of a path segment that looks like an identifier, or the segment."""
+    if segment.isdigit():
+        return "{id}"
+    # Shorter than the shortest hash, the common case of a route segment
+    if len(segment) < 16:
+        return segment
+    for pattern, placeholder in _SEGMENTS:
+        if pattern.fullmatch(segment):
+            return placeholder
+    return segment
+
+
+def merge_route_counts(routes, other, size=ROUTE_MAX_PER_KEY):
+    """Add route counts to others, keeping at most size routes besides OTHER_ROUTE.
+
+    Args:
+        routes (dict): {route: count}, None if there are none yet
+        other (dict): {route: count} to add
+
+    Returns:
+        dict: The merged counts, a new dictionary if routes was None
+    """
+    merged = routes if routes is not None else {}
+    # The most frequent routes of other are taken first when there is no room for all of them
+    for route, count in sorted(other.items(), key=lambda item: -item[1]):
+        if route in merged:
+            merged[route] += count
+        elif route != OTHER_ROUTE and len(merged) - (OTHER_ROUTE in merged) < size:
+            merged[route] = count
+        else:
+            merged[OTHER_ROUTE] = merged.get(OTHER_ROUTE, 0) + count
+    return merged
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Source classification rules for Kubernetes Communications Graph Visualizer
+
+Requests whose remote address is not a known pod are attributed to a source by the
+ordered rules of CUSTOM_RULES_FILE:
+
+    rules:
+      metrics_paths: ["/metrics", ...]       # healthcheck and monitoring requests (see PROBE_FILTER)
+      ip_addresses:                          # named address ranges (CIDR or textual prefix)
+        kube_workers: ["10.121.232.0/24"]
+      sources:                               # first matching rule wins
+        - range: kube_workers                # remote address in a named range (optional)
+          auth: present                      # present, absent or any (default any)
+          namespace: my-namespace            # namespace of the logs (optional)
+          request: 'regex with (?P<group>)'  # searched in the request line (optional)
+          source: "{auth}"                   # template: auth, namespace, ip and the request groups
+      routes:                                # route templates of the request paths (see route_normalization.py)
+        - pattern: '/orders/[^/]+'           # regex matching the whole path
+          route: /orders/{order}
+
+The rules are compiled once per load: the ranges into a hashed prefix table, and the
+rules that can apply to a (range, auth, namespace) combination into a plan holding a
+single combined regex of their request patterns. Attributing a line then costs a prefix
+lookup, a plan lookup and at most one regex match. The file is reloaded when it changes.
+"""
+
+import os
+import re
+import threading
+import yaml
+
+from config.constants import CUSTOM_RULES_FILE
+from libs.parsing.ip_index import PrefixTable
+from libs.parsing.route_normalization import RouteNormalizer
+
+# Global logger (will be set by the main script)
+logger = None
+
+AUTH_CONDITIONS = ("present", "absent", "any")
+
+# Rules used when the file has no "sources" section: the auth field, or "unknown"
+DEFAULT_SOURCE_RULES = [
+    {"auth": "present", "source": "{auth}"},
+    {"source": "unknown"},
+]
+
+_GROUP_NAME = re.compile(r'\(\?P([<=])(\w+)')
+
+# Constructs that change meaning or fail once a pattern is embedded in the combined regex
+# of a plan: inline global flags such as (?i), and numbered backreferences such as \1
+_GLOBAL_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+_NUMBERED_BACKREF = re.compile(r'(?<!\\)(?:\\\\)*\\[1-9]')
+
+
+def _alternative(rule):
+    """Return the request pattern of a rule as an alternative of the combined regex of a plan.
+
+    The groups are prefixed with the rule so that the alternatives can be combined, and each
+    alternative is a lookahead anchored at the start, so that the rules are tried in order
+    and each pattern is searched anywhere in the request.
+    """
+    key = f"_r{rule.index}"
+    pattern = _GROUP_NAME.sub(lambda m: f"(?P{m.group(1)}{key}_{m.group(2)}", rule.request)
+    return f"(?=.*?(?P<{key}>{pattern}))"
+
+
+class SourceRule:
+    """One compiled rule of the "sources" section."""
+
+    def __init__(self, index, spec, ranges):
+        """Validate a rule, raising ValueError if it is invalid.
+
+        Args:
+            index (int): Position of the rule in the file
+            spec (dict): The rule as loaded from YAML
+            ranges (set): Names of the ranges of the "ip_addresses" section
+        """
+        self.index = index
+        self.name = spec.get("name", f"rule {index + 1}")
+        self.range = spec.get("range")
+        self.auth = spec.get("auth", "any")
+        self.namespace = spec.get("namespace")
+        self.request = spec.get("request")
+        self.source = str(spec.get("source", ""))
+        if self.range is not None and self.range not in ranges:
+            raise ValueError(f"{self.name}: unknown range {self.range!r}")
+        if self.auth not in AUTH_CONDITIONS:
+            raise ValueError(f"{self.name}: auth must be one of {', '.join(AUTH_CONDITIONS)}")
+        if self.request is not None:
+            if _GLOBAL_FLAGS.search(self.request):
+                raise ValueError(f"{self.name}: inline global flags are not supported in request, "
+                                 f"use a scoped group such as (?i:...) instead")
+            if _NUMBERED_BACKREF.search(self.request):
+                raise ValueError(f"{self.name}: numbered backreferences are not supported in request, "
+                                 f"use a named group and (?P=name) instead")
+            # Compile the pattern as a plan embeds it, so that it fails here rather than at parse time
+            try:
+                re.compile("^(?:" + _alternative(self) + ")", re.DOTALL)
+            except re.error as e:
+                raise ValueError(f"{self.name}: invalid request pattern {self.request!r}: {e}")
+
+    def applies(self, address_range, has_auth, namespace):
+        """Return True if every condition but the request pattern holds."""
+        return ((self.range is None or self.range == address_range)
+                and (self.auth == "any" or (self.auth == "present") == has_auth)
+                and (self.namespace is None or self.namespace == namespace))
+
+
+class RulePlan:
+    """The rules that can apply to one (range, auth, namespace), with their request patterns combined."""
+
+    def __init__(self, rules):
+        """Compile the plan.
+
+        Args:
+            rules (list): Applicable rules in file order; the list stops at the first rule
+                without a request pattern, which always matches
+        """
+        self.rules = {}
+        self.default = None
+        alternatives = []
+        for rule in rules:
+            if rule.request is None:
+                self.default = rule
+                break
+            self.rules[f"_r{rule.index}"] = rule
+            alternatives.append(_alternative(rule))
+        self.regex = re.compile("^(?:" + "|".join(alternatives) + ")", re.DOTALL) if alternatives else None
+
+    def match(self, request):
+        """Return the first matching rule and the groups of its request pattern."""
+        if self.regex is not None:
+            m = self.regex.match(request)
+            if m:
+                # The group of the rule encloses its own groups, so it is the last one closed
+                rule = self.rules[m.lastgroup]
+                prefix = m.lastgroup + "_"
+                return rule, {name[len(prefix):]: value or "" for name, value in m.groupdict().items()
+                              if name.startswith(prefix)}
+        return self.default, {}
+
+
+class SourceRules:
+    """The compiled metrics paths, address ranges and source rules of a rules file."""
+
+    def __init__(self, config):
+        """Compile the rules, raising ValueError if they are invalid.
+
+        Args:
+            config (dict): The "rules" section of the file
+        """
+        config = config or {}
+        metrics_paths = config.get("metrics_paths") or []
+        self.metrics = re.compile("|".join(re.escape(path) for path in metrics_paths), re.IGNORECASE) if metrics_paths else None
+
+        ip_addresses = config.get("ip_addresses") or {}
+        self.ranges = PrefixTable()
+        for name, address_ranges in ip_addresses.items():
+            for address_range in address_ranges or []:
+                self.ranges.add(str(address_range), name)
+
+        self.rules = [SourceRule(index, spec, set(ip_addresses))
+                      for index, spec in enumerate(config.get("sources") or DEFAULT_SOURCE_RULES)]
+        self._namespaces = {rule.namespace for rule in self.rules if rule.namespace is not None}
+        self._plans = {}
+        self.routes = RouteNormalizer(config.get("routes"))
+
+    def probe(self, request):
+        """Return the metrics path found in a healthcheck or monitoring request, in lower case, or None."""
+        if self.metrics is None:
+            return None
+        m = self.metrics.search(request)
+        return m.group().lower() if m else None
+
+    def classify(self, ip, auth, namespace, request):
+        """Return the source of a request from an address that is not a known pod.
+
+        Returns:
+            tuple: (source, rule name), ("unknown", None) if no rule matches
+        """
+        address_range = self.ranges.lookup(ip)
+        # Plans only differ per namespace for the namespaces named by a rule
+        key = (address_range, bool(auth), namespace if namespace in self._namespaces else None)
+        plan = self._plans.get(key)
+        if plan is None:
+            plan = self._plans[key] = RulePlan([rule for rule in self.rules
+                                                if rule.applies(address_range, bool(auth), namespace)])
+        rule, groups = plan.match(request)
+        if rule is None:
+            return "unknown", None
+        try:
+            return rule.source.format_map(dict(groups, auth=auth, namespace=namespace, ip=ip)), rule.name
+        except (KeyError, IndexError, ValueError) as e:
+            logger.warning(f"Invalid source template {rule.source!r} in {rule.name}: {e}")
+            return "unknown", rule.name
+
+
+_rules = None
+_rules_mtime = None
+_rules_generation = 0  # Incremented whenever other rules are put in use
+_rules_lock = threading.Lock()
+
+
+def load_source_rules(path=CUSTOM_RULES_FILE):
+    """Load and compile a rules file.
+
+    Returns:
+        SourceRules: The compiled rules, the default rules if the file does not exist
+    """
+    if not os.path.exists(path):
+        logger.warning(f"Rules file {path} not found, using the default source rules")
+        return SourceRules({})
+    with open(path) as f:
+        config = yaml.safe_load(f) or {}
+    rules = SourceRules(config.get("rules"))
+    logger.info(f"Loaded {len(rules.rules)} source rules from {path}")
+    return rules
+
+
+def reload_source_rules(force=False):
+    """Reload the rules file if it changed since it was loaded.
+
+    An invalid file is reported and the rules in use are kept.
+
+    Returns:
+        bool: True if new rules were loaded
+    """
+    global _rules, _rules_mtime, _rules_generation
+    with _rules_lock:
+        try:
+            mtime = os.path.getmtime(CUSTOM_RULES_FILE)
+        except OSError:
+            mtime = None
+        if _rules is not None and not force and mtime == _rules_mtime:
+            return False
+        try:
+            _rules = load_source_rules(CUSTOM_RULES_FILE)
+        except (OSError, yaml.YAMLError, ValueError, re.error) as e:
+            logger.error(f"Invalid rules file {CUSTOM_RULES_FILE}, keeping the current rules: {e}")
+            if _rules is None:
+                _rules = SourceRules({})
+                _rules_generation += 1
+            return False
+        _rules_mtime = mtime
+        _rules_generation += 1
+        return True
+
+
+def set_source_rules(rules):
+    """Use already compiled rules, such as those of the parent of a parsing process."""
+    global _rules, _rules_generation
+    with _rules_lock:
+        _rules = rules
+        _rules_generation += 1
+
+
+def get_source_rules():
+    """Return the compiled rules in use, loading them on first use."""
+    if _rules is None:
+        reload_source_rules()
+    return _rules
+
+
+def get_rules_generation():
+    """Return a number that changes whenever other rules are put in use, such as after a reload."""
+    return _rules_generation
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Traffic-aware tail sizing for Kubernetes Communications Graph Visualizer
+
+In "tail" collection mode, learns the line rate and line size of each namespace across
+cycles and sizes every fetch as a time window (the logs written since the previous
+fetch), capped by a number of lines derived from per-namespace byte budgets. The sum
+of the budgets of a cycle is kept within a global budget, spent on the namespaces
+with the most traffic, instead of reading LOG_LINES_LIMIT lines everywhere.
+"""
+
+import math
+import threading
+import time
+
+from config.constants import (LOG_LINES_LIMIT, TAIL_MIN_BYTES, TAIL_MAX_BYTES, TAIL_CYCLE_BYTES,
+                              TAIL_RATE_SMOOTHING, TAIL_HEADROOM)
+
+# Global logger (will be set by the main script)
+logger = None
+
+# Line size assumed until a namespace's logs have been seen once
+DEFAULT_LINE_BYTES = 300
+
+
+class NamespaceTraffic:
+    """Learned traffic of one namespace and the fetch planned for the current cycle."""
+
+    def __init__(self):
+        self.rate = None  # Lines per second, smoothed across cycles
+        self.line_bytes = DEFAULT_LINE_BYTES  # Average line size, smoothed across cycles
+        self.last_fetch = None  # Start of the previous fetch
+        self.tail_lines = LOG_LINES_LIMIT  # Planned line cap of the fetch
+        self.window = None  # Planned time window of the fetch in seconds, None for the plain tail
+        self.started = None  # Start of the current fetch
+
+
+class TailSizer:
+    """Plans the window and line cap of every namespace fetch from the traffic observed before."""
+
+    def __init__(self, min_bytes=TAIL_MIN_BYTES, max_bytes=TAIL_MAX_BYTES, cycle_bytes=TAIL_CYCLE_BYTES):
+        """Initialize the sizer.
+
+        Args:
+            min_bytes (int): Smallest budget of a namespace fetch
+            max_bytes (int): Largest budget of a namespace fetch
+            cycle_bytes (int): Total budget of the fetches of one cycle
+        """
+        self.min_bytes = min_bytes
+        self.max_bytes = max_bytes
+        self.cycle_bytes = cycle_bytes
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def plan(self, keys):
+        """Plan the fetches of a cycle.
+
+        Args:
+            keys (iterable): (context, namespace) of every namespace collected in the cycle
+        """
+        now = time.time()
+        wanted = {}
+        keys = set(keys)
+        with self._lock:
+            # Forget the namespaces that are no longer collected
+            for key in [key for key in self._namespaces if key not in keys]:
+                del self._namespaces[key]
+            for key in keys:
+                traffic = self._namespaces.setdefault(key, NamespaceTraffic())
+                if traffic.last_fetch is None:
+                    # First fetch: the plain tail, which gives the line size
+                    traffic.window = None
+                    wanted[key] = LOG_LINES_LIMIT * traffic.line_bytes
+                else:
+                    traffic.window = max(1, math.ceil(now - traffic.last_fetch))
+                    if traffic.rate is None:
+                        wanted[key] = LOG_LINES_LIMIT * traffic.line_bytes
+                    else:
+                        wanted[key] = traffic.rate * traffic.window * traffic.line_bytes * TAIL_HEADROOM
+                wanted[key] = min(self.max_bytes, max(self.min_bytes, wanted[key]))
+
+            budgets = self._share(wanted)
+            for key, budget in budgets.items():
+                traffic = self._namespaces[key]
+                traffic.tail_lines = max(1, int(budget / traffic.line_bytes))
+
+        total = sum(budgets.values())
+        logger.info(f"Planned {len(budgets)} namespace fetches for {total / 1048576:.1f} MiB "
+                    f"(budget {self.cycle_bytes / 1048576:.1f} MiB)")
+
+    def _share(self, wanted):
+        """Fit the wanted budgets within the cycle budget.
+
+        Every namespace keeps at least the minimum budget, and what remains of the cycle
+        budget is shared in proportion to what each namespace wanted above the minimum.
+        """
+        total = sum(wanted.values())
+        if total <= self.cycle_bytes:
+            return wanted
+        floor = self.min_bytes * len(wanted)
+        extra = sum(budget - self.min_bytes for budget in wanted.values())
+        ratio = max(0, self.cycle_bytes - floor) / extra if extra else 0
+        return {key: self.min_bytes + (budget - self.min_bytes) * ratio for key, budget in wanted.items()}
+
+    def request(self, context, namespace, replicas=1):
+        """Return the window and line cap of the fetch of a namespace and mark its start.
+
+        Args:
+            context (str): The Kubernetes context
+            namespace (str): The namespace
+            replicas (int): Number of pods the namespace budget is split across
+
+        Returns:
+            tuple: (tail_lines, since_seconds) for each pod, since_seconds being None for the plain tail
+        """
+        with self._lock:
+            traffic = self._namespaces.setdefault((context, namespace), NamespaceTraffic())
+            if traffic.started is None:
+                traffic.started = time.time()
+            return max(1, math.ceil(traffic.tail_lines / max(1, replicas))), traffic.window
+
+    def observe(self, context, namespace, lines, size):
+        """Learn from the logs fetched for a namespace in this cycle.
+
+        A fetch that reached its line cap was truncated, so the observed rate is only a
+        lower bound and the estimate is doubled until the fetches fit again.
+
+        Args:
+            context (str): The Kubernetes context
+            namespace (str): The namespace
+            lines (int): Number of lines fetched from all the pods of the namespace
+            size (int): Number of bytes fetched
+        """
+        with self._lock:
+            traffic = self._namespaces.setdefault((context, namespace), NamespaceTraffic())
+            if lines:
+                line_bytes = size / lines
+                traffic.line_bytes += TAIL_RATE_SMOOTHING * (line_bytes - traffic.line_bytes)
+            if traffic.window:
+                rate = lines / traffic.window
+                if lines >= traffic.tail_lines:
+                    traffic.rate = max(rate, traffic.rate or 0) * 2
+                elif traffic.rate is None:
+                    traffic.rate = rate
+                else:
+                    traffic.rate += TAIL_RATE_SMOOTHING * (rate - traffic.rate)
+            traffic.last_fetch = traffic.started or time.time()
+            traffic.started = None
+        logger.debug(f"Namespace {namespace} in context {context}: {lines} lines over a window of "
+                     f"{traffic.window}s, rate estimate {traffic.rate} lines/s")
+
+
+# Tail sizes learned from the traffic of each namespace
+tail_sizer = TailSizer()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Hot path tracing for Kubernetes Communications Graph Visualizer
+
+The per-line messages of parse_logs and merge_thread_results are only built for the lines
+that are traced. A parse or merge asks the tracer for the trace of its namespace once, and
+gets None when the namespace is not traced, so that the cost of tracing a line when it is
+disabled is one "is not None" test:
+
+    trace = tracer.start(namespace)
+    for line in lines:
+        traced = trace is not None and trace.sample()
+        if traced:
+            trace.log(f"...")
+
+A namespace is traced when:
+- it was enabled at runtime (tracer.enable(), the /tracing route of the web UI): 1 line in
+  every sample_every is logged at INFO level
+- the logger is at DEBUG level: 1 line in every TRACE_SAMPLE_LINES is logged at DEBUG level
+"""
+
+import logging
+import threading
+
+from config.constants import TRACE_SAMPLE_LINES
+
+# Global logger (will be set by the main script)
+logger = None
+
+
+class LineTrace:
+    """Sampling of the lines of one parse or merge of a traced namespace."""
+
+    __slots__ = ("namespace", "sample_every", "level", "_count")
+
+    def __init__(self, namespace, sample_every, level):
+        """Initialize the trace.
+
+        Args:
+            namespace (str): The traced namespace
+            sample_every (int): One line in every sample_every is traced
+            level (int): Logging level of the messages
+        """
+        self.namespace = namespace
+        self.sample_every = sample_every
+        self.level = level
+        self._count = 0
+
+    def sample(self):
+        """Count a line, returning True if it is traced."""
+        self._count += 1
+        return self._count % self.sample_every == 0
+
+    def log(self, message):
+        """Log a message of a traced line."""
+        logger.log(self.level, f"[trace {self.namespace}] {message}")
+
+
+class HotPathTracer:
+    """Namespaces traced in the parse and merge hot paths."""
+
+    def __init__(self, sample_lines=TRACE_SAMPLE_LINES):
+        """Initialize the tracer.
+
+        Args:
+            sample_lines (int): One line in every sample_lines of every namespace is traced
+                when the logger is at DEBUG level, 0 to only trace the enabled namespaces
+        """
+        self.sample_lines = sample_lines
+        self._namespaces = {}
+        self._lock = threading.Lock()
+
+    def enable(self, namespace, sample_every=1):
+        """Trace one line in every sample_every of a namespace, at INFO level."""
+        if sample_every < 1:
+            raise ValueError("sample_every must be at least 1")
+        with self._lock:
+            namespaces = dict(self._namespaces)
+            namespaces[namespace] = sample_every
+            # Replaced rather than updated, so that start() reads it without the lock
+            self._namespaces = namespaces
+        logger.info(f"Tracing 1 line in {sample_every} of namespace {namespace}")
+
+    def disable(self, namespace):
+        """Stop tracing a namespace enabled with enable()."""
+        with self._lock:
+            namespaces = dict(self._namespaces)
+            removed = namespaces.pop(namespace, None) is not None
+            self._namespaces = namespaces
+        if removed:
+            logger.info(f"Stopped tracing namespace {namespace}")
+        return removed
+
+    def start(self, namespace):
+        """Return the trace of a parse or merge of a namespace, None if it is not traced."""
+        sample_every = self._namespaces.get(namespace)
+        if sample_every is not None:
+            return LineTrace(namespace, sample_every, logging.INFO)
+        if self.sample_lines and logger is not None and logger.isEnabledFor(logging.DEBUG):
+            return LineTrace(namespace, self.sample_lines, logging.DEBUG)
+        return None
+
+    def config(self):
+        """Return the enabled namespaces, to apply them with configure() in another process."""
+        return self._namespaces
+
+    def configure(self, namespaces):
+        """Replace the enabled namespaces with those returned by config()."""
+        self._namespaces = dict(namespaces)
+
+    def snapshot(self):
+        """Return the tracing state for the web UI."""
+        return {
+            "sample_lines": self.sample_lines,
+            "debug": logger is not None and logger.isEnabledFor(logging.DEBUG),
+            "namespaces": dict(self._namespaces),
+        }
+
+
+# Tracer shared by the parse and merge hot paths
+tracer = HotPathTracer()
+
+
+def set_logger(log_instance):
+    """Set the global logger."""
+    global logger
+    logger = log_instance
@@ -85,7 +85,7 @@ def generate_node_tooltip(node_id, http_host_counts, edge_count, pod_count, cont
     
     return title
 
-def generate_edge_tooltip(source, target, weight, http_host_counts):
+def generate_edge_tooltip(source, target, weight, http_host_counts, latency=None, routes=None):
     """
     Generates tooltip text for an edge.
     
@@ -94,6 +94,8 @@ def generate_edge_tooltip(source, target, weight, http_host_counts):
         target (str): Target node identifier
         weight (int): Edge weight (connection count)
         http_host_counts (dict): Dictionary containing HTTP host counts
+        latency (dict, optional): Response time quantiles of the edge in seconds
+        routes (dict, optional): Requests per route of the edge, most frequent first
         
     Returns:
         str: Formatted tooltip text
@@ -101,6 +103,15 @@ def generate_edge_tooltip(source, target, weight, http_host_counts):
     # Basic edge info
     edge_title = f"From: {source} To: {target}\nConnections detected in the last analysis: {weight}\n"
     
+    # Add the response time quantiles when the logs had response times
+    if latency and latency.get('count'):
+        edge_title += (f"Response time p50: {latency['p50'] * 1000:.1f} ms, p95: {latency['p95'] * 1000:.1f} ms, "
+                       f"p99: {latency['p99'] * 1000:.1f} ms\n")
+    
+    # Add the top 5 routes when the requests were counted per route
+    if routes:
+        edge_title += "Top routes: " + ", ".join(f"{route} ({count})" for route, count in list(routes.items())[:5]) + "\n"
+    
     # Add error counts from http_host_counts if available
     if target in http_host_counts:
         # Filter http_host entries related to this source
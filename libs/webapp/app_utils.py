@@ -8,13 +8,17 @@ Utility functions for the Kubernetes Communications Graph Web Application
 import json
 import threading
 import logging
+from collections.abc import Mapping
 
 # Initialize logger
 logger = logging.getLogger(__name__)
 
 def convert_dict_for_json(data):
-    """Convert any dictionary with non-string keys to string keys for JSON serialization"""
-    if isinstance(data, dict):
+    """Convert any dictionary with non-string keys to string keys for JSON serialization
+    
+    Read-only mappings, such as the HostCounts of the http_host counts, become dictionaries.
+    """
+    if isinstance(data, Mapping):
         # Create a new dictionary with string keys
         new_dict = {}
         for key, value in data.items():
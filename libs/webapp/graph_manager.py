@@ -33,6 +33,16 @@ graph_lock = threading.Lock()
 # Reference to the socketio instance
 socketio_instance = None
 
+# Graph kept from one cycle to the next, and the visualization attributes of its nodes and
+# edges, rebuilt only for those that changed
+graph_service = None
+node_payloads = {}
+edge_payloads = {}
+host_count_payloads = {}
+
+# Only one cycle updates the graph at a time
+build_lock = threading.Lock()
+
 def set_socketio(socketio):
     """Set the socketio instance for emitting updates"""
     global socketio_instance
@@ -43,96 +53,139 @@ def get_graph_data():
     with graph_lock:
         return graph_data
 
+def get_graph():
+    """Return the long-lived graph, created on first use"""
+    global graph_service
+    if graph_service is None:
+        graph_service = K8sCommunicationGraph(skip_logs=False)
+    return graph_service
+
+def node_payload(graph, node_id, attrs):
+    """Build the visualization attributes of a node of the simplified graph"""
+    node_attrs = {
+        'id': node_id,
+        'label': node_id, 
+        'shape': 'dot', 
+        'font': {'face': 'Roboto', 'size': 12}
+    }
+    
+    # Extract metadata
+    namespace = attrs.get('namespace', 'default')
+    color = graph.namespace_colors.get(namespace, '#90EE90')  # Use light_green as default color
+    pod_count = graph.namespace_pod_counts.get(namespace, 0)
+    edge_count = graph.simplified_graph.degree(node_id)  # Get node degree
+    
+    # Set node size based on the number of edges and pods
+    node_attrs['size'] = 4 + edge_count * 2 + pod_count / 4
+    
+    node_attrs['color'] = color
+    
+    # Set transparency based on the number of edges
+    node_attrs['opacity'] = 0.5 if (edge_count > 1 and edge_count < 25) else 0.8 if edge_count >= 25 else 1.0
+    
+    # Get the context for this node
+    context = attrs.get('context')
+    
+    # Generate node tooltip using the tooltip manager
+    node_attrs['title'] = generate_node_tooltip(
+        node_id, 
+        graph.http_host_counts, 
+        edge_count, 
+        pod_count,
+        context
+    )
+    return node_attrs
+
+def edge_payload(graph, source, target, attrs, latency=None, routes=None):
+    """Build the visualization attributes of an edge of the simplified graph"""
+    weight = attrs.get('weight', 1)
+    width = max(1, min(4, 1 + weight / 50))  # Scale width as in the original script
+    
+    # Generate edge tooltip using the tooltip manager
+    edge_title = generate_edge_tooltip(
+        source, 
+        target, 
+        weight, 
+        graph.http_host_counts,
+        latency,
+        routes
+    )
+    
+    return {
+        'from': source,
+        'to': target,
+        'weight': weight,
+        'width': width,
+        'smooth': {'type': 'continuous', 'roundness': 0.2},
+        'title': edge_title,
+        'latency': latency,
+        'routes': routes
+    }
+
 def build_graph_data():
-    """Build the graph data and update the global variable"""
+    """Update the long-lived graph with a new cycle and refresh the graph data.
+    
+    Only the nodes and edges that changed during the cycle are converted again; the others
+    keep the attributes built in the previous cycles.
+    """
     global graph_data
-    logger.info("Rebuilding graph data...")
+    if not build_lock.acquire(blocking=False):
+        logger.info("Graph update already in progress, skipping")
+        return None
+    logger.info("Updating graph data...")
     
     try:
-        # Create and build the graph
-        graph = K8sCommunicationGraph(skip_logs=False)
+        # Update the graph with the logs of this cycle
+        graph = get_graph()
         graph.build_graph()
+        simplified_graph = graph.simplified_graph
         
-        logger.info(f"Graph built successfully: {len(graph.simplified_graph.nodes())} nodes, {len(graph.simplified_graph.edges())} edges")
+        logger.info(f"Graph updated successfully: {len(simplified_graph.nodes())} nodes, {len(simplified_graph.edges())} edges")
         
-        # Extract nodes and edges from the simplified graph
-        nodes = []
-        for node_id, attrs in graph.simplified_graph.nodes(data=True):
-            node_attrs = {
-                'id': node_id,
-                'label': node_id, 
-                'shape': 'dot', 
-                'font': {'face': 'Roboto', 'size': 12}
-            }
-            
-            # Extract metadata
-            namespace = attrs.get('namespace', 'default')
-            color = graph.namespace_colors.get(namespace, '#90EE90')  # Use light_green as default color
-            pod_count = graph.namespace_pod_counts.get(namespace, 0)
-            edge_count = graph.simplified_graph.degree(node_id)  # Get node degree
-            
-            # Set node size based on the number of edges and pods
-            node_attrs['size'] = 4 + edge_count * 2 + pod_count / 4
-            
-            node_attrs['color'] = color
-            
-            # Set transparency based on the number of edges
-            node_attrs['opacity'] = 0.5 if (edge_count > 1 and edge_count < 25) else 0.8 if edge_count >= 25 else 1.0
-            
-            # Get the context for this node
-            context = attrs.get('context')
-            
-            # Generate node tooltip using the tooltip manager
-            node_attrs['title'] = generate_node_tooltip(
-                node_id, 
-                graph.http_host_counts, 
-                edge_count, 
-                pod_count,
-                context
-            )
-            
-            nodes.append(node_attrs)
+        changed_nodes, changed_edges = graph.simplified.take_changes()
         
-        logger.info(f"Processed {len(nodes)} nodes")
+        # The edges into and out of a changed node have new counts or a new degree
+        for node_id in changed_nodes:
+            if node_id in simplified_graph:
+                changed_edges.update(simplified_graph.in_edges(node_id))
+                changed_edges.update(simplified_graph.out_edges(node_id))
         
-        # Extract edges
-        edges = []
-        for source, target, attrs in graph.simplified_graph.edges(data=True):
-            weight = attrs.get('weight', 1)
-            width = max(1, min(4, 1 + weight / 50))  # Scale width as in the original script
-            
-            # Generate edge tooltip using the tooltip manager
-            edge_title = generate_edge_tooltip(
-                source, 
-                target, 
-                weight, 
-                graph.http_host_counts
-            )
+        # Convert the changed nodes
+        for node_id in changed_nodes:
+            if node_id in simplified_graph:
+                node_payloads[node_id] = node_payload(graph, node_id, simplified_graph.nodes[node_id])
+            else:
+                node_payloads.pop(node_id, None)
             
-            edges.append({
-                'from': source,
-                'to': target,
-                'weight': weight,
-                'width': width,
-                'smooth': {'type': 'continuous', 'roundness': 0.2},
-                'title': edge_title
-            })
+            # Convert any complex data structures for JSON serialization
+            if node_id in graph.http_host_counts:
+                host_count_payloads[node_id] = convert_dict_for_json(graph.http_host_counts[node_id])
+            else:
+                host_count_payloads.pop(node_id, None)
         
-        logger.info(f"Processed {len(edges)} edges")
+        # Convert the changed edges
+        edge_latency = graph.edge_latency_quantiles(changed_edges)
+        edge_routes = graph.edge_route_counts(changed_edges)
+        for source, target in changed_edges:
+            if simplified_graph.has_edge(source, target):
+                edge_payloads[(source, target)] = edge_payload(
+                    graph, source, target, simplified_graph.edges[source, target],
+                    edge_latency.get((source, target)), edge_routes.get((source, target)))
+            else:
+                edge_payloads.pop((source, target), None)
         
-        # Convert any complex data structures for JSON serialization
-        serializable_http_host_counts = convert_dict_for_json(graph.http_host_counts)
+        logger.info(f"Converted {len(changed_nodes)} changed nodes and {len(changed_edges)} changed edges")
         
         # Build updated graph_data
         with graph_lock:
             graph_data = {
-                'nodes': nodes,
-                'edges': edges,
+                'nodes': list(node_payloads.values()),
+                'edges': list(edge_payloads.values()),
                 'namespace_colors': graph.namespace_colors,
-                'http_host_counts': serializable_http_host_counts,
-                'namespace_pod_counts': graph.namespace_pod_counts
+                'http_host_counts': dict(host_count_payloads),
+                'namespace_pod_counts': dict(graph.namespace_pod_counts)
             }
-            logger.info(f"Graph data updated: {len(nodes)} nodes, {len(edges)} edges")
+            logger.info(f"Graph data updated: {len(graph_data['nodes'])} nodes, {len(graph_data['edges'])} edges")
         
         # Emit the updated data to connected clients
         if socketio_instance:
@@ -145,6 +198,8 @@ def build_graph_data():
     except Exception as e:
         logger.error(f"Error building graph data: {e}", exc_info=True)
         return None
+    finally:
+        build_lock.release()
 
 def generate_test_graph():
     """Generate a test graph without collecting logs"""
@@ -12,6 +12,10 @@ from flask import Flask, render_template, jsonify, request
 from config.config_utils import get_frontend_config, get_js_config
 from config.app_config import UPDATE_INTERVAL
 from libs.webapp.graph_manager import build_graph_data, get_graph_data, generate_test_graph
+from libs.parsing.concurrency import concurrency_controller
+from libs.parsing.source_rules import reload_source_rules
+from libs.parsing.tracing import tracer
+from libs.parsing.probe_filter import probe_counter
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -68,6 +72,50 @@ def init_routes(flask_app, socketio_instance):
             return jsonify(result), 500
         return jsonify(result)
 
+    @app.route('/concurrency')
+    def get_concurrency():
+        """API endpoint to get the adaptive collection concurrency of each context and its history"""
+        return jsonify(concurrency_controller.snapshot())
+
+    @app.route('/reload_rules', methods=['POST'])
+    def reload_rules():
+        """Reload the source rules file without waiting for the next graph update"""
+        try:
+            reloaded = reload_source_rules(force=True)
+        except Exception as e:
+            logger.error(f"Error reloading the source rules: {e}", exc_info=True)
+            return jsonify({'status': 'error', 'message': str(e)}), 500
+        if not reloaded:
+            return jsonify({'status': 'error', 'message': 'Invalid rules file, the current rules are kept'}), 400
+        return jsonify({'status': 'success', 'message': 'Source rules reloaded'})
+
+    @app.route('/probes')
+    def get_probes():
+        """API endpoint to get the number of healthcheck and monitoring requests filtered per namespace and path"""
+        return jsonify(probe_counter.snapshot())
+
+    @app.route('/tracing')
+    def get_tracing():
+        """API endpoint to get the namespaces traced in the log parsing and merging"""
+        return jsonify(tracer.snapshot())
+
+    @app.route('/tracing', methods=['POST'])
+    def set_tracing():
+        """Enable or disable the tracing of a namespace"""
+        data = request.get_json(silent=True) or {}
+        namespace = data.get('namespace')
+        if not namespace:
+            return jsonify({'status': 'error', 'message': 'A namespace is required'}), 400
+        if not data.get('enabled', True):
+            tracer.disable(namespace)
+            return jsonify({'status': 'success', 'message': f'Stopped tracing namespace {namespace}'})
+        try:
+            sample_every = int(data.get('sample_every', 1))
+            tracer.enable(namespace, sample_every)
+        except ValueError as e:
+            return jsonify({'status': 'error', 'message': f'Invalid sample_every: {e}'}), 400
+        return jsonify({'status': 'success', 'message': f'Tracing 1 line in {sample_every} of namespace {namespace}'})
+
     @app.route('/update_interval', methods=['POST'])
     def update_interval():
         """Update the graph refresh interval"""
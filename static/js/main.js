@@ -12,6 +12,10 @@ document.addEventListener('DOMContentLoaded', () => {
     const lastUpdateDiv = document.getElementById('last-update');
     const updateIntervalInput = document.getElementById('update-interval');
     const setIntervalBtn = document.getElementById('set-interval-btn');
+    const traceNamespaceInput = document.getElementById('trace-namespace');
+    const traceSampleEveryInput = document.getElementById('trace-sample-every');
+    const traceEnableBtn = document.getElementById('trace-enable-btn');
+    const traceDisableBtn = document.getElementById('trace-disable-btn');
     const gravityValue = document.getElementById('gravity-value');
     const springLengthValue = document.getElementById('spring-length-value');
     const springStrengthValue = document.getElementById('spring-strength-value');
@@ -1460,6 +1464,37 @@ document.addEventListener('DOMContentLoaded', () => {
           });
     });
     
+    // Enable or disable the tracing of a namespace in the log parsing
+    function setTracing(enabled) {
+        const namespace = traceNamespaceInput.value.trim();
+        if (!namespace) {
+            statusDiv.innerHTML = "Enter a namespace to trace";
+            return;
+        }
+        
+        fetch('/tracing', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({
+                namespace,
+                enabled,
+                sample_every: parseInt(traceSampleEveryInput.value, 10) || 1
+            })
+        }).then(response => response.json())
+          .then(data => {
+              statusDiv.innerHTML = data.message;
+          })
+          .catch(error => {
+              statusDiv.innerHTML = "Error updating tracing";
+              console.error('Error:', error);
+          });
+    }
+    
+    traceEnableBtn.addEventListener('click', () => setTracing(true));
+    traceDisableBtn.addEventListener('click', () => setTracing(false));
+    
     applyPhysicsBtn.addEventListener('click', () => {
         if (network) {
             // Update physics settings